@@ -113,7 +113,12 @@ def create_app(object_name):
     # limiter.init_app(app)
     # mail.init_app(app)
 
+    from accountability_api import metrics, prewarming, tracing
+
+    tracing.init_app(app)
+    metrics.init_app(app)  # before compression, to measure the compressed response size
     compress.init_app(app)
+    prewarming.init_app(app)
 
     # Import and register the different asset bundles
     return app
@@ -0,0 +1,76 @@
+"""
+Grouping of RTC products into DSWx-S1 burst sets.
+
+A DSWx-S1 product is produced from the RTC products of the bursts of an MGRS tile set acquired in the same acquisition
+cycle. The RTC catalog records the MGRS sets and acquisition cycles of each RTC product in
+`mgrs_set_id_acquisition_ts_cycle_indexes` (e.g. "MS_26_12$151"), as computed by PCM. The acquisition cycle of RTC
+products catalogued without them isn't known here, so each of their burst acquisitions is keyed apart (see
+`burst_set_keys`).
+
+e.g.
+    OPERA_L2_RTC-S1_T064-135524-IW2_20220501T015035Z_20220501T100253Z_S1A_30_v1.0
+"""
+import logging
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from accountability_api.api_utils import product_id
+
+LOGGER = logging.getLogger()
+
+BurstSetKey = Union[Tuple[str, int], Tuple[Optional[str], str, Optional[str]]]
+"""
+(MGRS set ID, acquisition cycle index) of an RTC product catalogued with its acquisition cycles. Otherwise, (MGRS set ID,
+burst ID, acquisition time) as returned by `burst_acquisition`, where the MGRS set ID is None when unknown.
+"""
+
+
+def burst_acquisition(rtc_doc: dict) -> Tuple[str, Optional[str]]:
+    """
+    :return: the burst ID and acquisition time of the given RTC catalog doc. When the ID has no burst ID (see
+             `product_id.parse`), the doc ID and None instead, so that such docs aren't taken for the same burst.
+    :raises Exception: when the ID isn't of a known format
+    """
+    parsed = product_id.parse(rtc_doc["_id"])
+    if parsed.burst_id is None:
+        return rtc_doc["_id"], None
+    return parsed.burst_id, parsed.acquisition_ts
+
+
+def burst_set_keys(rtc_doc: dict) -> Iterator[BurstSetKey]:
+    """:return: the keys of the burst sets of the given RTC catalog doc. A burst may belong to several MGRS sets."""
+    mgrs_set_id_acquisition_ts_cycle_indexes = rtc_doc.get("mgrs_set_id_acquisition_ts_cycle_indexes")
+    if mgrs_set_id_acquisition_ts_cycle_indexes:
+        for mgrs_set_id_acquisition_ts_cycle_index in mgrs_set_id_acquisition_ts_cycle_indexes:
+            mgrs_set_id, cycle_index = mgrs_set_id_acquisition_ts_cycle_index.split("$")
+            yield mgrs_set_id, int(cycle_index)
+        return
+
+    burst_id, acquisition_ts = burst_acquisition(rtc_doc)
+    for mgrs_set_id in rtc_doc.get("mgrs_set_ids") or [None]:
+        yield mgrs_set_id, burst_id, acquisition_ts
+
+
+def group_burst_sets(rtc_docs: Iterable[dict]) -> Dict[BurstSetKey, Dict[str, dict]]:
+    """
+    Groups RTC catalog docs by burst set and burst. Of the docs of a burst acquisition (e.g. reprocessed RTC products),
+    only the latest (by `creation_timestamp`) is kept, whether or not each was catalogued with its acquisition cycles.
+
+    :return: the docs by burst ID (see `burst_acquisition`), by burst set key. Docs with IDs of unknown formats (see
+             `product_id.parse`) are logged and skipped.
+    """
+    latest_rtc_docs: Dict[Tuple[str, Optional[str]], dict] = {}
+    for rtc_doc in rtc_docs:
+        try:
+            key = burst_acquisition(rtc_doc)
+        except Exception:
+            LOGGER.warning(f"Unable to parse RTC product ID. Skipping. id={rtc_doc['_id']}")
+            continue
+        latest = latest_rtc_docs.get(key)
+        if latest is None or rtc_doc["creation_timestamp"] > latest["creation_timestamp"]:
+            latest_rtc_docs[key] = rtc_doc
+
+    burst_sets: Dict[BurstSetKey, Dict[str, dict]] = {}
+    for (burst_id, _), rtc_doc in latest_rtc_docs.items():
+        for key in burst_set_keys(rtc_doc):
+            burst_sets.setdefault(key, {})[burst_id] = rtc_doc
+    return burst_sets
@@ -0,0 +1,86 @@
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas import DataFrame
+
+from accountability_api import tracing
+
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+ARROW_MIMETYPE = "application/vnd.apache.arrow.file"
+
+COLUMNAR_MIMETYPES = [PARQUET_MIMETYPE, ARROW_MIMETYPE]
+
+FILE_EXTENSIONS = {
+    PARQUET_MIMETYPE: "parquet",
+    ARROW_MIMETYPE: "arrow",
+}
+
+
+def to_typed_df(
+        df: DataFrame,
+        datetime_columns: Iterable[str] = (),
+        duration_columns: Iterable[str] = (),
+        count_columns: Iterable[str] = ()
+) -> DataFrame:
+    """
+    Returns a copy of the given report data frame with typed columns, suitable for columnar output.
+
+    * datetime columns (ISO-like strings) become datetime64. Unparseable values (e.g. "N/A") become NaT.
+    * duration columns ("HH:MM:SS" strings, hours may exceed 24) become nullable integer seconds.
+    * count columns become nullable integers.
+
+    Columns missing from the data frame are ignored.
+    """
+    df = df.copy()
+    for column in datetime_columns:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column], errors="coerce", utc=True, format="ISO8601").dt.tz_localize(None)
+    for column in duration_columns:
+        if column in df.columns:
+            durations = df[column].where(df[column] != "N/A")
+            df[column] = pd.to_timedelta(durations, errors="coerce").dt.total_seconds().round().astype("Int64")
+    for column in count_columns:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("Int64")
+    return df
+
+
+def to_arrow_table(df: DataFrame, metadata: Optional[List[Dict[str, str]]] = None) -> pa.Table:
+    """
+    Converts the data frame to an Arrow table.
+    The optional report header is stored as schema metadata, one key per header line.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        schema_metadata = dict(table.schema.metadata or {})
+        for line in metadata:
+            schema_metadata.update({str(k): str(v) for k, v in line.items()})
+        table = table.replace_schema_metadata(schema_metadata)
+    return table
+
+
+def write_columnar(df: DataFrame, output_format: str, metadata: Optional[List[Dict[str, str]]] = None):
+    """
+    Writes the data frame to a temporary file in the given columnar output format.
+
+    Parquet output is zstd-compressed. Arrow IPC output is left uncompressed so that it can be memory-mapped and read
+    without copying.
+
+    :return: the temporary file. The file is deleted when closed.
+    """
+    table = to_arrow_table(df, metadata)
+
+    tmp_report = tempfile.NamedTemporaryFile(suffix=f".{FILE_EXTENSIONS[output_format]}", dir=".", delete=True)
+    if output_format == PARQUET_MIMETYPE:
+        pq.write_table(table, tmp_report.name, compression="zstd")
+    elif output_format == ARROW_MIMETYPE:
+        with pa.OSFile(tmp_report.name, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        raise Exception(f"Output format not supported. {output_format=}")
+    tracing.set_attributes(rows=table.num_rows, bytes=os.path.getsize(tmp_report.name))
+    return tmp_report
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import dateutil.parser
+from hysds_commons.elasticsearch_utils import ElasticsearchUtility
+
+from accountability_api import es_connection, metrics
+from accountability_api.configuration_obj import ConfigurationObj
+
+LOGGER = logging.getLogger()
+
+INDEX_RESOLVER = None
+
+MAX_INDEX_EXPRESSION_LENGTH = 2048
+"""Maximum length of a resolved multi-index expression. Elasticsearch limits the HTTP request line to 4 KB (by default)."""
+
+
+class IndexResolver:
+    """
+    Resolves index patterns (e.g. "grq_*_l2_hls_l30-*") to the concrete indexes that may contain docs in a given time window,
+    so that short-window searches do not fan out to every shard of every matching index.
+
+    For each pattern, the concrete indexes are cached together with the min and max `time_key` of their docs.
+    The cache is refreshed with a single aggregation request per pattern once the entry is older than `ttl_seconds`.
+
+    Pruning assumes docs are indexed with a `time_key` no earlier than when they are indexed.
+    Windows that are open-ended or that extend past the last refresh are therefore never pruned,
+    as indexes created (or docs indexed) since the refresh could match.
+
+    Patterns are refreshed independently, so that a refresh only blocks the requests resolving the same pattern.
+    When the resolved indexes don't fit in `max_length` characters, the patterns with the longest expansions are kept as is.
+    """
+
+    def __init__(
+            self,
+            es: Optional[ElasticsearchUtility] = None,
+            ttl_seconds: float = 300,
+            time_key: str = "creation_timestamp",
+            clock=time.time,
+            max_length: int = MAX_INDEX_EXPRESSION_LENGTH
+    ):
+        self._es = es
+        self.ttl_seconds = ttl_seconds
+        self.time_key = time_key
+        self._clock = clock
+        self.max_length = max_length
+        self._lock = threading.Lock()
+        self._pattern_locks: Dict[str, threading.Lock] = {}
+        self._cache: Dict[str, Tuple[float, Dict[str, Tuple[Optional[float], Optional[float]]]]] = {}
+
+    def resolve(self, index: str, start=None, end=None) -> str:
+        """
+        Resolves the index pattern (or comma-separated multi-index expression) to the indexes overlapping `[start, end]`.
+
+        :param index: the index pattern or multi-index expression
+        :param start: ISO-like datetime string (or datetime) of the start of the window
+        :param end: ISO-like datetime string (or datetime) of the end of the window
+        :return: a comma-separated list of indexes and/or unpruned patterns. Empty if no index can match.
+        """
+        if not (start and end) or self.ttl_seconds <= 0:
+            return index
+        start_ms, end_ms = _to_epoch_ms(start), _to_epoch_ms(end)
+
+        patterns = list(dict.fromkeys(index.split(",")))
+        expansions: Dict[str, List[str]] = {}
+        for pattern in patterns:
+            refreshed_at, index_ranges = self._get_index_ranges(pattern)
+            if end_ms >= refreshed_at * 1000:
+                expansions[pattern] = [pattern]
+                continue
+            expansions[pattern] = [
+                concrete_index
+                for concrete_index, (min_ms, max_ms) in index_ranges.items()
+                if min_ms is None or (min_ms <= end_ms and max_ms >= start_ms)
+            ]
+
+        # EDGE CASE: long windows over many indexes. fall back to the patterns with the longest expansions
+        length = len(",".join(concrete_index for pattern in patterns for concrete_index in expansions[pattern]))
+        for pattern in sorted(patterns, key=lambda pattern: len(",".join(expansions[pattern])), reverse=True):
+            if length <= self.max_length:
+                break
+            expansion_length = len(",".join(expansions[pattern]))
+            if expansion_length > len(pattern):
+                length -= expansion_length - len(pattern)
+                expansions[pattern] = [pattern]
+
+        return ",".join(dict.fromkeys(concrete_index for pattern in patterns for concrete_index in expansions[pattern]))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _get_index_ranges(self, pattern: str) -> Tuple[float, Dict[str, Tuple[Optional[float], Optional[float]]]]:
+        with self._lock:
+            entry = self._cache.get(pattern)
+            if entry is not None and self._clock() - entry[0] < self.ttl_seconds:
+                return entry
+            pattern_lock = self._pattern_locks.setdefault(pattern, threading.Lock())
+
+        # refresh outside the resolver lock, so that other patterns can be resolved meanwhile
+        with pattern_lock:
+            with self._lock:
+                entry = self._cache.get(pattern)
+            if entry is None or self._clock() - entry[0] >= self.ttl_seconds:  # not refreshed by another thread
+                entry = (self._clock(), self._fetch_index_ranges(pattern))
+                with self._lock:
+                    self._cache[pattern] = entry
+            return entry
+
+    def _fetch_index_ranges(self, pattern: str) -> Dict[str, Tuple[Optional[float], Optional[float]]]:
+        es = self._es or es_connection.get_grq_es()
+        if hasattr(es, "es"):
+            es = es.es
+
+        LOGGER.debug(f"Refreshing index ranges. {pattern=}")
+        with metrics.observe_es("search", pattern):
+            result = es.search(
+                index=pattern,
+                body={
+                    "size": 0,
+                    "aggs": {
+                        "indexes": {
+                            "terms": {"field": "_index", "size": 10000},
+                            "aggs": {
+                                "min_time": {"min": {"field": self.time_key}},
+                                "max_time": {"max": {"field": self.time_key}}
+                            }
+                        }
+                    }
+                },
+                ignore_unavailable=True,
+                allow_no_indices=True
+            )
+        return {
+            bucket["key"]: (bucket["min_time"]["value"], bucket["max_time"]["value"])
+            for bucket in result["aggregations"]["indexes"]["buckets"]
+        }
+
+
+def _to_epoch_ms(dt) -> float:
+    if not isinstance(dt, datetime):
+        dt = dateutil.parser.isoparse(dt)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp() * 1000
+
+
+def get_index_resolver() -> IndexResolver:
+    """:return: the configured index resolver. Disabled (resolving every pattern to itself) unless `INDEX_RESOLVER_TTL_SECONDS` is set."""
+    global INDEX_RESOLVER
+    if INDEX_RESOLVER is None:
+        ttl_seconds = float(ConfigurationObj().get_item("INDEX_RESOLVER_TTL_SECONDS", default=0))
+        INDEX_RESOLVER = IndexResolver(ttl_seconds=ttl_seconds)
+    return INDEX_RESOLVER
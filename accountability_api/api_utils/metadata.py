@@ -1,4 +1,7 @@
 import re
+from typing import Optional
+
+from accountability_api.api_utils import product_id
 
 COMPOSITE_RELEASE_ID_FIELD = "CompositeReleaseID"
 
@@ -69,6 +72,9 @@ OUTGOING_PRODUCTS_TO_DAAC = {
     "L3_DISP_S1": PRODUCT_TYPE_TO_INDEX["L3_DISP_S1"]
 }
 
+ANCILLARY_CATALOG_INDEXES = ["hls_catalog-*", "hls_spatial_catalog-*", "slc_catalog-*", "slc_spatial_catalog-*"]
+"""Catalogs of input product files and their upstream (e.g. CMR) timestamps."""
+
 TRANSFERABLE_PRODUCT_TYPES = [
     "L3_DSWx_HLS",
     "L2_CSLC_S1",
@@ -82,82 +88,95 @@ RSLC_CHILDREN = []
 MOZART_INDEXES = {"JOB_STATUS": "job_status-current", "TIMER": "timer_status"}
 
 
+_TILE_ID = re.compile(r"T\w{5}")
+_ACQUISITION_TS = re.compile(r"\d{8}T\d{6}")
+
+
 def granule_id_to_tile_id(granule_id: str) -> str:
     # example _id = HLS.L30.T22VEQ.2021248T143156.v2.0
-    return re.findall(r"T\w{5}", granule_id)[0]
+    return _parse_component(granule_id, "tile_id", fallback=_TILE_ID)
+
+
+_HLS_ACQUISITION_TS = re.compile(r"\d{7}T\d{6}")
 
 
 def granule_id_to_acquisition_ts(granule_id):
     # example _id = HLS.L30.T22VEQ.2021248T143156.v2.0
-    return re.findall(r"\d{7}T\d{6}", granule_id)[0]
+    return _HLS_ACQUISITION_TS.search(granule_id).group(0)
 
 
 def granule_id_to_input_product_type(input_product_granule_id: str):
     # example _id = HLS.L30.T22VEQ.2021248T143156.v2.0
-    if input_product_granule_id.startswith("HLS.L30"):
-        return "L2_HLS_L30"
-    elif input_product_granule_id.startswith("HLS.S30"):
-        return "L2_HLS_S30"
-    else:
+    parsed = _try_parse(input_product_granule_id)
+    if parsed is None or not parsed.product_type.startswith("L2_HLS"):
         raise Exception(f"Unable to map {input_product_granule_id=} to an input product type")
+    return parsed.product_type
 
 
 def granule_id_to_sensor(granule_id):
     # example _id = HLS.L30.T22VEQ.2021248T143156.v2.0
-    if ".L30" in granule_id:
-        return "LANDSAT"
-    elif ".S30" in granule_id:
-        return "SENTINEL"
-    else:
+    try:
+        return _parse_component(granule_id, "sensor")
+    except Exception:
         raise Exception(f"Unable to map {granule_id=} to sensor")
 
 
 def sds_product_id_to_sds_product_type(sds_product_id: str):
     # example _id = OPERA_L3_DSWx_HLS_T57NVH_20220117T000429Z_20220117T000429Z_S2A_30_v2.0
-    if sds_product_id.startswith("OPERA_L3_DSWx_HLS"):
-        return "L3_DSWX_HLS"
     # example _id = OPERA_L2_CSLC_S1A_IW_T64-135524-IW2_VV_20220501T015035Z_v0.1_20220501T015102Z
-    if sds_product_id.startswith("OPERA_L2_CSLC_S1A"):
-        return "L2_CSLC_S1"
     # example _id = OPERA_L2_RTC_S1A_IW_T64-135524-IW2_VV_20220501T015035Z_v0.1_20220501T015102Z
-    if sds_product_id.startswith("OPERA_L2_RTC_S1A"):
-        return "L2_RTC_S1"
-    # example _id = OPERA_L2_RTC_S1B_IW_T64-135524-IW2_VV_20220501T015035Z_v0.1_20220501T015102Z
-    if sds_product_id.startswith("OPERA_L2_RTC_S1B"):
-        return "L2_RTC_S1"
-    # example _id = OPERA_L3_DSWx_S1_
-    if sds_product_id.startswith("OPERA_L3_DSWx-S1"):
-        return "L3_DSWX_S1"
-    # example _id = OPERA_L3_DISP_S1_
-    if sds_product_id.startswith("OPERA_L3_DISP-S1"):
-        return "L3_DISP_S1"
-    else:
+    parsed = _try_parse(sds_product_id)
+    if parsed is None or parsed.product_type not in PRODUCT_TYPE_TO_INDEX:
         raise Exception(f"Unable to map {sds_product_id=} to an SDS product type")
+    return parsed.product_type
 
 
 def sds_product_id_to_sensor(sds_product_id: str):
     # example _id = OPERA_L3_DSWx_HLS_T57NVH_20220117T000429Z_20220117T000429Z_S2A_30_v2.0
     # example _id = OPERA_L2_CSLC_S1A_IW_T64-135524-IW2_VV_20220501T015035Z_v0.1_20220501T015102Z
-    # example _id = OPERA_L2_CSLC_S1B_IW_T64-135524-IW2_VV_20220501T015035Z_v0.1_20220501T015102Z
-    if "_S1A" in sds_product_id:
-        return "SENTINEL"
-    if "_S1B" in sds_product_id:
-        return "SENTINEL"
-    elif "_S2A" in sds_product_id:
-        return "SENTINEL"
-    elif "_S2B" in sds_product_id:
-        return "SENTINEL"
-    elif "_L8" in sds_product_id:
-        return "LANDSAT"
-    elif "_L9" in sds_product_id:
-        return "LANDSAT"
-    else:
+    try:
+        return _parse_component(sds_product_id, "sensor")
+    except Exception:
         raise Exception(f"Unable to map {sds_product_id=} to sensor")
 
 
 def sds_product_id_to_tile_id(sds_product_id: str) -> str:
-    return re.findall(r"T\w{5}", sds_product_id)[0]
+    return _parse_component(sds_product_id, "tile_id", fallback=_TILE_ID)
 
 
 def sds_product_id_to_acquisition_ts(sds_product_id: str) -> str:
-    return re.findall(r"\d{8}T\d{6}", sds_product_id)[0]
+    return _parse_component(sds_product_id, "acquisition_ts", fallback=_ACQUISITION_TS)
+
+
+def slc_granule_id_to_sensing_ts_range(granule_id: str) -> tuple[str, str]:
+    # example _id = S1A_IW_SLC__1SDV_20220501T015035_20220501T015102_043011_0522A4_42CC
+    parsed = _try_parse(granule_id)
+    if parsed is None or parsed.acquisition_end_ts is None:
+        start_ts, stop_ts = _ACQUISITION_TS.findall(granule_id)[:2]
+        return start_ts, stop_ts
+    return parsed.acquisition_ts, parsed.acquisition_end_ts
+
+
+def _try_parse(id_: str):
+    try:
+        return product_id.parse(id_)
+    except Exception:
+        return None
+
+
+def _parse_component(id_: str, component: str, fallback: Optional[re.Pattern] = None) -> str:
+    """
+    :param fallback: pattern searched for the component in IDs of unknown formats (see `product_id.parse`). IDs of
+                     unknown formats raise when None.
+    """
+    parsed = _try_parse(id_) if fallback else product_id.parse(id_)
+    if parsed is None:
+        match = fallback.search(id_)
+        if match is None:
+            raise Exception(f"No {component} in ID. {id_=}")
+        return match.group(0)
+
+    value = getattr(parsed, component)
+    if value is None:
+        raise Exception(f"No {component} in ID. {id_=}")
+    return value
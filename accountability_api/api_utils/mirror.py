@@ -0,0 +1,296 @@
+"""
+Local analytical mirror of the catalog metadata used by reports.
+
+The fields reports need (IDs, product types, timestamps, file sizes and DAAC statuses) of the SDS product indexes
+(`metadata.PRODUCT_TYPE_TO_INDEX`) and the incoming product indexes (`metadata.INCOMING_SDP_PRODUCTS`) are mirrored
+into a local SQLite database. Reports can then be computed with SQL over the mirror, instead of scrolling and
+reprocessing the documents in Python.
+
+The mirror is synced incrementally (see `watermark_sync`). Each index pattern has a `creation_timestamp` watermark,
+the latest creation timestamp mirrored. Syncing fetches the documents created since the watermark, minus
+`LOOKBACK_SECONDS`. Documents are upserted, so that updates within the lookback (e.g. DAAC statuses set after a
+product is created) are mirrored too. Updates to older documents are not. Input products are keyed by base ID, so
+that later revisions replace earlier ones.
+
+Configured in the `[MIRROR]` section of `app.conf.ini`:
+
+* ENABLED - reports supporting the mirror are computed over it
+* PATH - the SQLite database
+* MAX_STALENESS_SECONDS - reports sync the mirror first when it was last synced longer ago
+* LOOKBACK_SECONDS - see above
+
+The mirror can also be synced by a separate process (e.g. a cron job), with
+    python -m accountability_api.api_utils.mirror
+"""
+import argparse
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import timedelta
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+from pandas import DataFrame
+
+from accountability_api import tracing
+from accountability_api.api_utils import metadata, utils, watermark_sync
+from accountability_api.configuration_obj import ConfigurationObj
+
+LOGGER = logging.getLogger()
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+"""Format of the mirrored timestamps. Sortable as text."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    index_name TEXT NOT NULL,
+    product_type TEXT NOT NULL,
+    short_name TEXT,
+    file_name TEXT,
+    file_size INTEGER,
+    creation_timestamp TEXT NOT NULL,
+    input_received_ts REAL,
+    daac_alerted_ts REAL,
+    daac_cnm_s_status TEXT,
+    daac_delivery_status TEXT
+);
+CREATE INDEX IF NOT EXISTS products_creation_timestamp ON products (creation_timestamp);
+
+CREATE TABLE IF NOT EXISTS inputs (
+    id TEXT PRIMARY KEY,
+    es_id TEXT NOT NULL,
+    index_name TEXT NOT NULL,
+    product_type TEXT NOT NULL,
+    file_name TEXT,
+    file_size INTEGER,
+    creation_timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS inputs_creation_timestamp ON inputs (creation_timestamp);
+
+CREATE TABLE IF NOT EXISTS sync_state (
+    source TEXT PRIMARY KEY,
+    watermark TEXT NOT NULL,
+    synced_at REAL NOT NULL
+);
+"""
+
+_PRODUCT_SOURCE_FIELDS = [
+    "daac_CNM_S_timestamp", "daac_CNM_S_status", "daac_delivery_status",
+    "metadata.ProductType", "metadata.FileName", "metadata.FileSize",
+    "metadata.InputProductReceivedTime", "metadata.ProductReceivedTime",
+]
+_INPUT_SOURCE_FIELDS = ["metadata.FileName", "metadata.FileSize"]
+
+PRODUCTION_TIME_SUMMARY_SQL = """
+WITH production_times AS (
+    SELECT product_type, short_name, daac_alerted_ts - input_received_ts AS production_time
+    FROM products
+    WHERE creation_timestamp >= :start AND creation_timestamp <= :end
+),
+ranked AS (
+    SELECT
+        short_name,
+        production_time,
+        ROW_NUMBER() OVER (PARTITION BY short_name ORDER BY production_time) AS n,
+        COUNT(*) OVER (PARTITION BY short_name) AS total
+    FROM production_times
+    WHERE production_time IS NOT NULL
+),
+medians AS (
+    -- the middle value, or the mean of the two middle values
+    SELECT short_name, AVG(production_time) AS production_time_median
+    FROM ranked
+    WHERE 2 * n BETWEEN total AND total + 2
+    GROUP BY short_name
+)
+SELECT
+    p.product_type,
+    p.short_name AS opera_product_short_name,
+    -- every product of the type once any is delivered, as `ProductionTimeReport.to_report_df` counts them
+    CASE WHEN COUNT(p.production_time) > 0 THEN COUNT(*) ELSE 0 END AS production_time_count,
+    MIN(p.production_time) AS production_time_min,
+    MAX(p.production_time) AS production_time_max,
+    AVG(p.production_time) AS production_time_mean,
+    MAX(m.production_time_median) AS production_time_median
+FROM production_times p
+LEFT JOIN medians m ON m.short_name = p.short_name
+GROUP BY p.product_type, p.short_name
+"""
+"""Production time statistics per product type. See `ProductionTimeReport.to_report_df`."""
+
+
+class Mirror(watermark_sync.WatermarkStore):
+    """See the module documentation. Stores the watermarks of its sources."""
+
+    def __init__(self, path: str, lookback: timedelta = timedelta(days=1)):
+        self.path = path
+        self.lookback = lookback
+        self._sync_lock = threading.Lock()
+        with closing(self._connect()) as connection:
+            connection.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def query(self, sql: str, params: Optional[Dict] = None) -> DataFrame:
+        """:return: the result of the given SQL query over the mirror"""
+        with closing(self._connect()) as connection, tracing.span("mirror.query") as span:
+            df = pd.read_sql_query(sql, connection, params=params)
+            span.set_attribute("rows", len(df))
+            return df
+
+    def last_synced_at(self) -> Optional[float]:
+        """:return: when the mirror was last synced (epoch seconds). None when never synced."""
+        with closing(self._connect()) as connection:
+            (synced_at,), = connection.execute("SELECT MIN(synced_at) FROM sync_state").fetchall()
+        return synced_at
+
+    def sync_if_stale(self, max_staleness: timedelta):
+        last_synced_at = self.last_synced_at()
+        if last_synced_at is None or time.time() - last_synced_at > max_staleness.total_seconds():
+            self.sync()
+
+    def sync(self) -> int:
+        """
+        Syncs the mirror incrementally. See the module documentation.
+
+        :return: the number of documents upserted
+        """
+        with self._sync_lock, tracing.span("mirror.sync") as span:
+            count = 0
+            for product_type, patterns in metadata.PRODUCT_TYPE_TO_INDEX.items():
+                count += self._sync_source("products", product_type, patterns, _PRODUCT_SOURCE_FIELDS, _to_product_row)
+            for product_type, patterns in metadata.INCOMING_SDP_PRODUCTS.items():
+                count += self._sync_source("inputs", product_type, patterns, _INPUT_SOURCE_FIELDS, _to_input_row)
+            span.set_attribute("docs", count)
+            LOGGER.info(f"Synced mirror. docs={count}")
+            return count
+
+    def _sync_source(self, table: str, product_type: str, patterns: Sequence[str], source_fields: List[str], to_row) -> int:
+        source = watermark_sync.SyncSource(name=f"{table}:{product_type}", index=",".join(patterns), source_includes=source_fields)
+        with closing(self._connect()) as connection:
+            def apply(docs: List[Dict]):
+                _upsert(connection, table, [to_row(doc, product_type) for doc in docs])
+                connection.commit()
+
+            count = watermark_sync.WatermarkSync(store=self, lookback=self.lookback).sync(source, apply)
+            connection.execute(
+                "INSERT INTO sync_state (source, watermark, synced_at) VALUES (?, '', ?) "
+                "ON CONFLICT (source) DO UPDATE SET synced_at = excluded.synced_at",
+                (source.name, time.time())
+            )
+            connection.commit()
+        return count
+
+    def get_watermark(self, name: str) -> Optional[str]:
+        with closing(self._connect()) as connection:
+            row = connection.execute("SELECT watermark FROM sync_state WHERE source = ?", (name,)).fetchone()
+        return row[0] if row and row[0] else None
+
+    def set_watermark(self, name: str, watermark: str):
+        with closing(self._connect()) as connection:
+            connection.execute(
+                "INSERT INTO sync_state (source, watermark, synced_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (source) DO UPDATE SET watermark = excluded.watermark",
+                (name, watermark, time.time())
+            )
+            connection.commit()
+
+    def production_time_summary(self, start: str, end: str) -> DataFrame:
+        """
+        :return: the production time statistics (in seconds) per product type, of the products created between
+                 `start` and `end`. See `ProductionTimeReport.to_report_df`.
+        """
+        df = self.query(PRODUCTION_TIME_SUMMARY_SQL, {"start": _normalize_timestamp(start), "end": _normalize_timestamp(end)})
+        # same order as the Elasticsearch report, which queries the product types in turn
+        product_types = list(metadata.PRODUCT_TYPE_TO_INDEX)
+        df = df.sort_values(by="product_type", key=lambda s: s.map(product_types.index), kind="stable")
+        return df.drop(columns=["product_type"]).reset_index(drop=True)
+
+
+def _upsert(connection: sqlite3.Connection, table: str, rows: List[Dict]):
+    if not rows:
+        return
+    columns = list(rows[0])
+    connection.executemany(
+        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})",
+        rows
+    )
+
+
+def _to_product_row(doc: Dict, product_type: str) -> Dict:
+    product_metadata = doc.get("metadata", {})
+    input_received_time = product_metadata.get("InputProductReceivedTime") or product_metadata.get("ProductReceivedTime")
+    return {
+        "id": doc["_id"],
+        "index_name": doc["_index"],
+        "product_type": product_type,
+        "short_name": product_metadata.get("ProductType"),
+        "file_name": product_metadata.get("FileName"),
+        "file_size": product_metadata.get("FileSize"),
+        "creation_timestamp": _normalize_timestamp(doc["creation_timestamp"]),
+        "input_received_ts": _to_ts(input_received_time),
+        "daac_alerted_ts": _to_ts(doc.get("daac_CNM_S_timestamp")),
+        "daac_cnm_s_status": doc.get("daac_CNM_S_status"),
+        "daac_delivery_status": doc.get("daac_delivery_status"),
+    }
+
+
+def _to_input_row(doc: Dict, product_type: str) -> Dict:
+    # keyed by base ID, so that the latest revision replaces earlier ones
+    return {
+        "id": doc["_base_id"],
+        "es_id": doc["_id"],
+        "index_name": doc["_index"],
+        "product_type": product_type,
+        "file_name": doc.get("metadata", {}).get("FileName"),
+        "file_size": doc.get("metadata", {}).get("FileSize"),
+        "creation_timestamp": _normalize_timestamp(doc["creation_timestamp"]),
+    }
+
+
+def _normalize_timestamp(value: str) -> str:
+    return utils.from_iso_to_dt(value).strftime(TIMESTAMP_FORMAT)
+
+
+def _to_ts(value: Optional[str]) -> Optional[float]:
+    # consistent with the Elasticsearch reports, which compute durations between naive datetimes
+    return utils.from_iso_to_dt(value).timestamp() if value else None
+
+
+_mirror: Optional[Mirror] = None
+_mirror_initialized = False
+_mirror_lock = threading.Lock()
+
+
+def get_mirror() -> Optional[Mirror]:
+    """:return: the configured mirror, synced within `MAX_STALENESS_SECONDS`. None when the mirror is disabled."""
+    global _mirror, _mirror_initialized
+    config = ConfigurationObj()
+    with _mirror_lock:
+        if not _mirror_initialized:
+            if config.get_item("ENABLED", profile="MIRROR", default="False").strip().lower() == "true":
+                _mirror = _create_mirror(config)
+            _mirror_initialized = True
+    if _mirror is not None:
+        _mirror.sync_if_stale(timedelta(seconds=int(config.get_item("MAX_STALENESS_SECONDS", profile="MIRROR", default="60"))))
+    return _mirror
+
+
+def _create_mirror(config: ConfigurationObj) -> Mirror:
+    return Mirror(
+        path=config.get_item("PATH", profile="MIRROR", default="mirror.sqlite3"),
+        lookback=timedelta(seconds=int(config.get_item("LOOKBACK_SECONDS", profile="MIRROR", default="86400")))
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Sync the local analytical mirror. See the [MIRROR] section of app.conf.ini.")
+    parser.parse_args()
+
+    _create_mirror(ConfigurationObj()).sync()
@@ -0,0 +1,141 @@
+"""
+Parsing of OPERA, HLS and Sentinel-1 product identifiers.
+
+An ID is parsed once, with precompiled patterns, into a compact `ProductId` record. Parsed IDs are cached (see
+`PARSE_CACHE_SIZE`), since reports and joins parse the same IDs repeatedly (e.g. the granule ID of each file of a
+granule, or of each revision). Recurring components (product types, sensors, tiles and bursts) are interned, so that
+cached records share them.
+
+e.g.
+    HLS.L30.T22VEQ.2021248T143156.v2.0.B01.tif
+    S1A_IW_SLC__1SDV_20220501T015035_20220501T015102_043011_0522A4_42CC.zip
+    OPERA_L3_DSWx-HLS_T57NVH_20220117T000429Z_20220117T000429Z_S2A_30_v2.0
+    OPERA_L2_CSLC-S1_T064-135524-IW2_20220501T015035Z_20220501T015102Z_S1A_VV_v1.0
+"""
+import re
+import sys
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+PARSE_CACHE_SIZE = 65536
+"""Number of parsed IDs cached."""
+
+TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S"
+"""Format of the parsed acquisition timestamps, whatever the format in the ID."""
+
+_REVISION_SUFFIX = re.compile(r"-r(\d+)$")
+_HLS = re.compile(r"^HLS\.(?P<sensor>L30|S30)\.(?P<tile_id>T\w{5})\.(?P<acquisition_ts>\d{7}T\d{6})\.v(?P<version>\d+\.\d+)")
+_SLC = re.compile(r"^(?P<platform>S1[A-D])_\w\w_SLC__1S\w\w_(?P<acquisition_ts>\d{8}T\d{6})_(?P<acquisition_end_ts>\d{8}T\d{6})_\d{6}_[0-9A-F]{6}_[0-9A-F]{4}")
+_OPERA = re.compile(r"^OPERA_(?P<level>L\d)_(?P<name>DSWx|CSLC|RTC|DISP)[-_](?P<source>HLS|S1)")
+_OPERA_TILE_ID = re.compile(r"_(T\d{2}[A-Z]{3})_")
+_OPERA_BURST_ID = re.compile(r"_(T\d{3}-\d{6}-IW[1-3])_")
+_OPERA_ACQUISITION_TS = re.compile(r"_(\d{8}T\d{6})Z?_")
+_OPERA_PLATFORM = re.compile(r"_(S1[A-D]|S2[A-D]|L8|L9)(?=_|$)")
+_OPERA_VERSION = re.compile(r"_v(\d+\.\d+)")
+
+_HLS_SENSORS = {"L30": "LANDSAT", "S30": "SENTINEL"}
+_PLATFORM_SENSORS = {
+    "S1A": "SENTINEL", "S1B": "SENTINEL", "S1C": "SENTINEL", "S1D": "SENTINEL",
+    "S2A": "SENTINEL", "S2B": "SENTINEL", "S2C": "SENTINEL", "S2D": "SENTINEL",
+    "L8": "LANDSAT", "L9": "LANDSAT"
+}
+
+
+class ProductId:
+    """A parsed product ID. Records are cached and shared, so treat them as read-only."""
+    __slots__ = ("id", "product_type", "sensor", "platform", "tile_id", "burst_id", "acquisition_ts", "acquisition_end_ts", "version", "revision")
+
+    def __init__(
+            self,
+            id: str,
+            product_type: str,
+            sensor: Optional[str] = None,
+            platform: Optional[str] = None,
+            tile_id: Optional[str] = None,
+            burst_id: Optional[str] = None,
+            acquisition_ts: Optional[str] = None,
+            acquisition_end_ts: Optional[str] = None,
+            version: Optional[str] = None,
+            revision: Optional[int] = None):
+        """
+        :param id: the granule or product ID, without revision suffix, file extension or band
+        :param product_type: e.g. L2_HLS_L30, L1_S1_SLC, L3_DSWX_HLS (see `metadata.INPUT_PRODUCT_TYPE_TO_SDS_PRODUCT_TYPE`)
+        :param sensor: LANDSAT or SENTINEL
+        :param platform: the satellite, e.g. S1A, S2B, L8. None for HLS granules.
+        :param tile_id: the MGRS tile, e.g. T22VEQ
+        :param burst_id: the Sentinel-1 burst, e.g. T064-135524-IW2
+        :param acquisition_ts: the acquisition (or sensing start) time, formatted as `TIMESTAMP_FORMAT`
+        :param acquisition_end_ts: the sensing stop time of an SLC, formatted as `TIMESTAMP_FORMAT`
+        :param version: e.g. 2.0
+        :param revision: the revision number suffix (e.g. "-r1") of the document ID
+        """
+        self.id = id
+        self.product_type = product_type
+        self.sensor = sensor
+        self.platform = platform
+        self.tile_id = tile_id
+        self.burst_id = burst_id
+        self.acquisition_ts = acquisition_ts
+        self.acquisition_end_ts = acquisition_end_ts
+        self.version = version
+        self.revision = revision
+
+    def __repr__(self):
+        return f"ProductId({', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)})"
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse(id_: str) -> ProductId:
+    """
+    Parses an HLS granule, SLC or OPERA SDS product ID (or file name), with or without revision suffix.
+
+    :raises Exception: when the ID isn't of a known format
+    """
+    revision_match = _REVISION_SUFFIX.search(id_)
+    base_id, revision = (id_[:revision_match.start()], int(revision_match.group(1))) if revision_match else (id_, None)
+
+    match = _HLS.match(base_id)
+    if match:
+        return ProductId(
+            id=match.group(0),
+            product_type=sys.intern(f"L2_HLS_{match['sensor']}"),
+            sensor=_HLS_SENSORS[match["sensor"]],
+            tile_id=sys.intern(match["tile_id"]),
+            acquisition_ts=datetime.strptime(match["acquisition_ts"], "%Y%jT%H%M%S").strftime(TIMESTAMP_FORMAT),
+            version=sys.intern(match["version"]),
+            revision=revision
+        )
+
+    match = _SLC.match(base_id)
+    if match:
+        return ProductId(
+            id=match.group(0),
+            product_type="L1_S1_SLC",
+            sensor=_PLATFORM_SENSORS[match["platform"]],
+            platform=sys.intern(match["platform"]),
+            acquisition_ts=match["acquisition_ts"],
+            acquisition_end_ts=match["acquisition_end_ts"],
+            revision=revision
+        )
+
+    match = _OPERA.match(base_id)
+    if match:
+        tile_id = _OPERA_TILE_ID.search(base_id)
+        burst_id = _OPERA_BURST_ID.search(base_id)
+        acquisition_ts = _OPERA_ACQUISITION_TS.search(base_id)
+        platform = _OPERA_PLATFORM.search(base_id)
+        version = _OPERA_VERSION.search(base_id)
+        return ProductId(
+            id=base_id,
+            product_type=sys.intern(f"{match['level']}_{match['name'].upper()}_{match['source']}"),
+            sensor=_PLATFORM_SENSORS[platform.group(1)] if platform else None,
+            platform=sys.intern(platform.group(1)) if platform else None,
+            tile_id=sys.intern(tile_id.group(1)) if tile_id else None,
+            burst_id=sys.intern(burst_id.group(1)) if burst_id else None,
+            acquisition_ts=acquisition_ts.group(1) if acquisition_ts else None,
+            version=sys.intern(version.group(1)) if version else None,
+            revision=revision
+        )
+
+    raise Exception(f"Unable to parse product ID. {id_=}")
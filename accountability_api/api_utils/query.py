@@ -1,18 +1,38 @@
 import logging
 import traceback
-from typing import Union, List, Dict, Tuple, Optional
+from contextlib import contextmanager
+from typing import Union, List, Dict, Tuple, Optional, Iterable, Iterator, Callable, Hashable
 
+import pyarrow as pa
+import pyarrow.compute as pc
 from elasticsearch.exceptions import NotFoundError
 from hysds_commons.elasticsearch_utils import ElasticsearchUtility
 from more_itertools import always_iterable
 
-from accountability_api import es_connection
+from accountability_api import es_connection, metrics, tracing
 from accountability_api.api_utils import JOBS_ES
+from accountability_api.api_utils import index_resolver
 from accountability_api.api_utils import metadata as consts
 
 LOGGER = logging.getLogger()
 
 
+@contextmanager
+def _observe_es(operation: str, index: Union[str, List[str], None]) -> Iterator[Callable[[Dict], None]]:
+    """
+    Helper method that times and traces the Elasticsearch request within the context.
+    See `metrics.observe_es` and `tracing.span`.
+
+    :return: a function that records the hits of the given Elasticsearch result
+    """
+    with metrics.observe_es(operation, index) as record_hits, \
+            tracing.span(f"elasticsearch.{operation}", index=str(index)) as span:
+        def record(result: Dict):
+            record_hits(result)
+            span.set_attribute("hits", len(result.get("hits", {}).get("hits", [])))
+        yield record
+
+
 def run_query(
     es: Optional[ElasticsearchUtility] = None,
     body: Optional[Dict] = None,
@@ -25,10 +45,13 @@ def run_query(
     es = es or es_connection.get_grq_es()
     es = es.es or es_connection.get_grq_es().es
 
-    if sort:
-        return es.search(index=index, body=body, doc_type=doc_type, sort=sort, size=size, params=kwargs)
-    else:
-        return es.search(index=index, body=body, doc_type=doc_type, size=size, params=kwargs)
+    with _observe_es("search", index) as record_hits:
+        if sort:
+            result = es.search(index=index, body=body, doc_type=doc_type, sort=sort, size=size, params=kwargs)
+        else:
+            result = es.search(index=index, body=body, doc_type=doc_type, size=size, params=kwargs)
+        record_hits(result)
+    return result
 
 
 def run_query_with_scroll(
@@ -81,7 +104,9 @@ def run_query_with_scroll(
         params["body"] = body
         pass
     params.update(kwargs)  # copy all other arguments.
-    primary_result = es.search(**params)  # initial result.
+    with _observe_es("search", index) as record_hits:
+        primary_result = es.search(**params)  # initial result.
+        record_hits(primary_result)
     total_size = primary_result["hits"]["total"]["value"]
     if size != -1:  # caller only wants some results
         total_size = size  # updating the target size
@@ -93,7 +118,9 @@ def run_query_with_scroll(
         return primary_result
 
     while current_size < total_size:  # need to scroll
-        scrolled_result = es.scroll(scroll_id=scroll_id, scroll=scroll_timeout)
+        with _observe_es("scroll", index) as record_hits:
+            scrolled_result = es.scroll(scroll_id=scroll_id, scroll=scroll_timeout)
+            record_hits(scrolled_result)
         scroll_id = scrolled_result["_scroll_id"]
         scrolled_result_size = len(scrolled_result["hits"]["hits"])
         if scrolled_result_size == 0:
@@ -107,6 +134,47 @@ def run_query_with_scroll(
     return primary_result
 
 
+def iter_hit_pages(
+    es: Optional[ElasticsearchUtility] = None,
+    body: Optional[Dict] = None,
+    index=consts.PRODUCTS_INDEX,
+    page_size=10000,
+    **kwargs
+) -> Iterator[List[Dict]]:
+    """
+    Scrolls the result set, yielding one page of hits at a time instead of accumulating every hit in memory.
+    See `run_query_with_scroll`.
+
+    :param es:
+    :param body:
+    :param index:
+    :param page_size: number of hits per page (and per scroll request)
+    :param kwargs: additional Elasticsearch search arguments
+    :return: an iterator over lists of hits
+    """
+    es = es or es_connection.get_grq_es()
+    if hasattr(es, "es"):
+        es = es.es
+
+    scroll_timeout = "30s"
+    with _observe_es("search", index) as record_hits:
+        result = es.search(index=index, body=body, size=page_size, scroll=scroll_timeout, **kwargs)
+        record_hits(result)
+    scroll_id = result.get("_scroll_id")
+    try:
+        while result["hits"]["hits"]:
+            yield result["hits"]["hits"]
+            if not scroll_id:
+                break
+            with _observe_es("scroll", index) as record_hits:
+                result = es.scroll(scroll_id=scroll_id, scroll=scroll_timeout)
+                record_hits(result)
+            scroll_id = result.get("_scroll_id", scroll_id)
+    finally:
+        if scroll_id:
+            es.clear_scroll(scroll_id=scroll_id, ignore=(404,))
+
+
 def construct_range_object(field, start_value=None, stop_value=None, inclusive=True):
     """
     making the existing method public.
@@ -398,6 +466,197 @@ def get_product(product_id: str, index=consts.PRODUCTS_INDEX):
         return None
 
 
+def probe_indexes(
+    index_to_fields: Dict[str, Tuple[List[str], List[str]]]
+) -> Dict[str, Tuple[int, Dict[str, Optional[float]], Dict[str, Dict[str, int]]]]:
+    """
+    Cheaply probes the given indexes for changes, with a single multi-search of size 0 aggregations.
+
+    :param index_to_fields: map of index patterns to the timestamp fields and the status (keyword) fields tracking
+                            changes to their docs
+    :return: map of index patterns to their doc count, the max of each timestamp field (None when empty) and the doc
+             count per value of each status field
+    :raises Exception: when any index could not be probed
+    """
+    es = es_connection.get_grq_es().es
+
+    body = []
+    for index, (timestamp_fields, status_fields) in index_to_fields.items():
+        aggs = {}
+        for timestamp_field in timestamp_fields:
+            aggs[f"max_{timestamp_field}"] = {"max": {"field": timestamp_field}}
+        for status_field in status_fields:
+            aggs[f"count_{status_field}"] = {"terms": {"field": f"{status_field}.keyword", "size": 100}}
+        body.append({"index": index, "ignore_unavailable": True, "allow_no_indices": True})
+        body.append({"size": 0, "track_total_hits": True, "aggs": aggs})
+
+    with _observe_es("msearch", list(index_to_fields)):
+        result = es.msearch(body=body)
+
+    states = {}
+    for (index, (timestamp_fields, status_fields)), response in zip(index_to_fields.items(), result["responses"]):
+        if "error" in response:
+            raise Exception(f"Failed to probe index. {index=}, error={response['error']}")
+        aggregations = response["aggregations"]
+        states[index] = (
+            response["hits"]["total"]["value"],
+            {field: aggregations[f"max_{field}"]["value"] for field in timestamp_fields},
+            {
+                field: {bucket["key"]: bucket["doc_count"] for bucket in aggregations[f"count_{field}"]["buckets"]}
+                for field in status_fields
+            }
+        )
+    return states
+
+
+def get_index_write_counts(index_patterns: List[str]) -> Dict[str, Tuple[int, int]]:
+    """
+    Gets the number of write operations on the primary shards of the indexes matching the given patterns, with a single
+    `_stats/indexing` request. Every index (or update) and delete of a doc increments them, including in-place updates
+    that change neither the doc count nor any timestamp. The counts restart from 0 when a shard is reallocated.
+
+    :param index_patterns: the index patterns
+    :return: map of the matching indexes to their index (including update) and delete operation totals
+    """
+    es = es_connection.get_grq_es().es
+
+    with _observe_es("indices.stats", index_patterns):
+        result = es.indices.stats(index=",".join(index_patterns), metric="indexing", ignore_unavailable=True, allow_no_indices=True)
+
+    return {
+        index: (index_stats["primaries"]["indexing"]["index_total"], index_stats["primaries"]["indexing"]["delete_total"])
+        for index, index_stats in result.get("indices", {}).items()
+    }
+
+
+def get_date_histograms(
+    searches: Dict[Hashable, Tuple[Union[str, List[str]], str]],
+    start: str,
+    end: str,
+    interval: str,
+    sum_field="metadata.FileSize",
+    cumulative=False
+) -> Dict[Hashable, List[Dict]]:
+    """
+    Counts docs per time interval, for several searches at once, with a single multi-search of `date_histogram` aggregations.
+
+    :param searches: map of keys to the index pattern(s) to search, and the timestamp field to bucket docs by
+    :param start: the start of the time range
+    :param end: the end of the time range
+    :param interval: a fixed interval, e.g. "1h". See the `fixed_interval` of Elasticsearch `date_histogram` aggregations.
+    :param sum_field: numeric field summed per interval
+    :param cumulative: also compute the cumulative doc count, over the buckets up to and including each bucket
+                       (a `cumulative_sum` pipeline aggregation)
+    :return: map of keys to their buckets, in time order. Each bucket has the interval start ("timestamp", epoch
+             milliseconds), the doc count, the sum of `sum_field` and, when requested, the cumulative doc count
+             ("cumulative_count"). Intervals without docs are included.
+    """
+    es = es_connection.get_grq_es().es
+
+    body = []
+    for indexes, timestamp_field in searches.values():
+        body.append({"index": ",".join(always_iterable(indexes)), "ignore_unavailable": True, "allow_no_indices": True})
+        body.append({
+            "size": 0,
+            "query": {"bool": {"filter": [{"range": {timestamp_field: {"gte": start, "lte": end}}}]}},
+            "aggs": {
+                "histogram": {
+                    "date_histogram": {
+                        "field": timestamp_field,
+                        "fixed_interval": interval,
+                        "min_doc_count": 0,
+                        "extended_bounds": {"min": start, "max": end}
+                    },
+                    "aggs": {
+                        "sum": {"sum": {"field": sum_field}},
+                        **({"cumulative_count": {"cumulative_sum": {"buckets_path": "_count"}}} if cumulative else {})
+                    }
+                }
+            }
+        })
+
+    with _observe_es("msearch", [index for indexes, _ in searches.values() for index in always_iterable(indexes)]):
+        result = es.msearch(body=body)
+
+    histograms = {}
+    for key, response in zip(searches, result["responses"]):
+        if "error" in response:
+            raise Exception(f"Failed to get date histogram. {key=}, error={response['error']}")
+        histograms[key] = [
+            {
+                "timestamp": bucket["key"],
+                "count": bucket["doc_count"],
+                "sum": bucket["sum"]["value"] or 0,
+                **({"cumulative_count": int(bucket["cumulative_count"]["value"])} if cumulative else {})
+            }
+            for bucket in response["aggregations"]["histogram"]["buckets"]
+        ]
+    return histograms
+
+
+def get_field_stats(
+    index_dict: Dict[str, Union[str, List[str]]],
+    field: str,
+    group_field: str,
+    start=None,
+    end=None,
+    runtime_mappings: Optional[Dict] = None,
+    percents: Iterable[float] = (50,),
+    exists_field: Optional[str] = None
+) -> Dict[str, Dict[object, Dict]]:
+    """
+    Computes statistics of a numeric field per value of a group field, for several index patterns at once, with a single
+    multi-search of `terms` aggregations. Only the statistics are transferred, not the docs.
+
+    :param index_dict: map of keys to the index pattern(s) to search. Docs are filtered by `creation_timestamp`.
+    :param field: the numeric field. May be a runtime field defined in `runtime_mappings`.
+    :param group_field: the (keyword) field to group docs by
+    :param runtime_mappings: runtime fields, computed at search time. Requires Elasticsearch 7.11+.
+    :param percents: the percentiles to compute. Elasticsearch percentiles are approximate (TDigest).
+    :param exists_field: also count the docs of each group where this field exists, e.g. to check that `field` was
+                         computed for all the docs that should have it
+    :return: map of keys to maps of group values to their doc count ("doc_count"), the stats of `field` ("count", "min",
+             "max", "avg", "sum"), the percentiles ("percentiles", map of percents to values) and the count of docs
+             with `exists_field` ("exists_count")
+    :raises Exception: when any index pattern could not be searched, e.g. when a runtime field script fails
+    """
+    es = es_connection.get_grq_es().es
+
+    sub_aggs = {
+        "stats": {"stats": {"field": field}},
+        "percentiles": {"percentiles": {"field": field, "percents": list(percents)}},
+    }
+    if exists_field:
+        sub_aggs["exists"] = {"filter": {"exists": {"field": exists_field}}}
+
+    body = []
+    for indexes in index_dict.values():
+        search = add_range_filter(query={"query": {"bool": {"must": []}}}, time_key="creation_timestamp", start=start, stop=end) if start and end else {}
+        search.update({"size": 0, "aggs": {"groups": {"terms": {"field": group_field, "size": 1000}, "aggs": sub_aggs}}})
+        if runtime_mappings:
+            search["runtime_mappings"] = runtime_mappings
+        body.append({"index": ",".join(always_iterable(indexes)), "ignore_unavailable": True, "allow_no_indices": True})
+        body.append(search)
+
+    with _observe_es("msearch", [index for indexes in index_dict.values() for index in always_iterable(indexes)]):
+        result = es.msearch(body=body)
+
+    field_stats = {}
+    for key, response in zip(index_dict, result["responses"]):
+        if "error" in response:
+            raise Exception(f"Failed to get field stats. {key=}, error={response['error']}")
+        field_stats[key] = {
+            bucket["key"]: {
+                "doc_count": bucket["doc_count"],
+                **bucket["stats"],
+                "percentiles": {float(percent): value for percent, value in bucket["percentiles"]["values"].items()},
+                **({"exists_count": bucket["exists"]["doc_count"]} if exists_field else {}),
+            }
+            for bucket in response["aggregations"]["groups"]["buckets"]
+        }
+    return field_stats
+
+
 def get_num_docs_in_index(
         index,
         start=None,
@@ -425,18 +684,20 @@ def get_num_docs_in_index(
     return result
 
 
-def get_docs_in_index(index: str, size=-1, start=None, end=None, time_key=None, **kwargs) -> Tuple[List[Dict], int]:
+def _construct_docs_query(index: str, start, end, kwargs: Dict) -> Dict:
     """
-    Get docs within particular index between a certain time range
-    :param index:
-    :param start:
-    :param end:
-    :param size:
-    :return:
+    Helper method that returns the query body for getting docs within an index between a certain time range.
+
+    NOTE: query-only arguments (e.g. `metadata_tile_id`) are removed from the given kwargs
+    so that they are not passed as Elasticsearch client properties downstream.
     """
     query = {}
     if start and end:
-        query = {"query": {"bool": {"must": [{"match": {"_index": index}}]}}}
+        if "," in index:
+            # multi-index expression. the search itself is already restricted to the matching indexes
+            query = {"query": {"bool": {"must": []}}}
+        else:
+            query = {"query": {"bool": {"must": [{"match": {"_index": index}}]}}}
 
         if index in consts.ACCOUNTABILITY_INDEXES:
             query = add_range_filter(
@@ -465,6 +726,24 @@ def get_docs_in_index(index: str, size=-1, start=None, end=None, time_key=None,
             query = add_query_match(query=query, field_name="metadata.sensor.keyword", value=kwargs["metadata_sensor"])
         # removing from kwargs so this is not passed as an Elasticsearch client property downstream.
         del kwargs['metadata_sensor']
+    return query
+
+
+def get_docs_in_index(index: str, size=-1, start=None, end=None, time_key=None, **kwargs) -> Tuple[List[Dict], int]:
+    """
+    Get docs within particular index between a certain time range
+    :param index:
+    :param start:
+    :param end:
+    :param size:
+    :return:
+    """
+    query = _construct_docs_query(index, start, end, kwargs)
+
+    index = _resolve_index(index, start, end, kwargs)
+    if not index:
+        # no index can contain docs in the time range
+        return [], 0
 
     result = run_query_with_scroll(index=index, size=size, body=query, **kwargs)
     total = result.get("hits").get("total").get("value")
@@ -474,6 +753,24 @@ def get_docs_in_index(index: str, size=-1, start=None, end=None, time_key=None,
     return docs, total
 
 
+def _resolve_index(index: str, start, end, kwargs: Dict) -> str:
+    """
+    Helper method that narrows the index pattern down to the indexes that may contain docs between a certain time range.
+    See `IndexResolver`.
+
+    NOTE: when pruned, `ignore_unavailable` is added to the given kwargs, as resolved indexes may since have been deleted.
+    """
+    if index in consts.ACCOUNTABILITY_INDEXES.values():
+        # filtered by a different time key
+        return index
+
+    resolved = index_resolver.get_index_resolver().resolve(index, start, end)
+    if resolved != index:
+        LOGGER.debug(f"Resolved index. {index=}, {resolved=}")
+        kwargs.setdefault("ignore_unavailable", True)
+    return resolved
+
+
 def map_doc_to_source(doc: dict):
     source: dict = doc["_source"]
     source.update({"_id": doc["_id"]})
@@ -500,6 +797,209 @@ def get_docs(indexes: Union[str, List[str]], start=None, end=None, source=None,
     return docs
 
 
+BASE_ID_FIELD = "base_id"
+BASE_ID_RUNTIME_MAPPINGS = {
+    BASE_ID_FIELD: {
+        "type": "keyword",
+        "script": {
+            # the `id` without a revision number suffix (e.g. "-r1"). See `utils.split_revision`.
+            "source": """
+                if (!doc.containsKey('id') || doc['id'].size() == 0) {
+                    return;
+                }
+                String id = doc['id'].value;
+                int i = id.lastIndexOf('-r');
+                if (i > 0 && i + 2 < id.length()) {
+                    for (int j = i + 2; j < id.length(); j++) {
+                        if (!Character.isDigit(id.charAt(j))) {
+                            emit(id);
+                            return;
+                        }
+                    }
+                    emit(id.substring(0, i));
+                    return;
+                }
+                emit(id);
+            """
+        }
+    }
+}
+"""Base ID of revisioned datasets, as an Elasticsearch runtime field."""
+
+
+def get_latest_revisions(indexes: Union[str, List[str]], start=None, end=None, page_size=1000, **kwargs) -> List[Dict]:
+    """
+    Counterpart of `get_docs` for revisioned datasets (IDs suffixed with e.g. "-r1"). Only the latest revision (by
+    `creation_timestamp`) of each dataset is retrieved, by a `composite` aggregation over the base ID runtime field with
+    a `top_hits` sub-aggregation, so that earlier revisions are neither transferred nor collapsed client-side.
+    Requires Elasticsearch 7.11+.
+
+    NOTE: the base ID is computed by a script for every matching doc on every page, as runtime fields aren't indexed, so
+    the cost grows with the number of datasets times the number of pages. Prefer `get_docs` for large time ranges of
+    datasets with few revisions. See `tests/benchmark/test_reports.py::test_latest_revisions`.
+
+    :param indexes: a single index name or list of index names
+    :param page_size: number of datasets per request
+    :return: the latest revision of each dataset created within the time range
+    """
+    es = es_connection.get_grq_es().es
+
+    docs = []
+    for partial in always_iterable(indexes):
+        search_kwargs = dict(kwargs)
+        query = _construct_docs_query(partial, start, end, search_kwargs)
+        partial = _resolve_index(partial, start, end, search_kwargs)
+        if not partial:
+            continue
+
+        body = {
+            **query,
+            "size": 0,
+            "runtime_mappings": BASE_ID_RUNTIME_MAPPINGS,
+            "aggs": {
+                "datasets": {
+                    "composite": {"size": page_size, "sources": [{BASE_ID_FIELD: {"terms": {"field": BASE_ID_FIELD}}}]},
+                    "aggs": {"latest": {"top_hits": {"size": 1, "sort": [{"creation_timestamp": {"order": "desc"}}]}}}
+                }
+            }
+        }
+        while True:
+            with _observe_es("search", partial):
+                result = es.search(index=partial, body=body, **search_kwargs)
+            buckets = result["aggregations"]["datasets"]["buckets"]
+            docs.extend(map_doc_to_source(bucket["latest"]["hits"]["hits"][0]) for bucket in buckets)
+            if len(buckets) < page_size:
+                break
+            body["aggs"]["datasets"]["composite"]["after"] = result["aggregations"]["datasets"]["after_key"]
+    return docs
+
+
+def hits_to_record_batches(hit_pages: Iterable[List[Dict]], schema: pa.Schema) -> Iterator[pa.RecordBatch]:
+    """
+    Converts pages of Elasticsearch hits to Arrow record batches, one batch per page.
+
+    The schema declares the fields to extract. Field names are dot-separated paths into `_source` (e.g. "metadata.FileName"),
+    or one of the hit fields "_id" and "_index". Missing values become nulls.
+    Timestamp fields are parsed from ISO-like datetime strings (as stored in Elasticsearch).
+
+    Unlike `map_doc_to_source`, hits are not modified and no intermediate per-document dicts are created.
+
+    :param hit_pages: an iterable over lists of hits. See `iter_hit_pages`.
+    :param schema: the declared field schema
+    :return: an iterator over record batches with the given schema
+    """
+    hit_fields = [field for field in schema if field.name in ("_id", "_index")]
+    source_fields = [field for field in schema if field.name not in ("_id", "_index")]
+    source_type = _to_struct_type(source_fields)
+
+    for hits in hit_pages:
+        columns = {field.name: pa.array([hit.get(field.name) for hit in hits], type=field.type) for field in hit_fields}
+
+        sources = pa.array([hit.get("_source") for hit in hits], type=source_type)
+        for field in source_fields:
+            column = pc.struct_field(sources, _struct_field_indices(source_type, field.name))
+            if pa.types.is_timestamp(field.type):
+                column = _parse_timestamps(column, field.type)
+            columns[field.name] = column
+
+        yield pa.RecordBatch.from_arrays([columns[field.name] for field in schema], schema=schema)
+
+
+def get_docs_table(indexes: Union[str, List[str]], schema: pa.Schema, start=None, end=None, size=-1, **kwargs) -> pa.Table:
+    """
+    Columnar counterpart of `get_docs`.
+    Get docs within particular indexes between a certain time range as an Arrow table with the given schema.
+    Only the `_source` fields declared in the schema are retrieved.
+
+    See `hits_to_record_batches`.
+
+    :param size: maximum number of docs per index, as in `get_docs`. All docs are retrieved when -1.
+    """
+    source_includes = [field.name for field in schema if field.name not in ("_id", "_index")]
+
+    batches = []
+    for partial in always_iterable(indexes):
+        search_kwargs = dict(kwargs)
+        query = _construct_docs_query(partial, start, end, search_kwargs)
+        partial = _resolve_index(partial, start, end, search_kwargs)
+        if not partial:
+            continue
+        if size is not None and size != -1:
+            search_kwargs["page_size"] = min(size, 10000)
+        hit_pages = iter_hit_pages(index=partial, body=query, _source_includes=source_includes, **search_kwargs)
+        if size is not None and size != -1:
+            hit_pages = _limit_hits(hit_pages, size)
+        batches.extend(hits_to_record_batches(hit_pages, schema))
+    return pa.Table.from_batches(batches, schema=schema)
+
+
+def _limit_hits(hit_pages: Iterator[List[Dict]], size: int) -> Iterator[List[Dict]]:
+    """Helper method that truncates the pages of hits to the first `size` hits, and stops scrolling."""
+    remaining = size
+    try:
+        for hits in hit_pages:
+            if remaining <= 0:
+                break
+            yield hits[:remaining]
+            remaining -= len(hits)
+    finally:
+        hit_pages.close()
+
+
+def _to_struct_type(fields: List[pa.Field]) -> pa.StructType:
+    """
+    Helper method that converts a list of fields with dot-separated names to a nested struct type.
+    Timestamp fields are declared as strings, to be parsed after extraction.
+    """
+    tree = {}
+    for field in fields:
+        *parents, leaf = field.name.split(".")
+        node = tree
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = pa.string() if pa.types.is_timestamp(field.type) else field.type
+
+    def to_type(node):
+        return pa.struct([(name, to_type(child) if isinstance(child, dict) else child) for name, child in node.items()])
+    return to_type(tree)
+
+
+def _struct_field_indices(struct_type: pa.StructType, dotted_name: str) -> List[int]:
+    indices = []
+    for name in dotted_name.split("."):
+        i = struct_type.get_field_index(name)
+        indices.append(i)
+        struct_type = struct_type.field(i).type
+    return indices
+
+
+def _parse_timestamps(column: pa.Array, timestamp_type: pa.TimestampType) -> pa.Array:
+    # Arrow expects ISO 8601 strings without a zone designator for timestamps without a time zone
+    column = pc.replace_substring_regex(column, pattern=r"(Z|[+-]00:?00)$", replacement="")
+    return pc.cast(column, timestamp_type)
+
+
+def plan_index_expression(index_dict: Dict[str, Union[str, List[str]]]) -> str:
+    """
+    Merges the index patterns of the given map of names to indexes into a single multi-index expression
+    (comma-separated), so that the indexes can be searched with a single request.
+    Patterns shared by several entries (e.g. "L2_RTC_S1" inputs and products) are included once, in first-seen order.
+
+    Pair the expression with the `ignore_unavailable` and `allow_no_indices` search arguments
+    so that patterns without any matching index do not fail the search.
+
+    :param index_dict: map of names to an index pattern or list of index patterns
+    :return: the multi-index expression
+    """
+    patterns = dict.fromkeys(
+        pattern
+        for indexes in index_dict.values()
+        for pattern in always_iterable(indexes)
+        if pattern
+    )
+    return ",".join(patterns)
+
+
 def get_num_docs(index_dict: Dict, start=None, end=None, **kwargs):
     docs_count = {}
     for name in index_dict:
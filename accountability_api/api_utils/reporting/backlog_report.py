@@ -0,0 +1,202 @@
+import tempfile
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import pandas as pd
+from flask import current_app
+from pandas import DataFrame
+
+from accountability_api import metrics
+from accountability_api.api_utils import columnar, query, metadata, utils
+from accountability_api.api_utils.reporting.report import Report
+from accountability_api.api_utils.reporting.report_util import to_json_report
+
+AUTO_INTERVALS = ["1h", "6h", "1d", "7d"]
+"""Intervals picked from (the smallest within `MAX_BUCKETS`) when the report interval is not given."""
+MAX_BUCKETS = 1000
+"""Upper bound on the number of buckets per SDS product type."""
+
+
+class BacklogReport(Report):
+    """
+    Input granules received versus SDS products produced over time, per SDS product type, to spot processing backlogs.
+
+    Arrivals (incoming products of all the input product types producing the SDS product type, see
+    `metadata.INPUT_PRODUCT_TYPE_TO_SDS_PRODUCT_TYPE`, by creation time) and completions (SDS products, by creation time)
+    are counted per interval, and accumulated over the report's time range, by Elasticsearch `date_histogram` and `cumulative_sum`
+    aggregations in a single multi-search. No documents are fetched, so that multi-month time ranges are cheap.
+    The backlog is the difference between the cumulative arrivals and completions.
+
+    NOTE: an input granule may produce several SDS products (e.g. one SLC yields the RTC products of many bursts),
+    and the backlog at the start of the time range is not accounted for. Compare backlog trends, rather than values.
+    """
+
+    def __init__(self, title, start_date, end_date, timestamp, **kwargs):
+        super().__init__(title, start_date, end_date, timestamp, **kwargs)
+        self._report_options = kwargs.get("report_options") or {}
+
+    def generate_report(self, output_format=None, report_type=None):
+        current_app.logger.info(f"Generating report. {output_format=}, {self.__dict__=}")
+
+        report_df = self.query_report_df()
+
+        if output_format == "text/csv":
+            with metrics.report_phase("BacklogReport", "render"):
+                report_csv = self.add_header_to_csv(report_df.to_csv(index=False))
+            with metrics.report_phase("BacklogReport", "serialize") as span:
+                tmp_report_csv = tempfile.NamedTemporaryFile(suffix=".csv", dir=".", delete=True)
+                span.set_attribute("bytes", tmp_report_csv.write(report_csv.encode("utf-8")))
+                tmp_report_csv.flush()
+            return tmp_report_csv
+        elif output_format == "application/json" or output_format == "json":
+            with metrics.report_phase("BacklogReport", "serialize"):
+                return to_json_report(self.get_header(), report_df)
+        elif output_format in columnar.COLUMNAR_MIMETYPES:
+            with metrics.report_phase("BacklogReport", "render"):
+                report_df = columnar.to_typed_df(
+                    report_df,
+                    datetime_columns=["timestamp"],
+                    count_columns=["arrivals", "completions", "cumulative_arrivals", "cumulative_completions", "backlog"]
+                )
+            with metrics.report_phase("BacklogReport", "serialize"):
+                return columnar.write_columnar(report_df, output_format, metadata=self.get_header())
+        elif output_format == "text/xml":
+            with metrics.report_phase("BacklogReport", "render"):
+                return report_df.to_xml()
+        elif output_format == "text/html":
+            with metrics.report_phase("BacklogReport", "render"):
+                return report_df.to_html()
+        else:
+            raise Exception(f"output format ({output_format}) is not supported.")
+
+    def get_interval(self) -> str:
+        """:return: the report interval, as given in the report options, or the smallest of `AUTO_INTERVALS` within `MAX_BUCKETS`"""
+        duration = utils.from_iso_to_dt(self.end_datetime) - utils.from_iso_to_dt(self.start_datetime)
+
+        interval = self._report_options.get("interval")
+        if interval:
+            if duration / utils.parse_interval(interval) > MAX_BUCKETS:
+                raise Exception(f"Too many buckets. Use a larger interval or a shorter time range. {interval=}, max_buckets={MAX_BUCKETS}")
+            return interval
+        return next((i for i in AUTO_INTERVALS if duration / utils.parse_interval(i) <= MAX_BUCKETS), AUTO_INTERVALS[-1])
+
+    def query_report_df(self) -> DataFrame:
+        # several input product types may produce the same SDS product type (e.g. HLS L30 and S30 granules both produce
+        # DSWx-HLS products), so their arrivals are counted together, against the completions of the SDS product type
+        sds_product_type_to_input_product_types: Dict[str, List[str]] = {}
+        for input_product_type, sds_product_types in metadata.INPUT_PRODUCT_TYPE_TO_SDS_PRODUCT_TYPE.items():
+            if get_incoming_indexes(input_product_type) is None:
+                current_app.logger.warning(f"No incoming product indexes. Skipping. {input_product_type=}")
+                continue
+            for sds_product_type in sds_product_types:
+                sds_product_type_to_input_product_types.setdefault(sds_product_type, []).append(input_product_type)
+
+        searches = {}
+        for sds_product_type, input_product_types in sds_product_type_to_input_product_types.items():
+            incoming_indexes = [index for input_product_type in input_product_types for index in get_incoming_indexes(input_product_type)]
+            searches[("arrivals", sds_product_type)] = (incoming_indexes, "creation_timestamp")
+            searches[("completions", sds_product_type)] = (metadata.PRODUCT_TYPE_TO_INDEX[sds_product_type], "creation_timestamp")
+
+        with metrics.report_phase("BacklogReport", "aggregate") as span:
+            histograms = query.get_date_histograms(
+                searches,
+                start=self.start_datetime,
+                end=self.end_datetime,
+                interval=self.get_interval(),
+                cumulative=True
+            )
+            span.set_attribute("buckets", sum(len(buckets) for buckets in histograms.values()))
+
+        with metrics.report_phase("BacklogReport", "transform") as span:
+            rows = []
+            for sds_product_type, input_product_types in sds_product_type_to_input_product_types.items():
+                rows += BacklogReport.to_backlog_rows(
+                    ",".join(input_product_types), sds_product_type,
+                    arrivals=histograms[("arrivals", sds_product_type)],
+                    completions=histograms[("completions", sds_product_type)]
+                )
+            span.set_attribute("rows", len(rows))
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def to_backlog_rows(input_product_type: str, sds_product_type: str, arrivals: List[Dict], completions: List[Dict]) -> List[Dict]:
+        """
+        Joins the arrival and completion buckets of the given product types by time.
+        See `query.get_date_histograms`.
+        """
+        timestamp_to_completions = {bucket["timestamp"]: bucket for bucket in completions}
+        no_completions = {"count": 0, "cumulative_count": 0}
+
+        rows = []
+        for arrival in arrivals:
+            completion = timestamp_to_completions.get(arrival["timestamp"], no_completions)
+            rows.append({
+                "input_product_type": input_product_type,
+                "sds_product_type": sds_product_type,
+                "timestamp": utils.from_dt_to_iso(datetime.utcfromtimestamp(arrival["timestamp"] / 1000)),
+                "arrivals": arrival["count"],
+                "completions": completion["count"],
+                "cumulative_arrivals": arrival["cumulative_count"],
+                "cumulative_completions": completion["cumulative_count"],
+                "backlog": arrival["cumulative_count"] - completion["cumulative_count"],
+            })
+        return rows
+
+    def add_header_to_csv(self, report_csv):
+        header_str = ""
+        for line in self.get_header():
+            for k, v in line.items():
+                header_str += f"{k}: {v}\n"
+        return header_str + report_csv
+
+    def get_header(self) -> list[dict[str, str]]:
+        return [
+            {"Title": "OPERA Processing Backlog"},
+            {"Date of Report": datetime.fromisoformat(self._creation_time).strftime("%Y-%m-%dT%H:%M:%SZ")},
+            {"Period of Coverage (CreationTime)": f'{datetime.fromisoformat(self.start_datetime).strftime("%Y-%m-%dT%H:%M:%SZ")} - {datetime.fromisoformat(self.end_datetime).strftime("%Y-%m-%dT%H:%M:%SZ")}'},
+            {"Interval": self.get_interval()},
+        ]
+
+    def get_filename(self, output_format):
+        start_datetime_normalized = self.start_datetime.replace(":", "")
+        end_datetime_normalized = self.end_datetime.replace(":", "")
+
+        if output_format == "text/csv":
+            return f"backlog - {start_datetime_normalized} to {end_datetime_normalized}.csv"
+        elif output_format == "text/html":
+            return f"backlog - {start_datetime_normalized} to {end_datetime_normalized}.html"
+        elif output_format == "text/xml":
+            return f"backlog - {start_datetime_normalized} to {end_datetime_normalized}.xml"
+        elif output_format in ("application/json", "json"):
+            return f"backlog - {start_datetime_normalized} to {end_datetime_normalized}.json"
+        elif output_format in columnar.COLUMNAR_MIMETYPES:
+            return f"backlog - {start_datetime_normalized} to {end_datetime_normalized}.{columnar.FILE_EXTENSIONS[output_format]}"
+        else:
+            raise Exception(f"Output format not supported. {output_format=}")
+
+    def populate_data(self):
+        raise Exception
+
+    def get_data(self):
+        raise Exception
+
+    def to_json(self):
+        raise Exception
+
+    def get_dict_format(self):
+        raise Exception
+
+    def to_xml(self):
+        raise Exception
+
+    def to_csv(self):
+        raise Exception
+
+
+def get_incoming_indexes(input_product_type: str) -> Optional[List[str]]:
+    """
+    :return: the indexes of the incoming products of the given input product type (see `metadata.INCOMING_SDP_PRODUCTS`).
+             None when unknown.
+    """
+    # e.g. "L2_HLS_L30" is "HLS_L30" in INCOMING_SDP_PRODUCTS
+    return metadata.INCOMING_SDP_PRODUCTS.get(input_product_type) or metadata.INCOMING_SDP_PRODUCTS.get(input_product_type.removeprefix("L2_"))
@@ -4,6 +4,7 @@ import dateutil.parser
 from json2xml import json2xml
 from json2xml.utils import readfromstring
 
+from accountability_api import tracing
 from accountability_api.api_utils import utils
 from .daac_outgoing_products import DaacOutgoingProducts
 from .generated_sds_products import GeneratedSdsProducts
@@ -67,10 +68,14 @@ class DataAccountabilityReport(Report):
 
         reports = {}
 
-        reports["daac_outgoing_products"] = DOP_report._get_daac_outgoing_products()
-        reports["generated_sds_products"] = GSP_report._get_generated_products()
-        reports["incoming_nen_products"] = IFS_report._get_incoming_products()
-        reports["incoming_ancillary_products"] = IFA_report._get_incoming_products()
+        with tracing.span("DaacOutgoingProducts.populate_data"):
+            reports["daac_outgoing_products"] = DOP_report._get_daac_outgoing_products()
+        with tracing.span("GeneratedSdsProducts.populate_data"):
+            reports["generated_sds_products"] = GSP_report._get_generated_products()
+        with tracing.span("IncomingFiles.populate_data", report_type="sdp"):
+            reports["incoming_nen_products"] = IFS_report._get_incoming_products()
+        with tracing.span("IncomingFiles.populate_data", report_type="ancillary"):
+            reports["incoming_ancillary_products"] = IFA_report._get_incoming_products()
 
         self._total_incoming_data_file_num += (
             IFS_report._total_incoming_data_file_num
@@ -0,0 +1,318 @@
+import logging
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from flask import current_app
+from pandas import DataFrame
+
+from accountability_api import metrics
+from accountability_api.api_utils import columnar, query, metadata, product_id
+from accountability_api.api_utils.product_id import ProductId
+from accountability_api.api_utils.reporting.backlog_report import get_incoming_indexes
+from accountability_api.api_utils.reporting.report import Report
+from accountability_api.api_utils.reporting.report_util import to_json_report
+
+LOGGER = logging.getLogger()
+
+PAGE_SIZE = 10000
+"""Number of IDs fetched per Elasticsearch request, per side of a join. Bounds the memory used by a join."""
+
+PLATFORM_ACQUISITION_TS_FIELD = "platform_acquisition_ts"
+PLATFORM_ACQUISITION_TS_RUNTIME_MAPPINGS = {
+    PLATFORM_ACQUISITION_TS_FIELD: {
+        "type": "keyword",
+        "script": {
+            # the Sentinel-1 platform token and the first "yyyyMMddTHHmmss" token of the ID, e.g. "S1A_20220501T015035" for
+            # the sensing start of an SLC or the acquisition time of a burst product
+            "source": """
+                if (!doc.containsKey('id') || doc['id'].size() == 0) {
+                    return;
+                }
+                String platform = null;
+                String acquisitionTs = null;
+                for (String token : doc['id'].value.splitOnToken('_')) {
+                    if (platform == null && token.length() == 3 && token.startsWith('S1')) {
+                        platform = token;
+                    } else if (acquisitionTs == null && token.length() >= 15 && Character.isDigit(token.charAt(0)) && token.charAt(8) == (char) 'T') {
+                        acquisitionTs = token.substring(0, 15);
+                    }
+                }
+                if (platform != null && acquisitionTs != null) {
+                    emit(platform + '_' + acquisitionTs);
+                }
+            """
+        }
+    }
+}
+"""
+Platform and acquisition time parsed from the ID, as an Elasticsearch runtime field. IDs of burst products don't sort by
+time. Sorts as `slc_join_key`.
+"""
+
+
+@dataclass(frozen=True)
+class GapJoin:
+    """
+    Joins input granules with the SDS products produced from them. Both sides are streamed from Elasticsearch sorted by
+    `sort_field`, whose order must agree with the order of the join keys of the parsed IDs (see `product_id`).
+    """
+    input_product_type: str
+    sds_product_type: str
+    input_key: Callable[[ProductId], Tuple[Any, Any]]
+    """Maps an input granule to the (inclusive) range of the keys of its SDS products."""
+    product_key: Callable[[ProductId], Any]
+    """Maps an SDS product to its key."""
+    sort_field: str = "id"
+    runtime_mappings: Optional[Dict] = None
+    product_filter: Optional[Callable[[ProductId], bool]] = None
+    """Excludes SDS products not produced from this input product type. All are included when None."""
+
+
+def tile_join_key(parsed: ProductId) -> Tuple[str, str]:
+    # e.g. HLS.L30.T22VEQ.2021248T143156.v2.0 and OPERA_L3_DSWx-HLS_T22VEQ_20210905T143156Z_... -> ("T22VEQ", "20210905T143156")
+    return parsed.tile_id, parsed.acquisition_ts
+
+
+def slc_join_key(parsed: ProductId, acquisition_ts: str) -> str:
+    # e.g. S1A_IW_SLC__1SDV_20220501T015035_... and OPERA_L2_CSLC-S1_..._20220501T015035Z_..._S1A_VV_v1.0 -> "S1A_20220501T015035"
+    return f"{parsed.platform}_{acquisition_ts}"
+
+
+GAP_JOINS = [
+    GapJoin(
+        "L2_HLS_L30", "L3_DSWX_HLS",
+        input_key=lambda granule: (tile_join_key(granule), tile_join_key(granule)),
+        product_key=tile_join_key,
+        product_filter=lambda product: product.sensor == "LANDSAT"
+    ),
+    GapJoin(
+        "L2_HLS_S30", "L3_DSWX_HLS",
+        input_key=lambda granule: (tile_join_key(granule), tile_join_key(granule)),
+        product_key=tile_join_key,
+        product_filter=lambda product: product.sensor == "SENTINEL"
+    ),
+    # bursts are acquired by the platform of their SLC, within its sensing time range
+    GapJoin(
+        "L1_S1_SLC", "L2_CSLC_S1",
+        input_key=lambda granule: (slc_join_key(granule, granule.acquisition_ts), slc_join_key(granule, granule.acquisition_end_ts)),
+        product_key=lambda product: slc_join_key(product, product.acquisition_ts),
+        sort_field=PLATFORM_ACQUISITION_TS_FIELD,
+        runtime_mappings=PLATFORM_ACQUISITION_TS_RUNTIME_MAPPINGS,
+        product_filter=lambda product: product.platform is not None and product.acquisition_ts is not None
+    ),
+    GapJoin(
+        "L1_S1_SLC", "L2_RTC_S1",
+        input_key=lambda granule: (slc_join_key(granule, granule.acquisition_ts), slc_join_key(granule, granule.acquisition_end_ts)),
+        product_key=lambda product: slc_join_key(product, product.acquisition_ts),
+        sort_field=PLATFORM_ACQUISITION_TS_FIELD,
+        runtime_mappings=PLATFORM_ACQUISITION_TS_RUNTIME_MAPPINGS,
+        product_filter=lambda product: product.platform is not None and product.acquisition_ts is not None
+    ),
+]
+"""Pairs of input and SDS product types checked for gaps."""
+
+
+class GapReport(Report):
+    """
+    Input granules received without a corresponding SDS product, e.g. HLS granules without a DSWx-HLS product, or SLCs
+    without CSLC or RTC products. See `GAP_JOINS`.
+
+    For each pair, the input granules created in the report's time range and the SDS products created since its start are
+    streamed from Elasticsearch in join key order, a page at a time, and joined with a merge join (see `find_gaps`).
+    Only the gaps are kept in memory, so that a month of data can be checked without loading either side.
+
+    NOTE: granules received shortly before the end of the time range may not have been processed yet.
+    NOTE: SLCs are joined with burst products by platform and sensing time range, as the bursts of an SLC aren't known
+    here. An SLC is reported when none of its bursts has a product, not when only some of them are missing.
+    """
+
+    def __init__(self, title, start_date, end_date, timestamp, **kwargs):
+        super().__init__(title, start_date, end_date, timestamp, **kwargs)
+
+    def generate_report(self, output_format=None, report_type=None):
+        current_app.logger.info(f"Generating report. {output_format=}, {self.__dict__=}")
+
+        report_df = self.query_report_df()
+
+        if output_format == "text/csv":
+            with metrics.report_phase("GapReport", "render"):
+                report_csv = self.add_header_to_csv(report_df.to_csv(index=False))
+            with metrics.report_phase("GapReport", "serialize") as span:
+                tmp_report_csv = tempfile.NamedTemporaryFile(suffix=".csv", dir=".", delete=True)
+                span.set_attribute("bytes", tmp_report_csv.write(report_csv.encode("utf-8")))
+                tmp_report_csv.flush()
+            return tmp_report_csv
+        elif output_format == "application/json" or output_format == "json":
+            with metrics.report_phase("GapReport", "serialize"):
+                return to_json_report(self.get_header(), report_df)
+        elif output_format in columnar.COLUMNAR_MIMETYPES:
+            with metrics.report_phase("GapReport", "render"):
+                report_df = columnar.to_typed_df(report_df, datetime_columns=["creation_timestamp"])
+            with metrics.report_phase("GapReport", "serialize"):
+                return columnar.write_columnar(report_df, output_format, metadata=self.get_header())
+        elif output_format == "text/xml":
+            with metrics.report_phase("GapReport", "render"):
+                return report_df.to_xml()
+        elif output_format == "text/html":
+            with metrics.report_phase("GapReport", "render"):
+                return report_df.to_html()
+        else:
+            raise Exception(f"output format ({output_format}) is not supported.")
+
+    def query_report_df(self) -> DataFrame:
+        rows = []
+        for join in GAP_JOINS:
+            input_indexes = get_incoming_indexes(join.input_product_type)
+            if input_indexes is None:
+                current_app.logger.warning(f"No incoming product indexes. Skipping. input_product_type={join.input_product_type}")
+                continue
+
+            with metrics.report_phase("GapReport", "fetch") as span:
+                inputs = iter_ids(input_indexes, join, start=self.start_datetime, end=self.end_datetime)
+                products = iter_ids(metadata.PRODUCT_TYPE_TO_INDEX[join.sds_product_type], join, start=self.start_datetime)
+                gaps = list(find_gaps(join, inputs, products))
+                span.set_attribute("rows", len(gaps))
+
+            rows += [
+                {
+                    "input_product_type": join.input_product_type,
+                    "sds_product_type": join.sds_product_type,
+                    "granule_id": granule_id,
+                    "creation_timestamp": creation_timestamp,
+                }
+                for granule_id, creation_timestamp in gaps
+            ]
+        return pd.DataFrame(rows, columns=["input_product_type", "sds_product_type", "granule_id", "creation_timestamp"])
+
+    def add_header_to_csv(self, report_csv):
+        header_str = ""
+        for line in self.get_header():
+            for k, v in line.items():
+                header_str += f"{k}: {v}\n"
+        return header_str + report_csv
+
+    def get_header(self) -> list[dict[str, str]]:
+        return [
+            {"Title": "OPERA Input Granules Without SDS Products"},
+            {"Date of Report": datetime.fromisoformat(self._creation_time).strftime("%Y-%m-%dT%H:%M:%SZ")},
+            {"Period of Coverage (CreationTime)": f'{datetime.fromisoformat(self.start_datetime).strftime("%Y-%m-%dT%H:%M:%SZ")} - {datetime.fromisoformat(self.end_datetime).strftime("%Y-%m-%dT%H:%M:%SZ")}'},
+        ]
+
+    def get_filename(self, output_format):
+        start_datetime_normalized = self.start_datetime.replace(":", "")
+        end_datetime_normalized = self.end_datetime.replace(":", "")
+
+        if output_format == "text/csv":
+            return f"gaps - {start_datetime_normalized} to {end_datetime_normalized}.csv"
+        elif output_format == "text/html":
+            return f"gaps - {start_datetime_normalized} to {end_datetime_normalized}.html"
+        elif output_format == "text/xml":
+            return f"gaps - {start_datetime_normalized} to {end_datetime_normalized}.xml"
+        elif output_format in ("application/json", "json"):
+            return f"gaps - {start_datetime_normalized} to {end_datetime_normalized}.json"
+        elif output_format in columnar.COLUMNAR_MIMETYPES:
+            return f"gaps - {start_datetime_normalized} to {end_datetime_normalized}.{columnar.FILE_EXTENSIONS[output_format]}"
+        else:
+            raise Exception(f"Output format not supported. {output_format=}")
+
+    def populate_data(self):
+        raise Exception
+
+    def get_data(self):
+        raise Exception
+
+    def to_json(self):
+        raise Exception
+
+    def get_dict_format(self):
+        raise Exception
+
+    def to_xml(self):
+        raise Exception
+
+    def to_csv(self):
+        raise Exception
+
+
+def iter_ids(indexes: List[str], join: GapJoin, start: str, end: Optional[str] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Streams the IDs of the docs created in the given time range, sorted by the join's sort field.
+
+    :return: an iterator over (ID, creation timestamp) pairs
+    """
+    body = {"query": {"bool": {"filter": []}}, "sort": [{join.sort_field: "asc"}, {"creation_timestamp": "asc"}]}
+    if join.runtime_mappings:
+        body["runtime_mappings"] = join.runtime_mappings
+    query.add_range_filter(body, time_key="creation_timestamp", start=start, stop=end)
+
+    for hits in query.iter_hit_pages(
+            body=body,
+            index=",".join(indexes),
+            page_size=PAGE_SIZE,
+            _source_includes=["id", "creation_timestamp"],
+            ignore_unavailable=True,
+            allow_no_indices=True):
+        for hit in hits:
+            yield hit["_source"].get("id", hit["_id"]), hit["_source"].get("creation_timestamp")
+
+
+def find_gaps(join: GapJoin, inputs: Iterable[Tuple[str, str]], products: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+    """
+    Merge joins input granules with SDS products, both sorted by join key. Each side is iterated once.
+
+    :param join: the join
+    :param inputs: (ID, creation timestamp) pairs of the input granules. Revisions of a granule are reported once, even
+                   when interleaved with those of other granules of the same join key.
+    :param products: (ID, creation timestamp) pairs of the SDS products
+    :return: the (base ID, creation timestamp) pairs of the input granules without an SDS product keyed within their key range.
+             IDs of unknown formats (see `product_id.parse`), and IDs out of join key order, are logged and skipped.
+    """
+    parsed_products = (_try_parse(sds_product_id) for sds_product_id, _ in products)
+    product_keys = _sorted_keys(
+        join.product_key(product)
+        for product in parsed_products
+        if product is not None and (join.product_filter is None or join.product_filter(product))
+    )
+    product_key = next(product_keys, None)
+
+    previous_low_key, granule_ids = None, set()
+    for input_id, creation_timestamp in inputs:
+        granule = _try_parse(input_id)
+        if granule is None:
+            continue
+        granule_id = granule.id
+        low_key, high_key = join.input_key(granule)
+        if previous_low_key is not None and low_key < previous_low_key:
+            LOGGER.warning(f"Input granule is not sorted by join key. Skipping. {input_id=}, {previous_low_key=}")
+            continue
+        if low_key != previous_low_key:
+            previous_low_key, granule_ids = low_key, set()
+        if granule_id in granule_ids:
+            continue
+        granule_ids.add(granule_id)
+
+        while product_key is not None and product_key < low_key:
+            product_key = next(product_keys, None)
+        if product_key is None or high_key < product_key:
+            yield granule_id, creation_timestamp
+
+
+def _try_parse(id_: str) -> Optional[ProductId]:
+    try:
+        return product_id.parse(id_)
+    except Exception:
+        LOGGER.warning(f"Unable to parse ID. Skipping. {id_=}")
+        return None
+
+
+def _sorted_keys(keys: Iterable) -> Iterator:
+    previous = None
+    for key in keys:
+        if previous is not None and key < previous:
+            LOGGER.warning(f"SDS product is not sorted by join key. Skipping. {key=}, {previous=}")
+            continue
+        previous = key
+        yield key
@@ -1,5 +1,4 @@
 import base64
-import json
 import operator
 import tempfile
 import zipfile
@@ -7,15 +6,18 @@ from collections import defaultdict
 from datetime import datetime
 from functools import reduce
 from pathlib import Path
+from typing import Optional
 
 import elasticsearch.exceptions
 import pandas as pd
 from flask import current_app
 from pandas import DataFrame
 
-from accountability_api.api_utils import query, metadata
+from accountability_api import metrics
+from accountability_api.api_utils import columnar, query, metadata, mirror
 from accountability_api.api_utils.reporting.report import Report
-from accountability_api.api_utils.reporting.report_util import to_duration_isoformat, create_histogram
+from accountability_api.api_utils.reporting.report_util import to_duration_isoformat, create_histogram, to_json_report
+from accountability_api.configuration_obj import ConfigurationObj
 
 # Pandas options
 pd.set_option("display.max_rows", None)  # control the number of rows printed
@@ -23,6 +25,31 @@ pd.set_option("display.max_columns", None)  # Breakpoint for truncate view. `Non
 pd.set_option("display.width", None)   # control the printed line length. `None` value will auto-detect the width.
 pd.set_option("display.max_colwidth", 10)  # Number of characters to print per column.
 
+PRODUCTION_TIME_FIELD = "production_time"
+PRODUCTION_TIME_RUNTIME_MAPPINGS = {
+    PRODUCTION_TIME_FIELD: {
+        "type": "long",
+        "script": {
+            # milliseconds between the input product being received and the DAAC being alerted (CNM-S). See `to_report_df`.
+            "source": """
+                if (!doc.containsKey('daac_CNM_S_timestamp') || doc['daac_CNM_S_timestamp'].size() == 0) {
+                    return;
+                }
+                def received = null;
+                if (doc.containsKey('metadata.InputProductReceivedTime') && doc['metadata.InputProductReceivedTime'].size() > 0) {
+                    received = doc['metadata.InputProductReceivedTime'].value;
+                } else if (doc.containsKey('metadata.ProductReceivedTime') && doc['metadata.ProductReceivedTime'].size() > 0) {
+                    received = doc['metadata.ProductReceivedTime'].value;
+                }
+                if (received != null) {
+                    emit(doc['daac_CNM_S_timestamp'].value.toInstant().toEpochMilli() - received.toInstant().toEpochMilli());
+                }
+            """
+        }
+    }
+}
+"""Production time, as an Elasticsearch runtime field."""
+
 
 class ProductionTimeReport(Report):
     def __init__(self, title, start_date, end_date, timestamp, **kwargs):
@@ -32,76 +59,179 @@ class ProductionTimeReport(Report):
     def generate_report(self, output_format=None, report_type=None):
         current_app.logger.info(f"Generating report. {output_format=}, {self.__dict__=}")
 
-        product_docs = []
-        sds_product_indexes = reduce(operator.add, metadata.PRODUCT_TYPE_TO_INDEX.values())
-        for sdp_product_index in sds_product_indexes:
-            current_app.logger.info(f"Querying index {sdp_product_index} for products")
-
-            try:
-                product_docs += query.get_docs(indexes=[sdp_product_index], start=self.start_datetime, end=self.end_datetime)
-            except elasticsearch.exceptions.NotFoundError as e:
-                current_app.logger.warning(f"An exception {type(e)} occurred while querying indexes {sds_product_indexes} for products. Do the indexes exists?")
+        report_mirror = mirror.get_mirror() if report_type == "summary" and not self._report_options["generate_histograms"] else None
+        if report_mirror:
+            with metrics.report_phase("ProductionTimeReport", "mirror_query") as span:
+                report_df = ProductionTimeReport.to_summary_report_df(report_mirror.production_time_summary(self.start_datetime, self.end_datetime))
+                span.set_attribute("rows", len(report_df))
+        else:
+            summary_df = self.aggregate_summary_df() if report_type == "summary" and not self._report_options["generate_histograms"] else None
+            if summary_df is not None:
+                report_df = ProductionTimeReport.to_summary_report_df(summary_df)
+            else:
+                report_df = self.query_report_df(report_type)
 
         if output_format == "application/zip":
-            report_df = ProductionTimeReport.to_report_df(product_docs, report_type, self._report_options)
+            with metrics.report_phase("ProductionTimeReport", "serialize"):
+                # create zip. send zip.
+                tmp_report_zip = tempfile.NamedTemporaryFile(suffix=".zip", dir=".", delete=True)
+                with zipfile.ZipFile(tmp_report_zip.name, "w") as report_zipfile:
+                    # write histogram files, convert histogram column to filenames
+                    if self._report_options["generate_histograms"]:
+                        for i in range(len(report_df)):
+                            tmp_histogram = tempfile.NamedTemporaryFile(suffix=".png", dir=".", delete=True)
+                            histogram_b64: str = report_df["histogram"].values[i]
+                            tmp_histogram.write(base64.b64decode(histogram_b64))
+                            tmp_histogram.flush()
+                            histogram_filename = self.get_histogram_filename(sds_product_name=report_df["opera_product_short_name"].values[i], report_type=report_type)
+                            report_zipfile.write(Path(tmp_histogram.name).name, arcname=histogram_filename)
+                            report_df["histogram"].values[i] = histogram_filename
+
+                    ProductionTimeReport.rename_columns(report_df, report_type)
+                    report_csv = report_df.to_csv(index=False)
+                    report_csv = self.add_header_to_csv(report_csv, report_type)
+
+                    tmp_report_csv = tempfile.NamedTemporaryFile(suffix=".csv", dir=".", delete=True)
+                    current_app.logger.info(f"{tmp_report_csv.name=}")
+                    tmp_report_csv.write(report_csv.encode("utf-8"))
+                    tmp_report_csv.flush()
+
+                    report_zipfile.write(Path(tmp_report_csv.name).name, arcname=self.get_filename_by_report_type("text/csv", report_type))
+                return tmp_report_zip
 
-            # create zip. send zip.
-            tmp_report_zip = tempfile.NamedTemporaryFile(suffix=".zip", dir=".", delete=True)
-            with zipfile.ZipFile(tmp_report_zip.name, "w") as report_zipfile:
-                # write histogram files, convert histogram column to filenames
+        if output_format == "text/csv":
+            with metrics.report_phase("ProductionTimeReport", "render"):
                 if self._report_options["generate_histograms"]:
-                    for i in range(len(report_df)):
-                        tmp_histogram = tempfile.NamedTemporaryFile(suffix=".png", dir=".", delete=True)
-                        histogram_b64: str = report_df["histogram"].values[i]
-                        tmp_histogram.write(base64.b64decode(histogram_b64))
-                        tmp_histogram.flush()
-                        histogram_filename = self.get_histogram_filename(sds_product_name=report_df["opera_product_short_name"].values[i], report_type=report_type)
-                        report_zipfile.write(Path(tmp_histogram.name).name, arcname=histogram_filename)
-                        report_df["histogram"].values[i] = histogram_filename
-
+                    ProductionTimeReport.drop_column(report_df, "histogram")
                 ProductionTimeReport.rename_columns(report_df, report_type)
+
                 report_csv = report_df.to_csv(index=False)
                 report_csv = self.add_header_to_csv(report_csv, report_type)
 
+            with metrics.report_phase("ProductionTimeReport", "serialize") as span:
                 tmp_report_csv = tempfile.NamedTemporaryFile(suffix=".csv", dir=".", delete=True)
-                current_app.logger.info(f"{tmp_report_csv.name=}")
-                tmp_report_csv.write(report_csv.encode("utf-8"))
+                span.set_attribute("bytes", tmp_report_csv.write(report_csv.encode("utf-8")))
                 tmp_report_csv.flush()
-
-                report_zipfile.write(Path(tmp_report_csv.name).name, arcname=self.get_filename_by_report_type("text/csv", report_type))
-            return tmp_report_zip
-
-        report_df = ProductionTimeReport.to_report_df(product_docs, report_type, self._report_options)
-
-        if output_format == "text/csv":
-            if self._report_options["generate_histograms"]:
-                ProductionTimeReport.drop_column(report_df, "histogram")
-            ProductionTimeReport.rename_columns(report_df, report_type)
-
-            report_csv = report_df.to_csv(index=False)
-            report_csv = self.add_header_to_csv(report_csv, report_type)
-
-            tmp_report_csv = tempfile.NamedTemporaryFile(suffix=".csv", dir=".", delete=True)
-            tmp_report_csv.write(report_csv.encode("utf-8"))
-            tmp_report_csv.flush()
             return tmp_report_csv
         elif output_format == "application/json" or output_format == "json":
-            report_json = report_df.to_json(orient="records", date_format="epoch", lines=False)
-            report_obj: list[dict] = json.loads(report_json)
-            header = self.get_header(report_type)
-
-            return json.dumps({
-                "header": header,
-                "payload": report_obj
-
-            })
+            with metrics.report_phase("ProductionTimeReport", "serialize"):
+                return to_json_report(self.get_header(report_type), report_df)
+        elif output_format in columnar.COLUMNAR_MIMETYPES:
+            with metrics.report_phase("ProductionTimeReport", "render"):
+                ProductionTimeReport.drop_column(report_df, "histogram")
+                report_df = columnar.to_typed_df(
+                    report_df,
+                    datetime_columns=["input_received_datetime", "daac_alerted_datetime"],
+                    duration_columns=["production_time", "production_time_min", "production_time_max", "production_time_mean", "production_time_median"],
+                    count_columns=["production_time_count"]
+                )
+            with metrics.report_phase("ProductionTimeReport", "serialize"):
+                return columnar.write_columnar(report_df, output_format, metadata=self.get_header(report_type))
         elif output_format == "text/xml":
-            return report_df.to_xml()
+            with metrics.report_phase("ProductionTimeReport", "render"):
+                return report_df.to_xml()
         elif output_format == "text/html":
-            return report_df.to_html()
+            with metrics.report_phase("ProductionTimeReport", "render"):
+                return report_df.to_html()
         else:
             raise Exception(f"output format ({output_format}) is not supported.")
 
+    def query_report_df(self, report_type: str) -> DataFrame:
+        with metrics.report_phase("ProductionTimeReport", "fetch") as span:
+            product_docs = []
+            sds_product_indexes = reduce(operator.add, metadata.PRODUCT_TYPE_TO_INDEX.values())
+            for sdp_product_index in sds_product_indexes:
+                current_app.logger.info(f"Querying index {sdp_product_index} for products")
+
+                try:
+                    product_docs += query.get_docs(indexes=[sdp_product_index], start=self.start_datetime, end=self.end_datetime)
+                except elasticsearch.exceptions.NotFoundError as e:
+                    current_app.logger.warning(f"An exception {type(e)} occurred while querying indexes {sds_product_indexes} for products. Do the indexes exists?")
+            span.set_attribute("docs", len(product_docs))
+
+        with metrics.report_phase("ProductionTimeReport", "transform") as span:
+            report_df = ProductionTimeReport.to_report_df(product_docs, report_type, self._report_options)
+            span.set_attribute("rows", len(report_df))
+        return report_df
+
+    def aggregate_summary_df(self) -> Optional[DataFrame]:
+        """
+        Computes the production time statistics per product type server-side, with Elasticsearch aggregations over the
+        production time runtime field, instead of fetching every product. See `query.get_field_stats`.
+
+        :return: the statistics, like `Mirror.production_time_summary`. None when disabled, or when Elasticsearch could
+                 not compute them, e.g. when it doesn't support runtime fields or the timestamp fields aren't mapped as
+                 dates. The report is then computed client-side.
+        """
+        config = ConfigurationObj()
+        if config.get_item("ENABLED", profile="SERVER_SIDE_AGGREGATIONS", default="False").strip().lower() != "true":
+            return None
+
+        with metrics.report_phase("ProductionTimeReport", "aggregate") as span:
+            try:
+                product_type_to_stats = query.get_field_stats(
+                    metadata.PRODUCT_TYPE_TO_INDEX,
+                    field=PRODUCTION_TIME_FIELD,
+                    group_field="metadata.ProductType.keyword",
+                    start=self.start_datetime,
+                    end=self.end_datetime,
+                    runtime_mappings=PRODUCTION_TIME_RUNTIME_MAPPINGS,
+                    exists_field="daac_CNM_S_timestamp"
+                )
+            except Exception:
+                current_app.logger.warning("Failed to aggregate production times server-side. Falling back to client-side.", exc_info=True)
+                return None
+
+            rows = []
+            for short_name_to_stats in product_type_to_stats.values():
+                for short_name, stats in sorted(short_name_to_stats.items()):
+                    if stats["count"] != stats["exists_count"]:
+                        # delivered products without a production time. e.g. the received time fields are missing
+                        current_app.logger.warning(f"Production times missing server-side. Falling back to client-side. {short_name=}, {stats=}")
+                        return None
+                    rows.append({
+                        "opera_product_short_name": short_name,
+                        # consistent with `to_report_df`, which counts the products not yet delivered too
+                        "production_time_count": stats["doc_count"] if stats["count"] else 0,
+                        "production_time_min": stats["min"] / 1000 if stats["count"] else None,
+                        "production_time_max": stats["max"] / 1000 if stats["count"] else None,
+                        "production_time_mean": stats["avg"] / 1000 if stats["count"] else None,
+                        "production_time_median": stats["percentiles"][50.0] / 1000 if stats["count"] else None,
+                    })
+            span.set_attribute("rows", len(rows))
+        return pd.DataFrame(rows)
+
+    @staticmethod
+    def to_summary_report_df(summary_df: DataFrame) -> DataFrame:
+        """
+        Formats production time statistics computed over the mirror (see `Mirror.production_time_summary`), or by
+        Elasticsearch (see `aggregate_summary_df`), like the summary report of `to_report_df`.
+        """
+        if summary_df.empty:
+            return pd.DataFrame()
+
+        production_time_summary_rows = []
+        for row in summary_df.itertuples(index=False):
+            if not row.production_time_count:  # EDGE CASE: no data for the product type / summary row
+                production_time_summary_rows.append({
+                    "opera_product_short_name": row.opera_product_short_name,
+                    "production_time_count": "N/A",
+                    "production_time_min": "N/A",
+                    "production_time_max": "N/A",
+                    "production_time_mean": "N/A",
+                    "production_time_median": "N/A"
+                })
+            else:
+                production_time_summary_rows.append({
+                    "opera_product_short_name": row.opera_product_short_name,
+                    "production_time_count": int(row.production_time_count),
+                    "production_time_min": to_duration_isoformat(row.production_time_min),
+                    "production_time_max": to_duration_isoformat(row.production_time_max),
+                    "production_time_mean": to_duration_isoformat(row.production_time_mean),
+                    "production_time_median": to_duration_isoformat(row.production_time_median)
+                })
+        return pd.DataFrame(production_time_summary_rows)
+
     @staticmethod
     def to_report_df(product_docs: list[dict], report_type: str, report_options: dict) -> DataFrame:
         current_app.logger.info(f"Total generated products for report {len(product_docs)}")
@@ -247,6 +377,8 @@ class ProductionTimeReport(Report):
             return f"production-time-{report_type} - {start_datetime_normalized} to {end_datetime_normalized}.json"
         elif output_format == "application/zip":
             return f"production-time-{report_type} - {start_datetime_normalized} to {end_datetime_normalized}.zip"
+        elif output_format in columnar.COLUMNAR_MIMETYPES:
+            return f"production-time-{report_type} - {start_datetime_normalized} to {end_datetime_normalized}.{columnar.FILE_EXTENSIONS[output_format]}"
         else:
             raise Exception(f"Output format not supported. {output_format=}")
 
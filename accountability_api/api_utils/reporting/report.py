@@ -3,6 +3,7 @@ import pandas as pd
 
 from abc import ABC, abstractmethod
 
+from accountability_api import tracing
 from accountability_api.api_utils import utils, query
 
 
@@ -65,7 +66,8 @@ class Report(ABC):
 
     @abstractmethod
     def generate_report(self, output_format=None):
-        self.populate_data()
+        with tracing.span(f"{type(self).__name__}.populate_data"):
+            self.populate_data()
 
         self.filename = self.get_filename(output_format)
         if output_format == "xml" or output_format is None:
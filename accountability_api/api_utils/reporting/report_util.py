@@ -1,11 +1,14 @@
 import io
+import json
 import statistics
 
 import pandas as pd
 from flask import current_app
 from matplotlib.axes import Axes
 from matplotlib.figure import Figure
-from pandas import Timedelta
+from pandas import DataFrame, Timedelta
+
+from accountability_api import tracing
 
 
 def to_duration_isoformat(duration_seconds: float):
@@ -15,8 +18,27 @@ def to_duration_isoformat(duration_seconds: float):
     return hhmmss_format
 
 
+def to_json_report(header: list[dict[str, str]], report_df: DataFrame) -> bytes:
+    """
+    Returns the JSON report document `{"header": [...], "payload": [...]}` as UTF-8 bytes.
+
+    The records are serialized exactly once (by pandas) and spliced into the document as-is,
+    rather than being parsed back into Python objects and re-serialized.
+    """
+    payload = report_df.to_json(orient="records", date_format="epoch", lines=False)
+    report = b"".join([
+        b'{"header": ', json.dumps(header).encode("utf-8"),
+        b', "payload": ', payload.encode("utf-8"),
+        b"}"
+    ])
+    tracing.set_attributes(rows=len(report_df), bytes=len(report))
+    return report
+
+
+@tracing.traced("create_histogram")
 def create_histogram(*, series: list[float], title: str, metric: str, unit: str) -> io.BytesIO:
     current_app.logger.info(f"{title=}, {len(series)=}")
+    tracing.set_attributes(values=len(series))
 
     fig = Figure(layout='tight')
     ax: Axes = fig.subplots()
@@ -45,4 +67,5 @@ def create_histogram(*, series: list[float], title: str, metric: str, unit: str)
     fig.savefig(histogram_img, format="png")
 
     current_app.logger.info("Generated histogram")
+    tracing.set_attributes(bytes=histogram_img.getbuffer().nbytes)
     return histogram_img
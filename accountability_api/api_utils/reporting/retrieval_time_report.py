@@ -1,22 +1,24 @@
 import base64
-import json
 import operator
-import re
 import tempfile
 import zipfile
 from collections import defaultdict
 from datetime import datetime, timedelta
 from functools import reduce
 from pathlib import Path
+from typing import Callable
 
 import elasticsearch.exceptions
 import pandas as pd
 from flask import current_app
 from pandas import DataFrame
 
-from accountability_api.api_utils import query, metadata, utils
+from accountability_api import metrics, tracing
+from accountability_api.api_utils import burst_set, columnar, query, metadata, utils
+from accountability_api.api_utils.product_id import parse as parse_product_id
 from accountability_api.api_utils.reporting.report import Report
-from accountability_api.api_utils.reporting.report_util import to_duration_isoformat, create_histogram
+from accountability_api.api_utils.reporting.report_util import to_duration_isoformat, create_histogram, to_json_report
+from accountability_api.configuration_obj import ConfigurationObj
 
 # Pandas options
 pd.set_option("display.max_rows", None)  # control the number of rows printed
@@ -29,6 +31,19 @@ def datetime_fromisoformat(date_string: str):
     return datetime.fromisoformat(date_string.removesuffix("Z"))
 
 
+def to_granule_id(doc_id: str, strip: Callable[[str], str]) -> str:
+    """
+    :param doc_id: the ID of a catalog doc, e.g. a file name
+    :param strip: strips the suffixes of IDs of unknown formats (see `product_id.parse`), to get their granule ID
+    :return: the granule ID of the catalog doc
+    """
+    try:
+        return parse_product_id(doc_id).id
+    except Exception:
+        current_app.logger.warning(f"Unable to parse ID. Stripping its suffixes instead. {doc_id=}")
+        return strip(doc_id)
+
+
 class RetrievalTimeReport(Report):
     def __init__(self, title, start_date, end_date, timestamp, **kwargs):
         super().__init__(title, start_date, end_date, timestamp, **kwargs)
@@ -37,78 +52,124 @@ class RetrievalTimeReport(Report):
     def generate_report(self, output_format=None, report_type=None):
         current_app.logger.info(f"Generating report. {output_format=}, {self.__dict__=}")
 
-        product_docs = []
-        input_product_indexes = reduce(operator.add, metadata.INCOMING_SDP_PRODUCTS.values())
-        for incoming_sdp_product_index in input_product_indexes:
-            current_app.logger.info(f"Querying index {incoming_sdp_product_index} for products")
+        with metrics.report_phase("RetrievalTimeReport", "fetch") as span:
+            product_docs = []
+            input_product_indexes = reduce(operator.add, metadata.INCOMING_SDP_PRODUCTS.values())
+            revisioned_indexes = set(reduce(operator.add, metadata.INPUT_PRODUCT_TYPE_TO_INDEX.values()))
+            for incoming_sdp_product_index in input_product_indexes:
+                current_app.logger.info(f"Querying index {incoming_sdp_product_index} for products")
 
-            try:
-                product_docs += query.get_docs(indexes=[incoming_sdp_product_index], start=self.start_datetime, end=self.end_datetime)
-            except elasticsearch.exceptions.NotFoundError as e:
-                current_app.logger.warning(f"An exception {type(e)} occurred while querying indexes {incoming_sdp_product_index} for products. Do the indexes exists?")
+                try:
+                    if incoming_sdp_product_index in revisioned_indexes:
+                        product_docs += self.get_revisioned_docs(incoming_sdp_product_index)
+                    else:
+                        product_docs += query.get_docs(indexes=[incoming_sdp_product_index], start=self.start_datetime, end=self.end_datetime)
+                except elasticsearch.exceptions.NotFoundError as e:
+                    current_app.logger.warning(f"An exception {type(e)} occurred while querying indexes {incoming_sdp_product_index} for products. Do the indexes exists?")
+            span.set_attribute("docs", len(product_docs))
 
-        if output_format == "application/zip":
+        with metrics.report_phase("RetrievalTimeReport", "transform") as span:
             report_df = RetrievalTimeReport.to_report_df(product_docs, report_type, start=self.start_datetime, end=self.end_datetime, report_options=self._report_options)
+            span.set_attribute("rows", len(report_df))
 
-            # create zip. send zip.
-            tmp_report_zip = tempfile.NamedTemporaryFile(suffix=".zip", dir=".", delete=True)
-            with zipfile.ZipFile(tmp_report_zip.name, "w") as report_zipfile:
-                # write histogram files, convert histogram column to filenames
-                if self._report_options["generate_histograms"]:
-                    for i in range(len(report_df)):
-                        tmp_histogram = tempfile.NamedTemporaryFile(suffix=".png", dir=".", delete=True)
-                        histogram_b64: str = report_df["histogram"].values[i]
-                        tmp_histogram.write(base64.b64decode(histogram_b64))
-                        tmp_histogram.flush()
-                        histogram_filename = self.get_histogram_filename(
-                            input_product_name=report_df["input_product_short_name"].values[i],
-                            report_type=report_type)
-                        report_zipfile.write(Path(tmp_histogram.name).name, arcname=histogram_filename)
-                        report_df["histogram"].values[i] = histogram_filename
+        if output_format == "application/zip":
+            with metrics.report_phase("RetrievalTimeReport", "serialize"):
+                # create zip. send zip.
+                tmp_report_zip = tempfile.NamedTemporaryFile(suffix=".zip", dir=".", delete=True)
+                with zipfile.ZipFile(tmp_report_zip.name, "w") as report_zipfile:
+                    # write histogram files, convert histogram column to filenames
+                    if self._report_options["generate_histograms"]:
+                        for i in range(len(report_df)):
+                            tmp_histogram = tempfile.NamedTemporaryFile(suffix=".png", dir=".", delete=True)
+                            histogram_b64: str = report_df["histogram"].values[i]
+                            tmp_histogram.write(base64.b64decode(histogram_b64))
+                            tmp_histogram.flush()
+                            histogram_filename = self.get_histogram_filename(
+                                input_product_name=report_df["input_product_short_name"].values[i],
+                                report_type=report_type)
+                            report_zipfile.write(Path(tmp_histogram.name).name, arcname=histogram_filename)
+                            report_df["histogram"].values[i] = histogram_filename
+
+                    RetrievalTimeReport.rename_columns(report_df, report_type)
+                    report_csv = report_df.to_csv(index=False)
+                    report_csv = self.add_header_to_csv(report_csv, report_type)
+
+                    tmp_report_csv = tempfile.NamedTemporaryFile(suffix=".csv", dir=".", delete=True)
+                    current_app.logger.info(f"{tmp_report_csv.name=}")
+                    tmp_report_csv.write(report_csv.encode("utf-8"))
+                    tmp_report_csv.flush()
+
+                    report_zipfile.write(Path(tmp_report_csv.name).name, arcname=self.get_filename_by_report_type("text/csv", report_type))
+                return tmp_report_zip
 
+        if output_format == "text/csv":
+            with metrics.report_phase("RetrievalTimeReport", "render"):
+                if self._report_options["generate_histograms"]:
+                    RetrievalTimeReport.drop_column(report_df, "histogram")
                 RetrievalTimeReport.rename_columns(report_df, report_type)
+
                 report_csv = report_df.to_csv(index=False)
                 report_csv = self.add_header_to_csv(report_csv, report_type)
 
+            with metrics.report_phase("RetrievalTimeReport", "serialize") as span:
                 tmp_report_csv = tempfile.NamedTemporaryFile(suffix=".csv", dir=".", delete=True)
-                current_app.logger.info(f"{tmp_report_csv.name=}")
-                tmp_report_csv.write(report_csv.encode("utf-8"))
+                span.set_attribute("bytes", tmp_report_csv.write(report_csv.encode("utf-8")))
                 tmp_report_csv.flush()
-
-                report_zipfile.write(Path(tmp_report_csv.name).name, arcname=self.get_filename_by_report_type("text/csv", report_type))
-            return tmp_report_zip
-
-        report_df = RetrievalTimeReport.to_report_df(product_docs, report_type, start=self.start_datetime, end=self.end_datetime, report_options=self._report_options)
-
-        if output_format == "text/csv":
-            if self._report_options["generate_histograms"]:
-                RetrievalTimeReport.drop_column(report_df, "histogram")
-            RetrievalTimeReport.rename_columns(report_df, report_type)
-
-            report_csv = report_df.to_csv(index=False)
-            report_csv = self.add_header_to_csv(report_csv, report_type)
-
-            tmp_report_csv = tempfile.NamedTemporaryFile(suffix=".csv", dir=".", delete=True)
-            tmp_report_csv.write(report_csv.encode("utf-8"))
-            tmp_report_csv.flush()
             return tmp_report_csv
         elif output_format == "application/json" or output_format == "json":
-            report_json = report_df.to_json(orient="records", date_format="epoch", lines=False)
-            report_obj: list[dict] = json.loads(report_json)
-            header = self.get_header(report_type)
-
-            return json.dumps({
-                "header": header,
-                "payload": report_obj
-
-            })
+            with metrics.report_phase("RetrievalTimeReport", "serialize"):
+                return to_json_report(self.get_header(report_type), report_df)
+        elif output_format in columnar.COLUMNAR_MIMETYPES:
+            with metrics.report_phase("RetrievalTimeReport", "render"):
+                RetrievalTimeReport.drop_column(report_df, "histogram")
+                report_df = columnar.to_typed_df(
+                    report_df,
+                    datetime_columns=["public_available_datetime", "opera_detect_datetime", "product_received_datetime", "latest_public_available_datetime"],
+                    duration_columns=["retrieval_time", "retrieval_time_p90", "retrieval_time_min", "retrieval_time_max", "retrieval_time_median", "retrieval_time_mean"],
+                    count_columns=["retrieval_time_count"]
+                )
+            with metrics.report_phase("RetrievalTimeReport", "serialize"):
+                return columnar.write_columnar(report_df, output_format, metadata=self.get_header(report_type))
         elif output_format == "text/xml":
-            return report_df.to_xml()
+            with metrics.report_phase("RetrievalTimeReport", "render"):
+                return report_df.to_xml()
         elif output_format == "text/html":
-            return report_df.to_html()
+            with metrics.report_phase("RetrievalTimeReport", "render"):
+                return report_df.to_html()
         else:
             raise Exception(f"output format ({output_format}) is not supported.")
 
+    def get_revisioned_docs(self, index: str) -> list[dict]:
+        """
+        :return: the datasets of the given revisioned index created in the report's time range. Every revision of each
+                 dataset, unless server-side aggregations and `COLLAPSE_REVISIONS` are enabled. Then, only the latest
+                 revision of each dataset, collapsed server-side (see `query.get_latest_revisions`), or client-side
+                 when Elasticsearch can't.
+        """
+        config = ConfigurationObj()
+        if (config.get_item("ENABLED", profile="SERVER_SIDE_AGGREGATIONS", default="False").strip().lower() != "true"
+                or config.get_item("COLLAPSE_REVISIONS", profile="SERVER_SIDE_AGGREGATIONS", default="False").strip().lower() != "true"):
+            return query.get_docs(indexes=[index], start=self.start_datetime, end=self.end_datetime)
+
+        try:
+            return query.get_latest_revisions(indexes=[index], start=self.start_datetime, end=self.end_datetime)
+        except elasticsearch.exceptions.NotFoundError:
+            raise
+        except Exception:
+            current_app.logger.warning(f"Failed to collapse revisions server-side. Falling back to client-side. {index=}", exc_info=True)
+        return RetrievalTimeReport.collapse_revisions(query.get_docs(indexes=[index], start=self.start_datetime, end=self.end_datetime))
+
+    @staticmethod
+    def collapse_revisions(dataset_docs: list[dict]) -> list[dict]:
+        """:return: the latest revision (by `creation_timestamp`) of each dataset, in order of first appearance"""
+        dataset_base_id_to_dataset_map = {}
+        for dataset in dataset_docs:
+            base_id, _ = utils.split_revision(dataset["_id"])
+            latest = dataset_base_id_to_dataset_map.get(base_id)
+            if latest is None or utils.from_iso_to_dt(dataset["creation_timestamp"]) > utils.from_iso_to_dt(latest["creation_timestamp"]):
+                dataset_base_id_to_dataset_map[base_id] = dataset
+        return list(dataset_base_id_to_dataset_map.values())
+
     @staticmethod
     def to_report_df(dataset_docs: list[dict], report_type: str, start, end, report_options: dict) -> DataFrame:
         current_app.logger.info(f"Total generated datasets for report {len(dataset_docs)}")
@@ -130,49 +191,47 @@ class RetrievalTimeReport(Report):
                 for sds_product_type in metadata.INPUT_PRODUCT_TYPE_TO_SDS_PRODUCT_TYPE[dataset["dataset_type"]]:
                     sds_product_type_to_input_datasets_map[sds_product_type].append(dataset)
 
-        # map L3_DSWX_HLS input products with ancillary information needed for report
-        if sds_product_type_to_input_datasets_map.get("L3_DSWX_HLS"):
-            RetrievalTimeReport.augment_hls_products_with_hls_spatial_info(
-                dataset_base_id_to_dataset_map,
-                utils.from_dt_to_iso(utils.from_iso_to_dt(start) - timedelta(hours=24)),
-                end
-            )
-            RetrievalTimeReport.augment_hls_products_with_hls_info(
-                dataset_id_to_dataset_map,
-                utils.from_dt_to_iso(utils.from_iso_to_dt(start) - timedelta(hours=24)),
-                end
-            )
-
-        # map L2_CSLC_S1 and L2_RTC_S1 input products with ancillary information needed for report
-        l2_cslc_s1_input_product_docs = sds_product_type_to_input_datasets_map.get("L2_CSLC_S1")
-        l2_rtc_s1_input_product_docs = sds_product_type_to_input_datasets_map.get("L2_RTC_S1")
-        if l2_cslc_s1_input_product_docs or l2_rtc_s1_input_product_docs:
-            RetrievalTimeReport.augment_slc_products_with_slc_info(
-                dataset_base_id_to_dataset_map,
-                utils.from_dt_to_iso(utils.from_iso_to_dt(start) - timedelta(hours=24)),
-                end
-            )
+        with metrics.report_phase("RetrievalTimeReport", "enrich"):
+            # map L3_DSWX_HLS input products with ancillary information needed for report
+            if sds_product_type_to_input_datasets_map.get("L3_DSWX_HLS"):
+                RetrievalTimeReport.augment_hls_products_with_hls_spatial_info(
+                    dataset_base_id_to_dataset_map,
+                    utils.from_dt_to_iso(utils.from_iso_to_dt(start) - timedelta(hours=24)),
+                    end
+                )
+                RetrievalTimeReport.augment_hls_products_with_hls_info(
+                    dataset_id_to_dataset_map,
+                    utils.from_dt_to_iso(utils.from_iso_to_dt(start) - timedelta(hours=24)),
+                    end
+                )
+
+            # map L2_CSLC_S1 and L2_RTC_S1 input products with ancillary information needed for report
+            l2_cslc_s1_input_product_docs = sds_product_type_to_input_datasets_map.get("L2_CSLC_S1")
+            l2_rtc_s1_input_product_docs = sds_product_type_to_input_datasets_map.get("L2_RTC_S1")
+            if l2_cslc_s1_input_product_docs or l2_rtc_s1_input_product_docs:
+                RetrievalTimeReport.augment_slc_products_with_slc_info(
+                    dataset_base_id_to_dataset_map,
+                    utils.from_dt_to_iso(utils.from_iso_to_dt(start) - timedelta(hours=24)),
+                    end
+                )
 
         l3_dswx_s1_input_product_docs = sds_product_type_to_input_datasets_map.get("L3_DSWX_S1")
         if l3_dswx_s1_input_product_docs:
             # TODO chrisjrd: augment with something
             pass
 
-        # TODO chrisjrd: group DSWx-S1 input RTC into burst sets
-        pass
-        burst_cycle_index_to_burst_map = {}
-        for dataset in dataset_docs:
-            product = dataset
-            if product["_id"].startswith("OPERA_L2_RTC-S1"):
-                if not burst_cycle_index_to_burst_map.get("mgrs_set_id_acquisition_ts_cycle_index"):
-                    burst_cycle_index_to_burst_map["mgrs_set_id_acquisition_ts_cycle_index"] = []
-                burst_cycle_index_to_burst_map["mgrs_set_id_acquisition_ts_cycle_index"].append(dataset)
-        for k in burst_cycle_index_to_burst_map:
-            burst_cycle_index_to_burst_map[k] = sorted(burst_cycle_index_to_burst_map[k], key=lambda burst: burst["creation_timestamp"], reverse=True)
-            burst_cycle_index_to_burst_map[k] = max(burst_cycle_index_to_burst_map[k], key=lambda burst: burst["creation_timestamp"])
+        # group DSWx-S1 input RTC into burst sets. keep only the latest RTC product of each burst of a burst set
+        burst_sets = burst_set.group_burst_sets(
+            dataset for dataset in dataset_docs if dataset["_id"].startswith("OPERA_L2_RTC-S1")
+        )
+        latest_rtc_ids = {rtc_doc["_id"] for bursts in burst_sets.values() for rtc_doc in bursts.values()}
+        current_app.logger.info(f"Grouped {len(latest_rtc_ids)} RTC products into {len(burst_sets)} burst sets")
 
         # create initial data frame with raw report data
-        dataset_docs = list(dataset_id_to_dataset_map.values())
+        dataset_docs = [
+            dataset for dataset in dataset_id_to_dataset_map.values()
+            if not dataset["_id"].startswith("OPERA_L2_RTC-S1") or dataset["_id"] in latest_rtc_ids
+        ]
         retrieval_times_seconds: list[dict] = []
         for dataset in dataset_docs:
             current_app.logger.debug(f'{dataset["_id"]=}')
@@ -375,14 +434,16 @@ class RetrievalTimeReport(Report):
             raise Exception(f"Unsupported report type. {report_type=}")
 
     @staticmethod
+    @tracing.traced("RetrievalTimeReport.augment_hls_products_with_hls_info")
     def augment_hls_products_with_hls_info(dataset_id_to_dataset_map: dict[str, list[dict]], start, end):
         current_app.logger.info("Adding HLS information to products")
 
         hls_docs: list[dict] = query.get_docs(indexes=["hls_catalog-*"], start=start, end=end)
+        tracing.set_attributes(hls_docs=len(hls_docs))
         for hls_doc in hls_docs:
             hls_doc_id = hls_doc["_id"]  # filename
-            product_name = hls_doc_id[0:len(hls_doc_id) - 1 - hls_doc_id[::-1].index(".")]  # strip extension to get product name
-            dataset_id = granule_id = product_name[0:len(product_name) - 1 - product_name[::-1].index(".")]  # strip band/QA mask to get granule ID
+            # strip extension and band/QA mask to get granule ID
+            dataset_id = granule_id = to_granule_id(hls_doc_id, strip=lambda doc_id: doc_id.rsplit(".", maxsplit=2)[0])
             granule = dataset = dataset_id_to_dataset_map.get(dataset_id, {})
             if not granule:
                 continue
@@ -390,10 +451,12 @@ class RetrievalTimeReport(Report):
                 input_product["hls"] = hls_doc
 
     @staticmethod
+    @tracing.traced("RetrievalTimeReport.augment_hls_products_with_hls_spatial_info")
     def augment_hls_products_with_hls_spatial_info(dataset_id_to_datasets_map: dict[str, list[dict]], start, end):
         current_app.logger.info("Adding HLS spatial information to products")
 
         hls_spatial_docs: list[dict] = query.get_docs(indexes=["hls_spatial_catalog-*"], start=start, end=end)
+        tracing.set_attributes(hls_spatial_docs=len(hls_spatial_docs))
         for hls_spatial_doc in hls_spatial_docs:
             dataset_id = granule_id = hls_spatial_doc_id = hls_spatial_doc["_id"]  # filename minus extension minus band (i.e. granule)
             granule = dataset = dataset_id_to_datasets_map.get(dataset_id, {})
@@ -404,25 +467,28 @@ class RetrievalTimeReport(Report):
                 input_product["hls_spatial"] = hls_spatial_doc
 
     @staticmethod
+    @tracing.traced("RetrievalTimeReport.augment_slc_products_with_slc_info")
     def augment_slc_products_with_slc_info(dataset_id_to_dataset_map: dict[str, list[dict]], start, end):
         current_app.logger.info("Adding SLC information to products")
 
         slc_docs: list[dict] = query.get_docs(indexes=["slc_catalog-*"], start=start, end=end)
+        tracing.set_attributes(slc_docs=len(slc_docs))
         for slc_doc in slc_docs:
             slc_doc_id = slc_doc["_id"]  # filename
-            product_name = slc_doc_id[0:len(slc_doc_id) - 1 - slc_doc_id[::-1].index(".")]  # strip extension to get product name
-            dataset_id = granule_id = product_name
+            # strip extension to get product name
+            dataset_id = granule_id = to_granule_id(slc_doc_id, strip=lambda doc_id: doc_id.rsplit(".", maxsplit=1)[0])
             granule = dataset = dataset_id_to_dataset_map.get(dataset_id, {})
             if not granule:
                 continue
             granule["slc"] = slc_doc
 
         slc_spatial_docs: list[dict] = query.get_docs(indexes=["slc_spatial_catalog-*"], start=start, end=end)
+        tracing.set_attributes(slc_spatial_docs=len(slc_spatial_docs))
         for slc_spatial_doc in slc_spatial_docs:
             slc_doc_id: str
             slc_doc_id = slc_spatial_doc["_id"]  # filename
-            product_name = slc_doc_id.rsplit("-", maxsplit=1)[0]  # remove `-SLC` suffix
-            dataset_id = granule_id = product_name
+            # remove `-SLC` suffix
+            dataset_id = granule_id = to_granule_id(slc_doc_id, strip=lambda doc_id: doc_id.rsplit("-", maxsplit=1)[0])
             granule = dataset = dataset_id_to_dataset_map.get(dataset_id, {})
             if not granule:
                 continue
@@ -448,9 +514,8 @@ class RetrievalTimeReport(Report):
     def map_by_base_id(dataset_docs: list[dict]):
         dataset_id_to_datasets_map = {}
         for dataset in dataset_docs:
-            id_: str = dataset["_id"]
-            if re.search(r"-r\d+$", id_):  # remove revision number suffix
-                base_id = id_.rsplit("-", maxsplit=1)[0]
+            base_id, revision = utils.split_revision(dataset["_id"])
+            if revision is not None:
                 dataset_id_to_datasets_map[base_id] = dataset
         return dataset_id_to_datasets_map
 
@@ -466,6 +531,8 @@ class RetrievalTimeReport(Report):
             return f"retrieval-time-{report_type} - {start_datetime_normalized} to {end_datetime_normalized}.json"
         elif output_format == "application/zip":
             return f"retrieval-time-{report_type} - {start_datetime_normalized} to {end_datetime_normalized}.zip"
+        elif output_format in columnar.COLUMNAR_MIMETYPES:
+            return f"retrieval-time-{report_type} - {start_datetime_normalized} to {end_datetime_normalized}.{columnar.FILE_EXTENSIONS[output_format]}"
         else:
             raise Exception(f"Output format not supported. {output_format=}")
 
@@ -1,9 +1,12 @@
 import logging
+import re
 from datetime import datetime, timedelta
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 import dateutil.parser
 import math
+import numpy as np
+import pandas as pd
 from jsonschema import validate, ValidationError, SchemaError
 from lxml import etree, objectify
 
@@ -34,6 +37,37 @@ def from_dt_to_iso(dt: datetime, custom_format="%Y-%m-%dT%H:%M:%S.%fZ"):
     return dt.strftime(custom_format)
 
 
+_INTERVAL = re.compile(r"^([1-9][0-9]*)([smhd])$")
+_INTERVAL_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def parse_interval(interval: str) -> timedelta:
+    """
+    Parses a fixed time interval, in the format of Elasticsearch `fixed_interval`s, e.g. "15m", "1h" or "7d".
+
+    :raises ValueError: when the interval is not a positive number followed by a unit ( s | m | h | d )
+    """
+    match = _INTERVAL.match(interval or "")
+    if not match:
+        raise ValueError(f"Invalid interval. Expected a number followed by a unit ( s | m | h | d ). {interval=}")
+    return timedelta(**{_INTERVAL_UNITS[match.group(2)]: int(match.group(1))})
+
+
+_REVISION_SUFFIX = re.compile(r"-r(\d+)$")
+
+
+def split_revision(id_: str) -> Tuple[str, Optional[int]]:
+    """
+    Splits the revision number suffix (e.g. "-r1") from a document ID.
+
+    :return: the base ID, and the revision number. None when the ID has no revision number suffix.
+    """
+    match = _REVISION_SUFFIX.search(id_)
+    if not match:
+        return id_, None
+    return id_[:match.start()], int(match.group(1))
+
+
 def set_transfer_status(doc: Dict):
     if not doc["dataset_type"] in TRANSFERABLE_PRODUCT_TYPES:
         doc["transfer_status"] = "not_applicable"
@@ -55,6 +89,30 @@ def set_transfer_status(doc: Dict):
     return doc
 
 
+def get_transfer_statuses(df: pd.DataFrame) -> pd.Series:
+    """
+    Vectorized counterpart of `set_transfer_status`.
+
+    :param df: data frame with "dataset_type", "daac_delivery_status", and "daac_CNM_S_status" columns
+    :return: the transfer status of each row
+    """
+    is_transferable = df["dataset_type"].isin(TRANSFERABLE_PRODUCT_TYPES)
+    has_delivery_status = df["daac_delivery_status"].notna()
+    has_cnm_s_status = df["daac_CNM_S_status"].notna()
+    transfer_statuses = np.select(
+        [
+            ~is_transferable,
+            has_delivery_status & (df["daac_delivery_status"] == "SUCCESS"),
+            has_delivery_status,
+            has_cnm_s_status & (df["daac_CNM_S_status"] == "SUCCESS"),
+            has_cnm_s_status
+        ],
+        ["not_applicable", "cnm_r_success", "cnm_r_failure", "cnm_s_success", "cnm_s_failure"],
+        default="unknown"
+    )
+    return pd.Series(transfer_statuses, index=df.index, dtype=object)
+
+
 def to_iso_format_truncated(dt_str: str):
     """
     Converts the given ISO-like datetime string to the truncated representation.
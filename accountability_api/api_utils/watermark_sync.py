@@ -0,0 +1,125 @@
+"""
+Incremental sync of Elasticsearch documents, by high-water mark.
+
+Each synced source (an index expression) has a watermark, the latest timestamp synced (e.g. `creation_timestamp`,
+or `last_modified` for the accountability indexes). A sync fetches only the documents with a timestamp since the
+watermark (minus a lookback, to also fetch recently updated documents), hands them to the consumer page by page,
+then advances the watermark. Consumers, e.g. caches, materialized aggregates or the local mirror, stay current with
+small deltas instead of re-reading their whole time window.
+
+Documents are handed over in timestamp order, with their base ID (the ID without a revision number suffix, e.g.
+"-r1", see `utils.split_revision`) in the `_base_id` field. Consumers keyed by base ID can upsert each document, so
+that the latest revision wins.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from accountability_api.api_utils import query, utils
+
+LOGGER = logging.getLogger()
+
+
+@dataclass(frozen=True)
+class SyncSource:
+    name: str
+    """Identifies the source's watermark."""
+    index: str
+    """Index pattern or multi-index expression."""
+    timestamp_field: str = "creation_timestamp"
+    source_includes: Optional[List[str]] = field(default=None, hash=False)
+    """The `_source` fields to fetch. All when None."""
+
+
+class WatermarkStore(ABC):
+    """Persists the watermark of each source."""
+
+    @abstractmethod
+    def get_watermark(self, name: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def set_watermark(self, name: str, watermark: str):
+        pass
+
+
+class JsonWatermarkStore(WatermarkStore):
+    """Watermarks stored in a JSON file."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def get_watermark(self, name: str) -> Optional[str]:
+        return self._read().get(name)
+
+    def set_watermark(self, name: str, watermark: str):
+        with self._lock:
+            watermarks = self._read()
+            watermarks[name] = watermark
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as fp:
+                json.dump(watermarks, fp, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+    def _read(self) -> Dict[str, str]:
+        if not self.path.exists():
+            return {}
+        return json.loads(self.path.read_text())
+
+
+class WatermarkSync:
+    """See the module documentation."""
+
+    def __init__(self, store: WatermarkStore, lookback: timedelta = timedelta(0), page_size=10000):
+        """
+        :param store: the watermark store
+        :param lookback: documents with a timestamp within this duration before the watermark are fetched again
+        :param page_size: the number of documents per page (and per Elasticsearch request)
+        """
+        self.store = store
+        self.lookback = lookback
+        self.page_size = page_size
+
+    def sync(self, source: SyncSource, apply: Callable[[List[Dict]], None]) -> int:
+        """
+        Fetches the documents of the given source changed since its watermark, and advances the watermark once all
+        of them are applied. When `apply` fails, the watermark is left as-is, so that the next sync fetches the same
+        documents again.
+
+        :param source: the source to sync
+        :param apply: consumes a page of documents (`_source` with the `_id`, `_index` and `_base_id` fields), in timestamp order
+        :return: the number of documents applied
+        """
+        watermark = self.store.get_watermark(source.name)
+        body = {"query": {"bool": {"filter": [{"exists": {"field": source.timestamp_field}}]}}, "sort": [{source.timestamp_field: "asc"}]}
+        if watermark:
+            since = utils.from_iso_to_dt(watermark) - self.lookback
+            body["query"]["bool"]["filter"].append({"range": {source.timestamp_field: {"gte": utils.from_dt_to_iso(since)}}})
+
+        search_kwargs = {"ignore_unavailable": True, "allow_no_indices": True}
+        if source.source_includes is not None:
+            search_kwargs["_source_includes"] = [source.timestamp_field, *source.source_includes]
+
+        count = 0
+        latest_dt = utils.from_iso_to_dt(watermark) if watermark else None
+        for hits in query.iter_hit_pages(body=body, index=source.index, page_size=self.page_size, **search_kwargs):
+            docs = [query.map_doc_to_source(hit) for hit in hits]
+            for doc in docs:
+                doc["_base_id"], _ = utils.split_revision(doc["_id"])
+                doc_dt = utils.from_iso_to_dt(doc[source.timestamp_field])
+                latest_dt = max(latest_dt, doc_dt) if latest_dt else doc_dt
+            apply(docs)
+            count += len(docs)
+
+        if latest_dt:
+            self.store.set_watermark(source.name, utils.from_dt_to_iso(latest_dt))
+        LOGGER.debug(f"Synced source. {source=}, docs={count}, watermark={latest_dt}")
+        return count
@@ -0,0 +1,315 @@
+"""
+Single-flight coalescing of identical concurrent requests.
+
+When several clients request the same report (or counts) at the same time, e.g. operators opening the same dashboard,
+only the first request is computed. Identical requests that arrive while it is in flight wait for it, and are served
+a copy of its response.
+
+Requests are identical when they are to the same path with the same query parameters, regardless of parameter order.
+Empty parameters are ignored. Profiled requests (`profile` query parameter) are never coalesced.
+
+Configured in the `[COALESCING]` section of `app.conf.ini`:
+
+* ENABLED - coalesces identical requests within a process
+* DIR - a directory shared by the `gunicorn` workers. When set, identical requests are also coalesced across workers:
+  the worker computing a response holds a file lock on the request, and stores the response in `DIR` for the
+  workers waiting on the lock. Empty disables coalescing across workers.
+
+Shared responses are read into memory, so only responses that other requests wait for are. Responses stored in `DIR`
+are deleted after `STORED_RESPONSE_TTL_SECONDS`.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from flask import Response, current_app, request
+from flask_restx.utils import unpack
+
+from accountability_api import metrics
+from accountability_api.configuration_obj import ConfigurationObj
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+LOGGER = logging.getLogger()
+
+IGNORED_PARAMS = {"profile"}
+
+_EXCLUDED_HEADERS = {"content-length", "transfer-encoding"}
+"""Headers recomputed when the response is copied."""
+
+STORED_RESPONSE_TTL_SECONDS = 60
+"""Age after which stored responses and unused locks are deleted. Waiting processes read responses as soon as stored."""
+
+STALE_WAITING_SECONDS = 24 * 60 * 60
+
+
+@dataclass
+class StoredResponse:
+    """A fully-read response, that can be copied for each coalesced request."""
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+    @classmethod
+    def from_response(cls, response: Response) -> "StoredResponse":
+        # file responses (e.g. `send_file`) are streamed. read them fully
+        response.direct_passthrough = False
+        try:
+            body = response.get_data()
+        finally:
+            response.close()
+        headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _EXCLUDED_HEADERS]
+        return cls(status=response.status_code, headers=headers, body=body)
+
+    def to_response(self) -> Response:
+        return current_app.response_class(self.body, status=self.status, headers=self.headers)
+
+
+@dataclass
+class _Flight:
+    done: threading.Event
+    waiters: int = 0
+    result: Optional[StoredResponse] = None
+    error: Optional[BaseException] = None
+
+
+class ResultStore:
+    """
+    Responses stored in a directory shared by processes, with a file lock per request.
+
+    Files are named after the hash of the request key. A process waiting on the lock of a request marks itself as
+    waiting, so that responses are only stored when another process waits for them. Stored responses, and the locks
+    of requests no longer in flight, are deleted after `ttl_seconds`.
+    """
+
+    def __init__(self, store_dir: str, ttl_seconds: float = STORED_RESPONSE_TTL_SECONDS):
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[bool]:
+        """
+        Exclusive lock on the given key, across processes. Blocks until acquired.
+
+        :return: whether the lock was held by another process (i.e. this process waited for it)
+        """
+        lock_path = self._path(key, ".lock")
+        with open(lock_path, "a") as fp:
+            waited = False
+            if fcntl:
+                try:
+                    fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    waited = True
+                    waiting_path = self._path(key, f".{os.getpid()}.{threading.get_ident()}.waiting")
+                    waiting_path.touch()
+                    try:
+                        fcntl.flock(fp, fcntl.LOCK_EX)
+                    finally:
+                        waiting_path.unlink(missing_ok=True)
+            os.utime(lock_path)  # in use. see `sweep`
+            try:
+                yield waited
+            finally:
+                if fcntl:
+                    fcntl.flock(fp, fcntl.LOCK_UN)
+
+    def has_waiters(self, key: str) -> bool:
+        """:return: whether other processes wait on the lock of the given key"""
+        return any(self.store_dir.glob(self._path(key, ".*.waiting").name))
+
+    def get(self, key: str, newer_than: float = 0) -> Optional[StoredResponse]:
+        """:return: the response stored for the given key, if it was stored after `newer_than` (epoch seconds)"""
+        path = self._path(key, ".response")
+        try:
+            if path.stat().st_mtime < newer_than:
+                return None
+            with open(path, "rb") as fp:
+                header = json.loads(fp.readline())
+                body = fp.read()
+        except FileNotFoundError:
+            return None
+        return StoredResponse(status=header["status"], headers=[tuple(h) for h in header["headers"]], body=body)
+
+    def put(self, key: str, response: StoredResponse):
+        """Stores the response for the given key, replacing any previous response atomically."""
+        header = json.dumps({"key": key, "status": response.status, "headers": response.headers})
+        fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                fp.write(header.encode("utf-8") + b"\n")
+                fp.write(response.body)
+            os.replace(tmp_path, self._path(key, ".response"))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def sweep(self):
+        """
+        Deletes the responses stored more than `ttl_seconds` ago, and the locks not used since then.
+        Waiting marks of processes that exited while waiting are deleted after `STALE_WAITING_SECONDS`.
+        """
+        now = time.time()
+        for path in self.store_dir.iterdir():
+            try:
+                age = now - path.stat().st_mtime
+                if path.suffix in (".response", ".tmp") and age > self.ttl_seconds:
+                    path.unlink()
+                elif path.suffix == ".waiting" and age > STALE_WAITING_SECONDS:
+                    path.unlink()
+                elif path.suffix == ".lock" and age > self.ttl_seconds:
+                    with open(path, "a") as fp:
+                        if fcntl:
+                            fcntl.flock(fp, fcntl.LOCK_EX | fcntl.LOCK_NB)  # not in flight
+                        path.unlink()
+            except (FileNotFoundError, BlockingIOError):
+                continue
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.store_dir / (hashlib.sha256(key.encode("utf-8")).hexdigest() + suffix)
+
+
+class Coalescer:
+    """
+    Runs at most one computation per key at a time. Callers with the same key wait for, and share, the result of the
+    computation in flight. See the module documentation.
+
+    Responses are only read into memory (and stored) when shared, so that responses computed without waiting callers
+    are streamed as usual (e.g. `send_file` reports).
+    """
+
+    def __init__(self, store: Optional[ResultStore] = None):
+        self.store = store
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+
+    def do(self, key: str, compute: Callable[[], Response]) -> Tuple[Response, Optional[str]]:
+        """
+        :return: the computed response, and where it was shared from ( inflight | store ). None when computed by this call.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(done=threading.Event())
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result.to_response(), "inflight"
+
+        try:
+            if self.store is None:
+                return self._finish(key, flight, compute()), None
+            return self._do_across_processes(key, flight, compute)
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self._flights.pop(key, None)
+            raise
+        finally:
+            flight.done.set()
+
+    def _do_across_processes(self, key: str, flight: _Flight, compute: Callable[[], Response]) -> Tuple[Response, Optional[str]]:
+        waiting_since = time.time()
+        try:
+            with self.store.lock(key) as waited:
+                # stored while waiting for the lock, by the process that held it
+                stored = self.store.get(key, newer_than=waiting_since) if waited else None
+                if stored is not None:
+                    flight.result = stored
+                    with self._lock:
+                        del self._flights[key]
+                    return stored.to_response(), "store"
+
+                response = compute()
+                share_across_processes = self.store.has_waiters(key)
+                response = self._finish(key, flight, response, share=share_across_processes)
+                if share_across_processes:
+                    self.store.put(key, flight.result)
+                return response, None
+        finally:
+            self.store.sweep()
+
+    def _finish(self, key: str, flight: _Flight, response: Response, share: bool = False) -> Response:
+        """Ends the flight. The response is read into memory for the waiting callers, if any."""
+        with self._lock:
+            del self._flights[key]
+            share = share or flight.waiters > 0
+        if not share:
+            return response
+        flight.result = StoredResponse.from_response(response)
+        return flight.result.to_response()
+
+
+_coalescer: Optional[Coalescer] = None
+_coalescer_initialized = False
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer() -> Optional[Coalescer]:
+    """:return: the configured coalescer. None when coalescing is disabled."""
+    global _coalescer, _coalescer_initialized
+    with _coalescer_lock:
+        if not _coalescer_initialized:
+            config = ConfigurationObj()
+            if config.get_item("ENABLED", profile="COALESCING", default="False").strip().lower() == "true":
+                store_dir = config.get_item("DIR", profile="COALESCING", default="").strip()
+                _coalescer = Coalescer(ResultStore(store_dir) if store_dir else None)
+            _coalescer_initialized = True
+        return _coalescer
+
+
+def request_key() -> str:
+    """:return: the key of the current request. Identical requests have the same key."""
+    args = sorted(
+        (k, v)
+        for k, v in request.args.items(multi=True)
+        if k not in IGNORED_PARAMS and v.strip()
+    )
+    return json.dumps([request.path, args], separators=(",", ":"))
+
+
+def coalesced(view):
+    """Decorator that coalesces identical concurrent requests to the decorated view function. See the module documentation."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        coalescer = get_coalescer()
+        if coalescer is None or request.args.get("profile"):
+            return view(*args, **kwargs)
+
+        def compute() -> Response:
+            return _make_response(view(*args, **kwargs), resource=args[0] if args else None)
+
+        key = request_key()
+        response, source = coalescer.do(key, compute)
+        if source:
+            LOGGER.info(f"Coalesced request. {key=}, {source=}")
+            metrics.COALESCED_REQUESTS.labels(request.endpoint, source).inc()
+        return response
+    return wrapper
+
+
+def _make_response(result, resource=None) -> Response:
+    if isinstance(result, Response):
+        return result
+    if hasattr(resource, "api"):  # flask_restx resource. serialize with its representations, as flask_restx would
+        data, code, headers = unpack(result)
+        return resource.api.make_response(data, code, headers=headers)
+    return current_app.make_response(result)
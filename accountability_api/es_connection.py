@@ -9,6 +9,8 @@ from aws_requests_auth.boto_utils import BotoAWSRequestsAuth
 from hysds_commons.elasticsearch_utils import ElasticsearchUtility
 from hysds.celery import app
 
+from accountability_api import es_recording
+
 MOZART_ES = None
 GRQ_ES = None
 
@@ -26,6 +28,12 @@ def get_grq_es(logger=None) -> ElasticsearchUtility:
     if GRQ_ES is None:
         aws_es = app.conf.get("GRQ_AWS_ES", False)
 
+        # record or replay Elasticsearch traffic, if configured
+        transport_kwargs = {}
+        transport_class = es_recording.get_transport_class()
+        if transport_class:
+            transport_kwargs["transport_class"] = transport_class
+
         if aws_es is True:
             es_host = app.conf["GRQ_ES_HOST"]
             es_url = app.conf["GRQ_ES_URL"]
@@ -42,6 +50,7 @@ def get_grq_es(logger=None) -> ElasticsearchUtility:
                 use_ssl=True,
                 verify_certs=False,
                 ssl_show_warn=False,
+                **transport_kwargs
             )
         else:
             es_url = app.conf["GRQ_ES_URL"]
@@ -54,5 +63,6 @@ def get_grq_es(logger=None) -> ElasticsearchUtility:
                 # use_ssl=True,
                 # verify_certs=False,
                 # ssl_show_warn=False,
+                **transport_kwargs
             )
     return GRQ_ES
@@ -0,0 +1,245 @@
+"""
+Record and replay of Elasticsearch traffic.
+
+Configured in the `[ES_RECORDING]` section of `app.conf.ini`:
+
+* MODE = record - every request to the GRQ Elasticsearch and its response (or error) is appended to `PATH`, along
+  with the request latency
+* MODE = replay - requests are served from the recording at `PATH` without a connection to Elasticsearch,
+  after sleeping the recorded latency (scaled by `LATENCY_SCALE`. 0 disables the sleep)
+
+Recordings are gzipped JSON lines. Request headers are not recorded, and the values of the fields listed in
+`REDACT_FIELDS` are replaced in request and response bodies, e.g. to remove user names before sharing a recording.
+
+Each process (e.g. each gunicorn worker) records to its own file, `PATH` suffixed with the process ID (e.g.
+es_recording.1234.jsonl.gz), as concurrent gzip streams can't share a file. Records are flushed every
+`FLUSH_INTERVAL_SECONDS` and on exit. Replay reads the recordings of every process.
+
+Requests are matched on method, URL, query parameters and body. Identical requests are replayed in recorded order.
+As scroll IDs are replayed from the recording, scrolls are replayed too.
+"""
+import atexit
+import functools
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+from elasticsearch import Transport
+from elasticsearch.exceptions import HTTP_EXCEPTIONS, TransportError
+
+from accountability_api.configuration_obj import ConfigurationObj
+
+LOGGER = logging.getLogger()
+
+RECORDING_VERSION = 1
+REDACTED = "REDACTED"
+FLUSH_INTERVAL_SECONDS = 5
+
+_IGNORED_PARAMS = {"request_timeout", "ignore", "opaque_id", "api_key"}
+"""Client-side query parameters that do not change the response."""
+
+
+def get_transport_class() -> Optional[functools.partial]:
+    """
+    :return: the transport class for the configured mode, to be passed to the `Elasticsearch` client as `transport_class`.
+             None when recording and replay are disabled.
+    """
+    config = ConfigurationObj()
+    mode = config.get_item("MODE", profile="ES_RECORDING", default="off").strip().lower()
+    if mode == "off":
+        return None
+
+    path = config.get_item("PATH", profile="ES_RECORDING", default="es_recording.jsonl.gz")
+    redact_fields = [f.strip() for f in config.get_item("REDACT_FIELDS", profile="ES_RECORDING", default="").split(",") if f.strip()]
+    if mode == "record":
+        LOGGER.warning(f"Recording Elasticsearch traffic. {path=}")
+        return functools.partial(RecordingTransport, recording_path=path, redact_fields=redact_fields)
+    elif mode == "replay":
+        latency_scale = float(config.get_item("LATENCY_SCALE", profile="ES_RECORDING", default="1"))
+        LOGGER.warning(f"Replaying Elasticsearch traffic. {path=}")
+        return functools.partial(ReplayTransport, recording_path=path, redact_fields=redact_fields, latency_scale=latency_scale)
+    else:
+        raise Exception(f"Unsupported Elasticsearch recording mode. {mode=}")
+
+
+class RecordingTransport(Transport):
+    """Transport that records every request and its response. See the module documentation."""
+
+    def __init__(self, hosts, recording_path: str, redact_fields: Iterable[str] = (), **kwargs):
+        super().__init__(hosts, **kwargs)
+        self._redact_fields = set(redact_fields)
+        self._recording_path = recording_path
+
+    def perform_request(self, method, url, headers=None, params=None, body=None):
+        record = {"request": _to_request(method, url, params, body, self._redact_fields)}
+        start = time.perf_counter()
+        try:
+            response = super().perform_request(method, url, headers=headers, params=params, body=body)
+        except TransportError as e:
+            if isinstance(e.status_code, int):  # not a connection error
+                record["latency"] = time.perf_counter() - start
+                record["error"] = {"status": e.status_code, "error": e.error, "info": _redact(e.info, self._redact_fields)}
+                _get_recording_writer(self._recording_path).write(record)
+            raise
+        record["latency"] = time.perf_counter() - start
+        record["response"] = _redact(response, self._redact_fields)
+        _get_recording_writer(self._recording_path).write(record)
+        return response
+
+    def close(self):
+        super().close()
+        _get_recording_writer(self._recording_path).close()
+
+
+class RecordingWriter:
+    """
+    Appends records to the recording file of a process. Shared by the transports of the process.
+    Closing ends the gzip stream. The next record is appended as a new gzip stream.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._fp = None
+        self._flushed_at = 0.0
+
+    def write(self, record: Dict):
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock:
+            if self._fp is None:
+                self._fp = gzip.open(self.path, "at", encoding="utf-8")
+                self._fp.write(json.dumps({"version": RECORDING_VERSION, "recorded_at": time.time(), "pid": os.getpid()}) + "\n")
+                self._flushed_at = time.monotonic()
+            self._fp.write(line + "\n")
+            if time.monotonic() - self._flushed_at >= FLUSH_INTERVAL_SECONDS:
+                self._fp.flush()
+                self._flushed_at = time.monotonic()
+
+    def close(self):
+        if os.getpid() != self._pid:  # inherited by a forked worker. the stream belongs to the parent
+            return
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+
+_recording_writers: Dict[str, RecordingWriter] = {}
+_recording_writers_lock = threading.Lock()
+
+
+def _get_recording_writer(recording_path: str) -> RecordingWriter:
+    path = get_process_recording_path(recording_path)
+    with _recording_writers_lock:
+        writer = _recording_writers.get(path)
+        if writer is None:
+            writer = _recording_writers[path] = RecordingWriter(path)
+            atexit.register(writer.close)
+        return writer
+
+
+def get_process_recording_path(recording_path: str, pid: Optional[int] = None) -> str:
+    """:return: the recording path of the given process (this process by default), e.g. es_recording.1234.jsonl.gz"""
+    path = Path(recording_path)
+    name, suffixes = path.name.split(".", 1) if "." in path.name else (path.name, "")
+    return str(path.with_name(f"{name}.{pid or os.getpid()}" + (f".{suffixes}" if suffixes else "")))
+
+
+def get_recording_paths(recording_path: str) -> List[str]:
+    """:return: the recording paths of every process, and the given path itself if it exists (e.g. a merged recording)"""
+    path = Path(recording_path)
+    name, suffixes = path.name.split(".", 1) if "." in path.name else (path.name, "")
+    pattern = f"{name}.*" + (f".{suffixes}" if suffixes else "")
+    paths = [str(p) for p in sorted(path.parent.glob(pattern)) if p.name[len(name) + 1:].split(".", 1)[0].isdigit()]
+    return ([recording_path] if path.exists() else []) + paths
+
+
+class ReplayTransport(Transport):
+    """Transport that serves requests from a recording. See the module documentation."""
+
+    def __init__(self, hosts, recording_path: str, redact_fields: Iterable[str] = (), latency_scale: float = 1, **kwargs):
+        super().__init__(hosts, **kwargs)
+        self._redact_fields = set(redact_fields)
+        self._latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._records: Dict[str, Deque[Dict]] = load_recording(recording_path)
+
+    def perform_request(self, method, url, headers=None, params=None, body=None):
+        key = _request_key(_to_request(method, url, params, body, self._redact_fields))
+        with self._lock:
+            records = self._records.get(key)
+            if not records:
+                raise ReplayMissError(f"No recorded response for request. {method=}, {url=}, {params=}")
+            record = records.popleft() if len(records) > 1 else records[0]  # the last response is served repeatedly
+
+        if self._latency_scale:
+            time.sleep(record["latency"] * self._latency_scale)
+
+        if "error" in record:
+            error = record["error"]
+            ignore = (params or {}).get("ignore", ())
+            if error["status"] in (ignore if isinstance(ignore, (list, tuple)) else (ignore,)):
+                return error["info"]
+            if method == "HEAD" and error["status"] == 404:
+                return False
+            raise HTTP_EXCEPTIONS.get(error["status"], TransportError)(error["status"], error["error"], error["info"])
+        return record["response"]
+
+
+class ReplayMissError(Exception):
+    pass
+
+
+def load_recording(recording_path: str) -> Dict[str, Deque[Dict]]:
+    """
+    :param recording_path: the configured `PATH`. The recordings of every process are loaded (see `get_recording_paths`).
+    :return: the recorded requests and responses, grouped by request, in recorded order
+    """
+    records = defaultdict(deque)
+    paths = get_recording_paths(recording_path)
+    if not paths:
+        raise FileNotFoundError(f"No recording found. {recording_path=}")
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as fp:
+            for line in fp:
+                record = json.loads(line)
+                if "request" not in record:  # header
+                    continue
+                records[_request_key(record["request"])].append(record)
+    return records
+
+
+def _to_request(method: str, url: str, params: Optional[Dict], body: Any, redact_fields) -> Dict:
+    params = {
+        k: (",".join(map(str, v)) if isinstance(v, (list, tuple)) else str(v))
+        for k, v in (params or {}).items()
+        if k not in _IGNORED_PARAMS and not k.startswith("__")
+    }
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    if isinstance(body, str) and "\n" in body.strip():  # ndjson (e.g. msearch, bulk)
+        body = [json.loads(line) for line in body.splitlines() if line.strip()]
+    elif isinstance(body, str) and body:
+        body = json.loads(body)
+    return {"method": method, "url": url, "params": params, "body": _redact(body, redact_fields)}
+
+
+def _request_key(request: Dict) -> str:
+    return json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def _redact(value, redact_fields):
+    if not redact_fields:
+        return value
+    if isinstance(value, dict):
+        return {k: (REDACTED if k in redact_fields else _redact(v, redact_fields)) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_redact(v, redact_fields) for v in value]
+    return value
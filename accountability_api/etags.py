@@ -0,0 +1,132 @@
+"""
+ETags for responses computed from the GRQ indexes, and conditional requests.
+
+The state of the indexes (per index pattern in `metadata`, the doc count, the max of each timestamp field and the doc
+count per status) is cheaply probed with a single multi-search, see `query.probe_indexes`. Docs are also updated in
+place in ways that change none of these (e.g. the latest download of a catalogued CSLC, or the DAAC delivery of a
+product), so the number of write operations on each index is fetched alongside, with a single `_stats/indexing`
+request, see `query.get_index_write_counts`. The ETag of a response is derived from the request (path and query
+parameters) and the state of the indexes, so it only changes when the indexes do. Requests with a matching
+`If-None-Match` header get a `304 Not Modified` response, without computing the response.
+
+Probes are cached for `PROBE_TTL_SECONDS`, so that the indexes are probed at most once per TTL by each process.
+Changes made within the TTL may be reported as not modified until the TTL expires.
+
+Configured in the `[ETAGS]` section of `app.conf.ini`.
+"""
+import functools
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from flask import after_this_request, current_app, request
+from more_itertools import always_iterable
+
+from accountability_api.api_utils import metadata, query
+from accountability_api.configuration_obj import ConfigurationObj
+
+LOGGER = logging.getLogger()
+
+IGNORED_PARAMS = {"profile"}
+
+
+PRODUCT_TIMESTAMP_FIELDS = ["creation_timestamp", "daac_CNM_S_timestamp"]
+PRODUCT_STATUS_FIELDS = ["daac_CNM_S_status", "daac_delivery_status"]
+
+
+def get_index_patterns() -> Dict[str, Tuple[List[str], List[str]]]:
+    """:return: map of the index patterns in `metadata` to the timestamp and status fields tracking changes to their docs"""
+    index_to_fields = {}
+    for index_dict in (metadata.INPUT_PRODUCT_TYPE_TO_INDEX, metadata.INCOMING_SDP_PRODUCTS):
+        for indexes in index_dict.values():
+            for index in always_iterable(indexes):
+                index_to_fields[index] = (["creation_timestamp"], [])
+    for index_dict in (
+            metadata.PRODUCT_TYPE_TO_INDEX,
+            metadata.GENERATED_PRODUCTS,
+            metadata.OUTGOING_PRODUCTS_TO_DAAC):
+        for indexes in index_dict.values():
+            for index in always_iterable(indexes):
+                index_to_fields[index] = (PRODUCT_TIMESTAMP_FIELDS, PRODUCT_STATUS_FIELDS)
+    for index in metadata.ANCILLARY_CATALOG_INDEXES:
+        index_to_fields[index] = (["creation_timestamp"], [])
+    for index in metadata.ACCOUNTABILITY_INDEXES.values():
+        index_to_fields[index] = (["last_modified"], [])
+    return index_to_fields
+
+
+class IndexProbe:
+    """Caches the fingerprint of the state of the indexes. See the module documentation."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[Tuple[float, str]] = None
+
+    def get_fingerprint(self) -> str:
+        with self._lock:
+            if self._fingerprint is None or time.monotonic() - self._fingerprint[0] > self.ttl_seconds:
+                index_to_fields = get_index_patterns()
+                states = query.probe_indexes(index_to_fields)
+                write_counts = query.get_index_write_counts(list(index_to_fields))
+                fingerprint = hashlib.sha256(
+                    json.dumps([sorted(states.items()), sorted(write_counts.items())], sort_keys=True).encode("utf-8")
+                ).hexdigest()
+                self._fingerprint = (time.monotonic(), fingerprint)
+            return self._fingerprint[1]
+
+
+_probe: Optional[IndexProbe] = None
+_probe_initialized = False
+_probe_lock = threading.Lock()
+
+
+def get_index_probe() -> Optional[IndexProbe]:
+    """:return: the configured index probe. None when ETags are disabled."""
+    global _probe, _probe_initialized
+    with _probe_lock:
+        if not _probe_initialized:
+            config = ConfigurationObj()
+            if config.get_item("ENABLED", profile="ETAGS", default="False").strip().lower() == "true":
+                _probe = IndexProbe(ttl_seconds=float(config.get_item("PROBE_TTL_SECONDS", profile="ETAGS", default="5")))
+            _probe_initialized = True
+        return _probe
+
+
+def request_etag(fingerprint: str) -> str:
+    """:return: the ETag of the current request, given the fingerprint of the state of the indexes"""
+    args = sorted((k, v) for k, v in request.args.items(multi=True) if k not in IGNORED_PARAMS)
+    key = json.dumps([request.path, args, fingerprint], separators=(",", ":"))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def etagged(view):
+    """Decorator that adds ETags to, and honours `If-None-Match` for, the decorated view function. See the module documentation."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        probe = get_index_probe()
+        if probe is None or request.args.get("profile"):
+            return view(*args, **kwargs)
+
+        try:
+            etag = request_etag(probe.get_fingerprint())
+        except Exception:
+            LOGGER.exception("Failed to probe indexes. Not adding an ETag.")
+            return view(*args, **kwargs)
+
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        @after_this_request
+        def add_etag_header(response):
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,4 @@
+"""
+gunicorn configuration module. Use with `gunicorn -c python:accountability_api.gunicorn_conf ...`
+"""
+from accountability_api.metrics import child_exit, on_starting  # noqa: F401
@@ -1,56 +1,161 @@
+"""
+Restores Elasticsearch indexes from backup docs and mappings, for local development and benchmarks.
+
+Backup layout:
+
+    <backup_dir>/<index>/mapping.json       (optional) the index mappings, or a create index body with "mappings" and/or "settings"
+    <backup_dir>/<index>/docs/<id>.json     one document per file
+
+Each index is deleted and recreated with its mapping, then documents are read lazily and loaded with parallel bulk
+requests. Refresh is disabled while loading. Throughput and failures are reported per index.
+
+e.g.
+    python accountability_api/load_es_data.py tests/grq_es_data/ grq
+    python accountability_api/load_es_data.py /tmp/catalog/ --url http://localhost:9200 --threads 8
+"""
+import argparse
+import json
+import logging
 import os
 import sys
-import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
 
-from api_utils import connect_to_es
+from elasticsearch import Elasticsearch, helpers
 
-local_grq_es = connect_to_es("localhost:9200")
-local_mozart_es = connect_to_es("localhost:9300")
+LOGGER = logging.getLogger()
 
 GRQ_ES_URL = "http://localhost:9200/"
 MOZART_ES_URL = "http://localhost:9300/"
 
+ES_URLS = {"grq": GRQ_ES_URL, "mozart": MOZART_ES_URL}
+
+MAX_FAILURES_LOGGED = 10
+
+
+@dataclass
+class RestoreResult:
+    index: str
+    docs: int = 0
+    failures: List[dict] = field(default_factory=list)
+    seconds: float = 0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.docs / self.seconds if self.seconds else 0
 
-def restore(backup_dir, es_docker_name="grq"):
-    """Restore ES index from backup docs and mapping."""
 
-    # get files
-    docs_files = os.listdir(backup_dir)
-    local_es = None
+def restore(backup_dir, es_docker_name="grq", es: Optional[Elasticsearch] = None, thread_count=4, chunk_size=500) -> List[RestoreResult]:
+    """
+    Restore ES indexes from backup docs and mappings. See the module documentation for the backup layout.
 
-    if es_docker_name == "grq":
-        local_es = local_grq_es
-    elif es_docker_name == "mozart":
-        local_es = local_mozart_es
-    else:
-        raise Exception("Could not find requested es docker instance")
+    :param backup_dir: the backup directory. Each subdirectory is an index.
+    :param es_docker_name: the local Elasticsearch to restore to ( grq | mozart ). Ignored when `es` is given.
+    :param es: the Elasticsearch client
+    :param thread_count: the number of concurrent bulk requests
+    :param chunk_size: the number of documents per bulk request
+    :return: the result of each restored index
+    """
+    if es is None:
+        if es_docker_name not in ES_URLS:
+            raise Exception("Could not find requested es docker instance")
+        es = Elasticsearch(ES_URLS[es_docker_name])
 
-    local_es.cluster.health(wait_for_status="yellow", timeout="50s")
+    es.cluster.health(wait_for_status="yellow", timeout="50s")
 
-    for index in docs_files:
-        # delete all indexes
-        try:
-            local_es.indices.delete(index)
-        except Exception:
-            pass
+    results = []
+    for index_dir in sorted(Path(backup_dir).iterdir()):
+        if not (index_dir / "docs").is_dir():
+            continue
+        results.append(restore_index(es, index_dir.name, index_dir, thread_count=thread_count, chunk_size=chunk_size))
 
-        local_es.indices.create(index)
+    total_docs = sum(result.docs for result in results)
+    total_failures = sum(len(result.failures) for result in results)
+    LOGGER.info(f"Restored {len(results)} indexes. {total_docs=}, {total_failures=}")
+    return results
 
-        path = backup_dir + index + "/docs"
-        docs = os.listdir(path)
-        for doc in docs:
-            j = None
-            with open(path + "/" + doc) as f:
-                j = json.load(f)
-                try:
-                    local_es.create(index, doc.split(".")[0], j, doc_type="_doc")
-                except Exception:
-                    pass
+
+def restore_index(es: Elasticsearch, index: str, index_dir: Path, thread_count=4, chunk_size=500) -> RestoreResult:
+    """Restore a single ES index from backup docs and mapping. See `restore`."""
+    es.indices.delete(index=index, ignore=[404])
+    es.indices.create(index=index, body=_read_create_index_body(index_dir))
+    es.indices.put_settings(index=index, body={"index": {"refresh_interval": "-1"}})
+
+    result = RestoreResult(index)
+    start = time.perf_counter()
+    try:
+        for ok, item in helpers.parallel_bulk(
+                es,
+                _iter_actions(index, index_dir / "docs"),
+                thread_count=thread_count,
+                chunk_size=chunk_size,
+                raise_on_error=False,
+                raise_on_exception=False):
+            if ok:
+                result.docs += 1
+            else:
+                result.failures.append(item)
+    finally:
+        # restore the default refresh interval
+        es.indices.put_settings(index=index, body={"index": {"refresh_interval": None}})
+        es.indices.refresh(index=index)
+    result.seconds = time.perf_counter() - start
+
+    LOGGER.info(
+        f"Restored index. {index=}, docs={result.docs}, failures={len(result.failures)}, "
+        f"seconds={result.seconds:.1f}, docs/s={result.docs_per_second:,.0f}"
+    )
+    for failure in result.failures[:MAX_FAILURES_LOGGED]:
+        LOGGER.warning(f"Failed to restore document. {index=}, {failure=}")
+    return result
+
+
+def _read_create_index_body(index_dir: Path) -> Dict:
+    mapping_path = index_dir / "mapping.json"
+    if not mapping_path.exists():
+        return {}
+
+    with open(mapping_path) as fp:
+        mapping = json.load(fp)
+    if "mappings" in mapping or "settings" in mapping:
+        return {k: v for k, v in mapping.items() if k in ("mappings", "settings")}
+    return {"mappings": mapping}
+
+
+def _iter_actions(index: str, docs_dir: Path) -> Iterator[Dict]:
+    with os.scandir(docs_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".json"):
+                continue
+            with open(entry.path) as fp:
+                source = json.load(fp)
+            yield {
+                "_op_type": "create",
+                "_index": index,
+                "_id": entry.name[:-len(".json")],
+                "_source": source
+            }
 
 
 if __name__ == "__main__":
-    backup_idx_dir = sys.argv[1]
-    es_docker_name = "grq"
-    if len(sys.argv) > 2:
-        es_docker_name = sys.argv[2]
-    restore(backup_idx_dir, es_docker_name=es_docker_name)
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Restore Elasticsearch indexes from backup docs and mappings.")
+    parser.add_argument("backup_dir")
+    parser.add_argument("es_docker_name", nargs="?", default="grq", choices=list(ES_URLS))
+    parser.add_argument("--url", help="The Elasticsearch URL. Overrides es_docker_name.")
+    parser.add_argument("--threads", type=int, default=4, help="The number of concurrent bulk requests.")
+    parser.add_argument("--chunk-size", type=int, default=500, help="The number of documents per bulk request.")
+    args = parser.parse_args()
+
+    results = restore(
+        args.backup_dir,
+        es_docker_name=args.es_docker_name,
+        es=Elasticsearch(args.url) if args.url else None,
+        thread_count=args.threads,
+        chunk_size=args.chunk_size
+    )
+    if any(result.failures for result in results):
+        sys.exit(1)
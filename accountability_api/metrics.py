@@ -0,0 +1,178 @@
+"""
+Prometheus metrics.
+
+Metrics are exposed at `/metrics`. When running under gunicorn with several workers, set the `PROMETHEUS_MULTIPROC_DIR`
+environment variable to a writable directory so that metrics are aggregated across workers, and use
+`accountability_api.gunicorn_conf` so that the directory is emptied on start and the metrics of exited workers are cleaned up.
+
+Report generation phases:
+
+* fetch - querying Elasticsearch for the report's docs
+* aggregate - querying Elasticsearch for the report's statistics, computed server-side
+* mirror_query - querying the local analytical mirror (see `api_utils.mirror`)
+* enrich - querying ancillary catalogs to augment the docs
+* transform - converting docs to the report data frame (including histograms)
+* render - converting the report data frame to the output document (CSV, HTML, XML, typed columns)
+* serialize - encoding the output and writing report files (JSON, Parquet, Arrow, zip)
+"""
+import glob
+import os
+import re
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Optional, Union
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from accountability_api import tracing
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, float("inf"))
+BYTES_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000, float("inf"))
+
+REQUEST_LATENCY = Histogram(
+    "bach_api_request_duration_seconds",
+    "Latency of HTTP requests",
+    ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    "bach_api_response_bytes",
+    "Size of HTTP response bodies",
+    ["endpoint"],
+    buckets=BYTES_BUCKETS
+)
+ES_LATENCY = Histogram(
+    "bach_api_es_request_duration_seconds",
+    "Latency of Elasticsearch requests",
+    ["operation", "index"],
+    buckets=LATENCY_BUCKETS
+)
+ES_HITS = Counter(
+    "bach_api_es_hits",
+    "Number of hits returned by Elasticsearch requests",
+    ["operation", "index"]
+)
+REPORT_PHASE_LATENCY = Histogram(
+    "bach_api_report_phase_duration_seconds",
+    "Latency of report generation phases",
+    ["report", "phase"],
+    buckets=LATENCY_BUCKETS
+)
+COALESCED_REQUESTS = Counter(
+    "bach_api_coalesced_requests",
+    "Number of requests served the response of an identical concurrent request",
+    ["endpoint", "source"]
+)
+
+
+def init_app(app: Flask):
+    """
+    Registers the request hooks and the `/metrics` endpoint.
+    Register before extensions that transform the response body (e.g. compression), so that the sent size is measured.
+    """
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+    app.add_url_rule("/metrics", endpoint="metrics", view_func=_metrics_view)
+
+
+def _start_request_timer():
+    g.metrics_request_start = time.perf_counter()
+
+
+def _observe_request(response: Response):
+    start = g.pop("metrics_request_start", None)
+    if start is None:
+        return response
+
+    endpoint = request.url_rule.rule if request.url_rule else "<unmatched>"
+    REQUEST_LATENCY.labels(endpoint, request.method, response.status_code).observe(time.perf_counter() - start)
+    if response.content_length is not None:
+        RESPONSE_BYTES.labels(endpoint).observe(response.content_length)
+    return response
+
+
+def _metrics_view():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+@contextmanager
+def observe_es(operation: str, index: Union[str, List[str], None]) -> Iterator[Callable[[Dict], None]]:
+    """
+    Times the Elasticsearch request within the context.
+
+    :param operation: the Elasticsearch operation (e.g. "search", "scroll", "count")
+    :param index: the searched index pattern, multi-index expression, or list of index patterns
+    :return: a function that records the hits of the given Elasticsearch result
+    """
+    if isinstance(index, (list, tuple)):
+        index = ",".join(index)
+    index = index_label(index)
+
+    def record_hits(result: Dict):
+        ES_HITS.labels(operation, index).inc(len(result.get("hits", {}).get("hits", [])))
+
+    start = time.perf_counter()
+    try:
+        yield record_hits
+    finally:
+        ES_LATENCY.labels(operation, index).observe(time.perf_counter() - start)
+
+
+@contextmanager
+def report_phase(report: str, phase: str):
+    """
+    Times (and traces) the report generation phase within the context. See the module documentation for the phases.
+
+    :return: the phase span. See `tracing.span`.
+    """
+    start = time.perf_counter()
+    try:
+        with tracing.span(f"{report}.{phase}") as span:
+            yield span
+    finally:
+        REPORT_PHASE_LATENCY.labels(report, phase).observe(time.perf_counter() - start)
+
+
+@lru_cache(maxsize=1024)
+def index_label(index: Optional[str]) -> str:
+    """
+    Normalizes the index expression for use as a metric label.
+    Numbers not following a letter (e.g. dates and versions of concrete index names) are replaced with "*",
+    so that resolved concrete indexes are labelled like the patterns they were resolved from.
+
+    e.g. "grq_v2.0_l2_hls_l30-2023.01" -> "grq_v2.*_l2_hls_l30-*.*"
+    """
+    if not index:
+        return "*"
+    parts = {re.sub(r"(?<![A-Za-z\d])\d+", "*", part) for part in index.split(",")}
+    return ",".join(sorted(parts))
+
+
+def on_starting(server):
+    """gunicorn server hook. Creates the multiprocess metrics directory, and removes the metrics files of previous runs."""
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for path in glob.glob(os.path.join(multiproc_dir, "*.db")):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    """gunicorn server hook. Removes the metrics files of exited workers."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(worker.pid)
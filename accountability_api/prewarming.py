@@ -0,0 +1,254 @@
+"""
+Scheduled pre-warming of rolling-window reports.
+
+The most common report requests are for rolling windows ending now, e.g. the summaries of the last 24 hours or
+7 days. A background thread regenerates a configured set of these reports on an interval, and stores them in the
+report cache. Interactive requests for the same report and window are served from the cache instead.
+
+A request matches a pre-warmed report when it is for the same report and (non-default) parameters, and its time
+range is the window ending now, give or take the interval. The cached report is then at most one interval old. Its
+generation time is returned in the `X-Prewarmed-At` response header.
+
+Configured in the `[PREWARMING]` section of `app.conf.ini`:
+
+* ENABLED - serves matching requests from the report cache
+* IN_APP - starts a pre-warming thread with the app. Disable to pre-warm from a separate process instead
+* INTERVAL_SECONDS - how often reports are regenerated
+* REPORTS, WINDOWS, MIMETYPES - comma-separated. Every combination is pre-warmed. Windows are in hours or days, e.g. 24h,7d
+* CACHE_DIR - the report cache. Shared by the `gunicorn` workers, so that each report is regenerated by one worker
+  per interval
+
+Reports can also be pre-warmed by a separate process, e.g.
+    python -m accountability_api.prewarming --once
+"""
+import argparse
+import functools
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from flask import Flask, request
+from flask_restx import reqparse
+
+from accountability_api.coalescing import ResultStore, StoredResponse
+from accountability_api.configuration_obj import ConfigurationObj
+
+LOGGER = logging.getLogger()
+
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+_RANGE_PARAMS = {"startDateTime", "endDateTime"}
+_IGNORED_PARAMS = {"profile"}
+
+_warming = threading.local()
+"""Marks the requests issued by the pre-warmer, which must not be served from the cache."""
+
+
+@dataclass(frozen=True)
+class PrewarmedReport:
+    name: str
+    window: timedelta
+    mime: str
+
+    @property
+    def path(self) -> str:
+        return f"/reports/{self.name}"
+
+
+@dataclass
+class PrewarmingConfig:
+    reports: List[PrewarmedReport]
+    interval: timedelta
+    store: ResultStore
+    in_app: bool = True
+
+
+def parse_window(window: str) -> timedelta:
+    """:return: the duration of a window like 24h or 7d"""
+    window = window.strip().lower()
+    if window.endswith("h"):
+        return timedelta(hours=float(window[:-1]))
+    if window.endswith("d"):
+        return timedelta(days=float(window[:-1]))
+    raise Exception(f"Unsupported pre-warming window. Expected hours (h) or days (d). {window=}")
+
+
+_config: Optional[PrewarmingConfig] = None
+_config_initialized = False
+_config_lock = threading.Lock()
+
+
+def get_config() -> Optional[PrewarmingConfig]:
+    """:return: the pre-warming configuration. None when pre-warming is disabled."""
+    global _config, _config_initialized
+    with _config_lock:
+        if not _config_initialized:
+            config = ConfigurationObj()
+            if config.get_item("ENABLED", profile="PREWARMING", default="False").strip().lower() == "true":
+                _config = _load_config(config)
+            _config_initialized = True
+        return _config
+
+
+def _load_config(config: ConfigurationObj) -> PrewarmingConfig:
+    def get_list(key):
+        return [item.strip() for item in config.get_item(key, profile="PREWARMING", default="").split(",") if item.strip()]
+
+    reports = [
+        PrewarmedReport(name=name, window=parse_window(window), mime=mime)
+        for name in get_list("REPORTS")
+        for window in get_list("WINDOWS")
+        for mime in get_list("MIMETYPES") or ["application/json"]
+    ]
+    return PrewarmingConfig(
+        reports=reports,
+        interval=timedelta(seconds=int(config.get_item("INTERVAL_SECONDS", profile="PREWARMING", default="300"))),
+        store=ResultStore(config.get_item("CACHE_DIR", profile="PREWARMING", default="report_cache")),
+        in_app=config.get_item("IN_APP", profile="PREWARMING", default="True").strip().lower() == "true"
+    )
+
+
+def cache_key(path: str, window: timedelta, args: Dict[str, str]) -> str:
+    """:return: the report cache key of the given report request. `args` exclude the time range and default values."""
+    return json.dumps([path, window.total_seconds(), sorted(args.items())], separators=(",", ":"))
+
+
+class Prewarmer:
+    """Regenerates the pre-warmed reports through the app, and stores them in the report cache."""
+
+    def __init__(self, app: Flask, config: PrewarmingConfig):
+        self.app = app
+        self.config = config
+
+    def run(self, stop: threading.Event):
+        """Pre-warms the reports every interval, until stopped."""
+        while not stop.is_set():
+            self.warm()
+            stop.wait(self.config.interval.total_seconds())
+
+    def warm(self):
+        """Pre-warms the reports not already pre-warmed (e.g. by another worker) within the interval."""
+        for report in self.config.reports:
+            try:
+                self._warm(report)
+            except Exception:
+                LOGGER.exception(f"Failed to pre-warm report. {report=}")
+
+    def _warm(self, report: PrewarmedReport):
+        key = cache_key(report.path, report.window, {"mime": report.mime})
+        store = self.config.store
+        with store.lock(key):
+            if store.get(key, newer_than=time.time() - self.config.interval.total_seconds()) is not None:
+                return
+
+            end = datetime.utcnow().replace(microsecond=0)
+            start = end - report.window
+            query_string = {"startDateTime": start.strftime(DATETIME_FORMAT), "endDateTime": end.strftime(DATETIME_FORMAT), "mime": report.mime}
+            _warming.active = True
+            started = time.perf_counter()
+            try:
+                with self.app.test_client() as client:
+                    response = client.get(report.path, query_string=query_string)
+            finally:
+                _warming.active = False
+
+            if response.status_code != 200:
+                LOGGER.warning(f"Not caching report. Unexpected status. {report=}, status={response.status_code}")
+                return
+            stored = StoredResponse.from_response(response)
+            stored.headers.append(("X-Prewarmed-At", end.strftime(DATETIME_FORMAT) + "Z"))
+            store.put(key, stored)
+            LOGGER.info(f"Pre-warmed report. {report=}, seconds={time.perf_counter() - started:.1f}, bytes={len(stored.body)}")
+
+
+def prewarmed(parser: reqparse.RequestParser):
+    """
+    Decorator that serves requests for pre-warmed reports from the report cache. See the module documentation.
+
+    :param parser: the request parser of the decorated view. Arguments with default values are ignored when matching.
+    """
+    defaults = {arg.name: str(arg.default) for arg in parser.args if arg.default is not None}
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            config = get_config()
+            if config is None or getattr(_warming, "active", False) or request.args.get("profile"):
+                return view(*args, **kwargs)
+
+            stored = _get_cached(config, defaults)
+            if stored is None:
+                return view(*args, **kwargs)
+            LOGGER.info(f"Serving pre-warmed report. path={request.path}")
+            return stored.to_response()
+        return wrapper
+    return decorator
+
+
+def _get_cached(config: PrewarmingConfig, defaults: Dict[str, str]) -> Optional[StoredResponse]:
+    try:
+        start = _parse_datetime(request.args.get("startDateTime", ""))
+        end = _parse_datetime(request.args.get("endDateTime", ""))
+    except ValueError:
+        return None
+
+    now = datetime.utcnow()
+    if abs(end - now) > config.interval:
+        return None
+    args = {
+        k: v
+        for k, v in request.args.items()
+        if k not in _RANGE_PARAMS and k not in _IGNORED_PARAMS and v.strip() and defaults.get(k) != v
+    }
+    for report in config.reports:
+        if report.path != request.path or abs((end - start) - report.window) > config.interval:
+            continue
+        # tolerate a pre-warmer that fell behind by up to an interval
+        stored = config.store.get(cache_key(report.path, report.window, args), newer_than=time.time() - 2 * config.interval.total_seconds())
+        if stored is not None:
+            return stored
+    return None
+
+
+def _parse_datetime(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.strip().removesuffix("Z"))
+    if dt.tzinfo:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def init_app(app: Flask):
+    """Starts the pre-warming thread, when enabled."""
+    config = get_config()
+    if config is None or not config.in_app or not config.reports:
+        return
+    LOGGER.info(f"Starting report pre-warming. reports={len(config.reports)}, interval={config.interval}")
+    thread = threading.Thread(target=Prewarmer(app, config).run, args=(threading.Event(),), name="prewarming", daemon=True)
+    thread.start()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Pre-warm the configured reports into the report cache. See the [PREWARMING] section of app.conf.ini.")
+    parser.add_argument("--config", default="accountability_api.settings.DevelopmentConfig", help="The Flask config object.")
+    parser.add_argument("--once", action="store_true", help="Pre-warm the reports once, instead of every interval.")
+    args = parser.parse_args()
+
+    config = ConfigurationObj()
+    prewarming_config = _load_config(config)
+
+    from accountability_api import create_app
+    prewarmer = Prewarmer(create_app(args.config), prewarming_config)
+    if args.once:
+        prewarmer.warm()
+    else:
+        prewarmer.run(threading.Event())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Opt-in per-request profiling.
+
+When enabled in the `[PROFILING]` section of `app.conf.ini`, requests to profiled endpoints with the `profile` query parameter
+are run under a profiler, and the profile artifact is stored in `OUTPUT_DIR`.
+The path of the artifact is returned in the `X-Profile-Artifact` response header.
+
+* profile=cpu - cProfile stats (`.prof`). Inspect with `python -m pstats` or a viewer like snakeviz.
+* profile=mem - tracemalloc statistics (`.txt`): peak traced memory, and the top allocations by line
+
+When profiling is disabled, or another request is already being profiled, the `profile` parameter is ignored.
+"""
+import cProfile
+import functools
+import logging
+import threading
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from flask import after_this_request, request
+
+from accountability_api.configuration_obj import ConfigurationObj
+
+LOGGER = logging.getLogger()
+
+PROFILE_MODES = ["cpu", "mem"]
+
+_profiling_lock = threading.Lock()
+
+
+def profiled(view):
+    """Decorator that profiles the decorated view function when requested. See the module documentation."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        mode = request.args.get("profile")
+        if not mode:
+            return view(*args, **kwargs)
+
+        config = ConfigurationObj()
+        if config.get_item("ENABLED", profile="PROFILING", default="False").strip().lower() != "true":
+            LOGGER.warning("Profiling was requested but is disabled. Ignoring.")
+            return view(*args, **kwargs)
+        if mode not in PROFILE_MODES:
+            LOGGER.warning(f"Unsupported profile mode. Ignoring. {mode=}")
+            return view(*args, **kwargs)
+        if not _profiling_lock.acquire(blocking=False):
+            LOGGER.warning("Another request is being profiled. Ignoring.")
+            return view(*args, **kwargs)
+
+        output_dir = Path(config.get_item("OUTPUT_DIR", profile="PROFILING", default="profiles"))
+        output_dir.mkdir(parents=True, exist_ok=True)
+        artifact_stem = f'{datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")}-{request.endpoint}-{mode}'.replace(".", "_")
+        try:
+            if mode == "cpu":
+                artifact_path, response = _profile_cpu(output_dir / f"{artifact_stem}.prof", view, *args, **kwargs)
+            else:
+                artifact_path, response = _profile_mem(output_dir / f"{artifact_stem}.txt", view, *args, **kwargs)
+        finally:
+            _profiling_lock.release()
+
+        LOGGER.info(f"Stored profile. {artifact_path=}")
+
+        @after_this_request
+        def add_profile_artifact_header(r):
+            r.headers["X-Profile-Artifact"] = str(artifact_path)
+            return r
+
+        return response
+    return wrapper
+
+
+def _profile_cpu(artifact_path: Path, view, *args, **kwargs):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = view(*args, **kwargs)
+    finally:
+        profiler.disable()
+        profiler.dump_stats(artifact_path)
+    return artifact_path, response
+
+
+def _profile_mem(artifact_path: Path, view, *args, **kwargs):
+    tracemalloc.start(25)
+    try:
+        response = view(*args, **kwargs)
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        top_stats = snapshot.statistics("lineno")
+        with open(artifact_path, "w") as fp:
+            fp.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB\n")
+            fp.write(f"Total allocated at end of request: {sum(stat.size for stat in top_stats) / 1024 / 1024:.1f} MiB\n\n")
+            for stat in top_stats[:50]:
+                fp.write(f"{stat}\n")
+    return artifact_path, response
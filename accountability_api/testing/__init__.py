@@ -0,0 +1 @@
+"""Test and benchmark fixtures. Not part of the distribution (see setup.py)."""
@@ -0,0 +1,368 @@
+"""
+Synthetic OPERA catalog generator, for scale testing.
+
+Generates N days of consistent input product, catalog and SDS product documents.
+IDs follow the formats parsed in `accountability_api.api_utils.metadata`, and timestamps are correlated per granule:
+
+    public available -> OPERA detect (query) -> received (download) -> SDS product created -> DAAC notified
+
+Input products are generated at a configurable daily rate per input product type. Each input product produces the SDS
+products of `INPUT_PRODUCT_TYPE_TO_SDS_PRODUCT_TYPE`, a configurable fraction of which are delivered to the DAAC.
+
+Documents are written either as JSON files (`<output-dir>/<index>/docs/<id>.json`, the backup layout read by
+`load_es_data`), or bulk loaded into Elasticsearch.
+
+e.g.
+    python -m accountability_api.testing.catalog_generator --start 2023-01-01 --days 7 --rate HLS_L30=5000 --output-dir /tmp/catalog
+    python -m accountability_api.testing.catalog_generator --start 2023-01-01 --days 7 --es-url http://localhost:9200
+"""
+import argparse
+import json
+import logging
+import random
+import string
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from accountability_api.api_utils import metadata
+from accountability_api.api_utils.utils import from_dt_to_iso
+
+LOGGER = logging.getLogger()
+
+DEFAULT_RATES = {
+    "HLS_L30": 100,
+    "HLS_S30": 100,
+    "L1_S1_SLC": 50,
+    "L2_RTC_S1": 200,
+    "L2_CSLC_S1": 200,
+}
+"""Default number of input products per day, per input product type."""
+
+HLS_BANDS = ["B01", "B02", "B03", "B04", "B05", "B06", "B07", "Fmask"]
+
+SDS_PRODUCT_TYPE_TO_DATASET_TYPE = {
+    "L3_DSWX_HLS": "L3_DSWx_HLS",
+    "L2_CSLC_S1": "L2_CSLC_S1",
+    "L2_RTC_S1": "L2_RTC_S1",
+    "L3_DSWX_S1": "L3_DSWx_S1",
+    "L3_DISP_S1": "L3_DISP_S1",
+}
+
+
+class CatalogGenerator:
+    def __init__(
+            self,
+            start: datetime,
+            days: int,
+            rates: Optional[Dict[str, int]] = None,
+            delivery_ratio: float = 0.95,
+            seed: int = 0):
+        """
+        :param start: the start of the first day. Input products are received uniformly over the generated days.
+        :param days: the number of days to generate
+        :param rates: number of input products per day, per input product type. See `DEFAULT_RATES`.
+        :param delivery_ratio: the fraction of SDS products that are delivered to the DAAC
+        :param seed: the random seed. The same arguments generate the same documents.
+        """
+        self.start = start
+        self.days = days
+        self.rates = {**DEFAULT_RATES, **(rates or {})}
+        self.delivery_ratio = delivery_ratio
+        self._random = random.Random(seed)
+
+        unsupported = self.rates.keys() - DEFAULT_RATES.keys()
+        if unsupported:
+            raise Exception(f"Unsupported input product types. {unsupported=}")
+
+    def generate(self) -> Iterator[Tuple[str, dict]]:
+        """
+        Generates the documents, ordered by day.
+
+        :return: (index, document) pairs. The document ID is stored under `_id`.
+        """
+        generators = {
+            "HLS_L30": self._generate_hls,
+            "HLS_S30": self._generate_hls,
+            "L1_S1_SLC": self._generate_slc,
+            "L2_RTC_S1": self._generate_rtc,
+            "L2_CSLC_S1": self._generate_cslc,
+        }
+        for day in range(self.days):
+            day_start = self.start + timedelta(days=day)
+            for input_product_type, rate in self.rates.items():
+                for _ in range(rate):
+                    received_dt = day_start + timedelta(seconds=self._random.uniform(0, 86_400))
+                    yield from generators[input_product_type](input_product_type, received_dt)
+
+    # input products
+
+    def _generate_hls(self, input_product_type: str, received_dt: datetime) -> Iterator[Tuple[str, dict]]:
+        detect_dt, available_dt, acquisition_dt = self._upstream_timestamps(received_dt)
+        sensor = input_product_type.split("_")[1]  # e.g. L30
+        tile_id = self._tile_id()
+        granule_id = f'HLS.{sensor}.{tile_id}.{acquisition_dt.strftime("%Y%jT%H%M%S")}.v2.0'
+        dataset_type = f"L2_{input_product_type}"
+
+        files = []
+        for band in HLS_BANDS:
+            filename = f"{granule_id}.{band}.tif"
+            files.append({"id": f"{granule_id}.{band}", "FileName": filename, "FileSize": self._random.randint(1_000_000, 50_000_000)})
+            yield _index_name("hls_catalog", received_dt), {
+                "_id": filename,
+                "creation_timestamp": _iso(detect_dt),
+                "query_datetime": _iso(detect_dt),
+            }
+        yield _index_name("hls_spatial_catalog", received_dt), {
+            "_id": granule_id,
+            "creation_timestamp": _iso(detect_dt),
+            "provider_date": _iso(available_dt),
+            "production_datetime": _iso(available_dt),
+        }
+        yield _index_name(f"grq_v2.0_{dataset_type.lower()}", received_dt), {
+            "_id": f"{granule_id}-r1",
+            "id": f"{granule_id}-r1",
+            "dataset_type": dataset_type,
+            "creation_timestamp": _iso(received_dt),
+            "metadata": {
+                "id": f"{granule_id}-r1",
+                "FileName": granule_id,
+                "ProductType": dataset_type,
+                "ProductReceivedTime": _iso(received_dt),
+                "tile_id": tile_id,
+                "sensor": metadata.granule_id_to_sensor(granule_id),
+                "FileSize": sum(file["FileSize"] for file in files),
+                "Files": files,
+            },
+        }
+
+        platform = "L8" if sensor == "L30" else "S2A"
+        yield from self._generate_sds_products(
+            dataset_type,
+            f'{tile_id}_{acquisition_dt.strftime("%Y%m%dT%H%M%SZ")}_{{production}}_{platform}_30_v1.0',
+            received_dt,
+            tile_id=tile_id
+        )
+
+    def _generate_slc(self, input_product_type: str, received_dt: datetime) -> Iterator[Tuple[str, dict]]:
+        detect_dt, available_dt, acquisition_dt = self._upstream_timestamps(received_dt)
+        acquisition_end_dt = acquisition_dt + timedelta(seconds=27)
+        orbit = self._random.randint(1, 99_999)
+        granule_id = (
+            f'S1A_IW_SLC__1SDV_{acquisition_dt.strftime("%Y%m%dT%H%M%S")}_{acquisition_end_dt.strftime("%Y%m%dT%H%M%S")}'
+            f'_{orbit:06d}_{self._random.randint(0, 0xFFFFFF):06X}_{self._random.randint(0, 0xFFFF):04X}'
+        )
+
+        yield _index_name("slc_catalog", received_dt), {
+            "_id": f"{granule_id}.zip",
+            "creation_timestamp": _iso(detect_dt),
+            "query_datetime": _iso(detect_dt),
+        }
+        yield _index_name("slc_spatial_catalog", received_dt), {
+            "_id": f"{granule_id}-SLC",
+            "creation_timestamp": _iso(detect_dt),
+            "provider_date": _iso(available_dt),
+            "production_datetime": _iso(available_dt),
+        }
+        yield _index_name("grq_v1.0_l1_s1_slc", received_dt), {
+            "_id": f"{granule_id}-r1",
+            "id": f"{granule_id}-r1",
+            "dataset_type": "L1_S1_SLC",
+            "creation_timestamp": _iso(received_dt),
+            "metadata": {
+                "id": f"{granule_id}-r1",
+                "FileName": f"{granule_id}.zip",
+                "ProductType": "L1_S1_SLC",
+                "ProductReceivedTime": _iso(received_dt),
+                "FileSize": self._random.randint(4_000_000_000, 8_000_000_000),
+            },
+        }
+
+        burst_id = self._burst_id()
+        yield from self._generate_sds_products(
+            "L1_S1_SLC",
+            f'S1A_IW_{burst_id}_VV_{acquisition_dt.strftime("%Y%m%dT%H%M%SZ")}_v0.1_{{production}}',
+            received_dt
+        )
+
+    def _generate_rtc(self, input_product_type: str, received_dt: datetime) -> Iterator[Tuple[str, dict]]:
+        detect_dt, available_dt, acquisition_dt = self._upstream_timestamps(received_dt)
+        burst_id = self._burst_id()
+        granule_id = f'OPERA_L2_RTC-S1_{burst_id}_{acquisition_dt.strftime("%Y%m%dT%H%M%SZ")}_{available_dt.strftime("%Y%m%dT%H%M%SZ")}_S1A_30_v1.0'
+
+        yield _index_name("rtc_catalog", received_dt), {
+            "_id": granule_id,
+            "id": granule_id,
+            "creation_timestamp": _iso(received_dt),
+            "latest_creation_timestamp": _iso(received_dt),
+            "query_datetime": _iso(detect_dt),
+            "production_datetime": _iso(available_dt),
+            "latest_production_datetime": _iso(available_dt),
+        }
+
+        tile_id = self._tile_id()
+        yield from self._generate_sds_products(
+            "L2_RTC_S1",
+            f'{tile_id}_{acquisition_dt.strftime("%Y%m%dT%H%M%SZ")}_{{production}}_S1A_30_v1.0',
+            received_dt,
+            tile_id=tile_id
+        )
+
+    def _generate_cslc(self, input_product_type: str, received_dt: datetime) -> Iterator[Tuple[str, dict]]:
+        detect_dt, available_dt, acquisition_dt = self._upstream_timestamps(received_dt)
+        burst_id = self._burst_id()
+        granule_id = f'OPERA_L2_CSLC-S1_{burst_id}_{acquisition_dt.strftime("%Y%m%dT%H%M%SZ")}_{available_dt.strftime("%Y%m%dT%H%M%SZ")}_S1A_VV_v1.0'
+
+        yield _index_name("cslc_catalog", received_dt), {
+            "_id": granule_id,
+            "granule_id": granule_id,
+            "creation_timestamp": _iso(detect_dt),
+            "download_datetime": _iso(received_dt),
+            "latest_download_job_ts": _iso(received_dt),
+        }
+
+        yield from self._generate_sds_products(
+            "L2_CSLC_S1",
+            f'{burst_id}_{acquisition_dt.strftime("%Y%m%dT%H%M%SZ")}_{{production}}_S1A_VV_v1.0',
+            received_dt
+        )
+
+    # SDS products
+
+    def _generate_sds_products(self, input_dataset_type: str, id_suffix: str, input_received_dt: datetime, tile_id=None) -> Iterator[Tuple[str, dict]]:
+        """
+        :param input_dataset_type: the input product type (a key of `INPUT_PRODUCT_TYPE_TO_SDS_PRODUCT_TYPE`)
+        :param id_suffix: the SDS product ID following the product type prefix. "{production}" is replaced with the production time.
+        :param input_received_dt: the time the input product was received
+        """
+        for sds_product_type in metadata.INPUT_PRODUCT_TYPE_TO_SDS_PRODUCT_TYPE[input_dataset_type]:
+            created_dt = input_received_dt + timedelta(seconds=self._random.uniform(600, 7_200))
+            dataset_type = SDS_PRODUCT_TYPE_TO_DATASET_TYPE[sds_product_type]
+            product_id = f'{_sds_product_id_prefix(sds_product_type)}_{id_suffix.format(production=created_dt.strftime("%Y%m%dT%H%M%SZ"))}'
+
+            doc = {
+                "_id": product_id,
+                "id": product_id,
+                "dataset_type": dataset_type,
+                "creation_timestamp": _iso(created_dt),
+                "metadata": {
+                    "id": product_id,
+                    "FileName": product_id,
+                    "ProductType": dataset_type,
+                    "ProductReceivedTime": _iso(created_dt),
+                    "InputProductReceivedTime": _iso(input_received_dt),
+                    "FileSize": self._random.randint(1_000_000, 100_000_000),
+                },
+            }
+            if tile_id:
+                doc["metadata"]["tile_id"] = tile_id
+            if self._random.random() < self.delivery_ratio:
+                delivered_dt = created_dt + timedelta(seconds=self._random.uniform(60, 600))
+                doc["daac_CNM_S_timestamp"] = _iso(delivered_dt)
+                doc["daac_CNM_S_status"] = "SUCCESS"
+                doc["daac_delivery_status"] = "SUCCESS"
+            yield _index_name(f"grq_v1.0_{sds_product_type.lower()}", created_dt), doc
+
+    # helpers
+
+    def _upstream_timestamps(self, received_dt: datetime) -> Tuple[datetime, datetime, datetime]:
+        """:return: the OPERA detect, public available and acquisition times of an input product received at the given time"""
+        detect_dt = received_dt - timedelta(seconds=self._random.uniform(60, 1_800))
+        available_dt = detect_dt - timedelta(seconds=self._random.uniform(300, 3_600))
+        acquisition_dt = available_dt - timedelta(seconds=self._random.uniform(3_600, 21_600))
+        return detect_dt, available_dt, acquisition_dt.replace(microsecond=0)
+
+    def _tile_id(self) -> str:
+        # e.g. T22VEQ
+        return f"T{self._random.randint(1, 60):02d}{''.join(self._random.choices(string.ascii_uppercase, k=3))}"
+
+    def _burst_id(self) -> str:
+        # e.g. T064-135524-IW2
+        return f"T{self._random.randint(1, 175):03d}-{self._random.randint(1, 375_887):06d}-IW{self._random.randint(1, 3)}"
+
+
+def _sds_product_id_prefix(sds_product_type: str) -> str:
+    return {
+        "L3_DSWX_HLS": "OPERA_L3_DSWx_HLS",
+        "L2_CSLC_S1": "OPERA_L2_CSLC",
+        "L2_RTC_S1": "OPERA_L2_RTC",
+        "L3_DSWX_S1": "OPERA_L3_DSWx-S1",
+        "L3_DISP_S1": "OPERA_L3_DISP-S1",
+    }[sds_product_type]
+
+
+def _index_name(prefix: str, dt: datetime) -> str:
+    """Monthly concrete index name. e.g. rtc_catalog-2023.01"""
+    return f'{prefix}-{dt.strftime("%Y.%m")}'
+
+
+def _iso(dt: datetime) -> str:
+    return from_dt_to_iso(dt)
+
+
+def write_json_files(docs: Iterator[Tuple[str, dict]], output_dir: Path) -> int:
+    """
+    Writes the documents to `<output_dir>/<index>/docs/<id>.json`.
+
+    :return: the number of documents written
+    """
+    count = 0
+    for index, doc in docs:
+        doc = dict(doc)
+        doc_id = doc.pop("_id")
+        docs_dir = output_dir / index / "docs"
+        docs_dir.mkdir(parents=True, exist_ok=True)
+        with open(docs_dir / f"{doc_id}.json", "w") as fp:
+            json.dump(doc, fp)
+        count += 1
+    return count
+
+
+def bulk_load(docs: Iterator[Tuple[str, dict]], es, chunk_size=1_000) -> int:
+    """
+    Bulk loads the documents into Elasticsearch.
+
+    :param es: the Elasticsearch client
+    :return: the number of documents loaded
+    """
+    from elasticsearch import helpers
+
+    actions = (
+        {"_op_type": "index", "_index": index, "_id": doc["_id"], "_source": {k: v for k, v in doc.items() if k != "_id"}}
+        for index, doc in docs
+    )
+    success, _ = helpers.bulk(es, actions, chunk_size=chunk_size)
+    return success
+
+
+def _parse_rate(value: str) -> Tuple[str, int]:
+    input_product_type, rate = value.split("=", maxsplit=1)
+    return input_product_type, int(rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic OPERA catalog documents for scale testing.")
+    parser.add_argument("--start", type=datetime.fromisoformat, required=True, help="The first day. e.g. 2023-01-01")
+    parser.add_argument("--days", type=int, default=1, help="The number of days to generate.")
+    parser.add_argument("--rate", type=_parse_rate, action="append", default=[],
+                        help=f"Input products per day, as INPUT_PRODUCT_TYPE=N. May be repeated. Defaults: {DEFAULT_RATES}")
+    parser.add_argument("--delivery-ratio", type=float, default=0.95, help="Fraction of SDS products delivered to the DAAC.")
+    parser.add_argument("--seed", type=int, default=0)
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output-dir", type=Path, help="Write JSON files to this directory.")
+    output.add_argument("--es-url", help="Bulk load into the Elasticsearch at this URL. e.g. http://localhost:9200")
+    args = parser.parse_args(argv)
+
+    generator = CatalogGenerator(start=args.start, days=args.days, rates=dict(args.rate), delivery_ratio=args.delivery_ratio, seed=args.seed)
+    if args.output_dir:
+        count = write_json_files(generator.generate(), args.output_dir)
+    else:
+        from elasticsearch import Elasticsearch
+
+        count = bulk_load(generator.generate(), Elasticsearch(args.es_url))
+    LOGGER.info(f"Generated documents. {count=}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
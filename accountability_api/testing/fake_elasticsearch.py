@@ -0,0 +1,885 @@
+"""
+In-memory stand-in for the Elasticsearch client, for offline tests and benchmarks.
+
+Implements the subset of the `elasticsearch.Elasticsearch` (7.x) client API used by this project over seeded documents:
+
+* search, with `match_all`, `bool` (must, filter, should, must_not), `range`, `match`, `term`, `terms`, `exists`, `ids`
+  and `wildcard` queries, sort, `search_after`, from/size and `_source` filtering
+* scroll and clear_scroll
+* count, msearch, mget, index, bulk
+* `terms`, `composite` (`terms` sources, paginated with `after`), `date_histogram` (fixed intervals), `filter`, `sum`,
+  `min`, `max`, `avg`, `value_count`, `stats`, `percentiles` and `top_hits` aggregations (bucket aggregations may be
+  nested), and `cumulative_sum` pipeline aggregations (within `date_histogram`)
+* runtime fields (`runtime_mappings`), for aggregations and sort. Painless scripts can't be run, so each runtime field is
+  computed by a Python stand-in for its script, registered by field name in `runtime_fields` (`RUNTIME_FIELDS` has the
+  stand-ins for the runtime fields queried by reports). Requests defining other runtime fields fail, as requests to
+  clusters without runtime field support (before 7.11) would.
+* indices.create, indices.exists, indices.delete, indices.put_settings, indices.refresh, and indices.stats (the indexing
+  stats only, counting the documents seeded, indexed and deleted)
+* cluster.health
+
+Index names in requests may be comma-separated and contain wildcards.
+Date strings are compared as datetimes. Fields suffixed with ".keyword" are matched against the base field.
+
+Every request is counted per operation in `calls`. Request latency can be injected with `latency`,
+either a fixed number of seconds or a function of the operation name.
+"""
+import fnmatch
+import itertools
+import json
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import dateutil.parser
+from elasticsearch.exceptions import NotFoundError, RequestError
+from elasticsearch.serializer import JSONSerializer
+
+from accountability_api.api_utils.utils import from_iso_to_dt, split_revision
+
+_MISSING = object()
+
+
+def _production_time_ms(source: dict) -> Optional[int]:
+    # see `production_time_report.PRODUCTION_TIME_RUNTIME_MAPPINGS`
+    received = source.get("metadata", {}).get("InputProductReceivedTime") or source.get("metadata", {}).get("ProductReceivedTime")
+    if not source.get("daac_CNM_S_timestamp") or not received:
+        return None
+    return int((from_iso_to_dt(source["daac_CNM_S_timestamp"]) - from_iso_to_dt(received)).total_seconds() * 1000)
+
+
+def _platform_acquisition_ts(source: dict) -> Optional[str]:
+    # see `gap_report.PLATFORM_ACQUISITION_TS_RUNTIME_MAPPINGS`
+    platform, acquisition_ts = None, None
+    for token in source.get("id", "").split("_"):
+        if platform is None and len(token) == 3 and token.startswith("S1"):
+            platform = token
+        elif acquisition_ts is None and len(token) >= 15 and token[0].isdigit() and token[8] == "T":
+            acquisition_ts = token[:15]
+    return f"{platform}_{acquisition_ts}" if platform and acquisition_ts else None
+
+
+def _base_id(source: dict) -> Optional[str]:
+    # see `query.BASE_ID_RUNTIME_MAPPINGS`
+    return split_revision(source["id"])[0] if source.get("id") else None
+
+
+RUNTIME_FIELDS: Dict[str, Callable[[dict], object]] = {
+    "production_time": _production_time_ms,
+    "platform_acquisition_ts": _platform_acquisition_ts,
+    "base_id": _base_id,
+}
+"""Stand-ins for the scripts of the runtime fields queried by reports. See `FakeElasticsearch.runtime_fields`."""
+
+
+class FakeElasticsearch:
+    def __init__(
+        self,
+        latency: Union[float, Callable[[str], float], None] = None,
+        runtime_fields: Optional[Dict[str, Callable[[dict], object]]] = None
+    ):
+        """
+        :param latency: seconds added to every request, or a function of the operation name (e.g. "search", "scroll")
+        :param runtime_fields: map of runtime field names to functions of a document's `_source`, computing the field
+                               value (None when the script would emit no value)
+        """
+        self.latency = latency
+        self.runtime_fields = runtime_fields or {}
+        self.calls = Counter()
+        self.indices = _FakeIndicesClient(self)
+        self.cluster = _FakeClusterClient(self)
+        self.transport = _FakeTransport()
+
+        self._indexes: Dict[str, Dict[str, dict]] = {}
+        self._index_settings: Dict[str, dict] = {}
+        self._index_stats: Dict[str, Counter] = {}
+        self._scrolls: Dict[str, dict] = {}
+
+    # seeding
+
+    def add_documents(self, index: str, docs: Iterable[dict], id_field: str = "_id"):
+        """
+        Seeds the index with the given documents. The document ID is taken from (and removed from) the `id_field` of each
+        document, and generated when missing.
+        """
+        index_docs = self._indexes.setdefault(index, {})
+        for doc in docs:
+            doc = dict(doc)
+            doc_id = doc.pop(id_field, None) or uuid.uuid4().hex
+            index_docs[str(doc_id)] = doc
+            self._count_write(index, "index_total")
+
+    # client API
+
+    def search(self, body: Optional[dict] = None, index: Optional[str] = None, params: Optional[dict] = None, **kwargs):
+        self._request("search")
+        kwargs.update(params or {})
+        return self._search(body or {}, index, kwargs)
+
+    def _search(self, body: dict, index: Optional[str], kwargs: dict) -> dict:
+        runtime_mappings = body.get("runtime_mappings") or {}
+        hits = self._find(index, body.get("query"), kwargs)
+        hits = self._add_runtime_fields(hits, runtime_mappings)
+        hits = self._sort(hits, body.get("sort") or kwargs.get("sort"))
+        if body.get("search_after") is not None:
+            hits = [hit for hit in hits if _compare_sort_values(hit["sort"], body["search_after"]) > 0]
+
+        result = {
+            "took": 0,
+            "timed_out": False,
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+            "hits": {"total": {"value": len(hits), "relation": "eq"}, "max_score": None, "hits": []},
+        }
+        if body.get("aggs") or body.get("aggregations"):
+            result["aggregations"] = _aggregate(body.get("aggs") or body.get("aggregations"), hits)
+        if runtime_mappings:
+            hits = [_without_runtime_fields(hit) for hit in hits]
+
+        size = int(body.get("size", kwargs.get("size", 10)))
+        start = int(body.get("from", kwargs.get("from_", 0)))
+        source_filter = _get_source_filter(body, kwargs)
+        page = [_filter_source(hit, source_filter) for hit in hits[start:start + size]]
+        result["hits"]["hits"] = page
+
+        if kwargs.get("scroll"):
+            scroll_id = uuid.uuid4().hex
+            self._scrolls[scroll_id] = {"hits": hits, "position": start + size, "size": size, "source_filter": source_filter}
+            result["_scroll_id"] = scroll_id
+        return result
+
+    def _add_runtime_fields(self, hits: List[dict], runtime_mappings: dict) -> List[dict]:
+        for name in runtime_mappings:
+            if name not in self.runtime_fields:
+                raise RequestError(400, "search_phase_execution_exception", f"No stand-in for runtime field. {name=}")
+        if not runtime_mappings:
+            return hits
+        return [
+            {
+                **hit,
+                "_runtime_fields": tuple(runtime_mappings),
+                "_source": {**hit["_source"], **{name: self.runtime_fields[name](hit["_source"]) for name in runtime_mappings}}
+            }
+            for hit in hits
+        ]
+
+    def scroll(self, body: Optional[dict] = None, scroll_id: Optional[str] = None, **kwargs):
+        self._request("scroll")
+        scroll_id = scroll_id or (body or {}).get("scroll_id")
+        scroll = self._scrolls.get(scroll_id)
+        if scroll is None:
+            raise NotFoundError(404, "search_context_missing_exception", {"scroll_id": scroll_id})
+
+        page = scroll["hits"][scroll["position"]:scroll["position"] + scroll["size"]]
+        scroll["position"] += scroll["size"]
+        return {
+            "_scroll_id": scroll_id,
+            "took": 0,
+            "timed_out": False,
+            "hits": {
+                "total": {"value": len(scroll["hits"]), "relation": "eq"},
+                "hits": [_filter_source(hit, scroll["source_filter"]) for hit in page]
+            }
+        }
+
+    def clear_scroll(self, body: Optional[dict] = None, scroll_id: Optional[str] = None, **kwargs):
+        self._request("clear_scroll")
+        scroll_ids = scroll_id or (body or {}).get("scroll_id") or []
+        for id_ in [scroll_ids] if isinstance(scroll_ids, str) else scroll_ids:
+            if self._scrolls.pop(id_, None) is None and 404 not in _as_tuple(kwargs.get("ignore")):
+                raise NotFoundError(404, "search_context_missing_exception", {"scroll_id": id_})
+        return {"succeeded": True, "num_freed": 1}
+
+    def count(self, body: Optional[dict] = None, index: Optional[str] = None, params: Optional[dict] = None, **kwargs):
+        self._request("count")
+        kwargs.update(params or {})
+        return {"count": len(self._find(index, (body or {}).get("query"), kwargs))}
+
+    def msearch(self, body: Union[str, List], index: Optional[str] = None, **kwargs):
+        self._request("msearch")
+        lines = _parse_ndjson(body)
+        responses = []
+        for header, search_body in zip(lines[0::2], lines[1::2]):
+            header = dict(header)
+            search_index = header.pop("index", index)
+            try:
+                responses.append({**self._search(search_body, search_index, header), "status": 200})
+            except (NotFoundError, RequestError) as e:
+                responses.append({"error": {"type": e.error, "reason": str(e.info)}, "status": e.status_code})
+        return {"took": 0, "responses": responses}
+
+    def mget(self, body: dict, index: Optional[str] = None, **kwargs):
+        self._request("mget")
+        if "ids" in body:
+            requests = [{"_index": index, "_id": id_} for id_ in body["ids"]]
+        else:
+            requests = [{"_index": doc.get("_index", index), "_id": doc["_id"]} for doc in body["docs"]]
+
+        docs = []
+        for request in requests:
+            source = self._indexes.get(request["_index"], {}).get(str(request["_id"]))
+            doc = {"_index": request["_index"], "_type": "_doc", "_id": request["_id"], "found": source is not None}
+            if source is not None:
+                doc["_source"] = source
+            docs.append(doc)
+        return {"docs": docs}
+
+    def index(self, index: str, body: dict, id: Optional[str] = None, **kwargs):
+        self._request("index")
+        doc_id = str(id) if id is not None else uuid.uuid4().hex
+        index_docs = self._indexes.setdefault(index, {})
+        result = "updated" if doc_id in index_docs else "created"
+        index_docs[doc_id] = body
+        self._count_write(index, "index_total")
+        return {"_index": index, "_type": "_doc", "_id": doc_id, "result": result}
+
+    def bulk(self, body: Union[str, List], index: Optional[str] = None, **kwargs):
+        self._request("bulk")
+        lines = iter(_parse_ndjson(body))
+        items = []
+        for action in lines:
+            (op_type, meta), = action.items()
+            target_index = meta.get("_index", index)
+            doc_id = meta.get("_id")
+            if op_type == "delete":
+                if self._indexes.get(target_index, {}).pop(str(doc_id), None) is not None:
+                    self._count_write(target_index, "delete_total")
+                items.append({op_type: {"_index": target_index, "_id": doc_id, "status": 200}})
+                continue
+
+            source = next(lines)
+            if op_type == "create" and str(doc_id) in self._indexes.get(target_index, {}):
+                items.append({op_type: {
+                    "_index": target_index, "_id": doc_id, "status": 409,
+                    "error": {"type": "version_conflict_engine_exception", "reason": f"[{doc_id}]: version conflict, document already exists"}
+                }})
+                continue
+            if op_type == "update":
+                source = {**self._indexes.get(target_index, {}).get(str(doc_id), {}), **source.get("doc", {})}
+            doc_id = str(doc_id) if doc_id is not None else uuid.uuid4().hex
+            self._indexes.setdefault(target_index, {})[doc_id] = source
+            self._count_write(target_index, "index_total")
+            items.append({op_type: {"_index": target_index, "_id": doc_id, "status": 201, "result": "created"}})
+        return {"took": 0, "errors": any("error" in item[op_type] for item in items for op_type in item), "items": items}
+
+    # internals
+
+    def _request(self, operation: str):
+        self.calls[operation] += 1
+        latency = self.latency(operation) if callable(self.latency) else self.latency
+        if latency:
+            time.sleep(latency)
+
+    def _count_write(self, index: str, stat: str):
+        self._index_stats.setdefault(index, Counter())[stat] += 1
+
+    def _resolve_indexes(self, index: Optional[str], params: dict) -> List[str]:
+        if not index or index in ("_all", "*"):
+            return list(self._indexes)
+
+        resolved = []
+        for pattern in index.split(","):
+            matches = [name for name in self._indexes if fnmatch.fnmatchcase(name, pattern)]
+            if not matches and "*" not in pattern and not _is_true(params.get("ignore_unavailable")):
+                raise NotFoundError(404, "index_not_found_exception", {"index": pattern})
+            resolved.extend(matches)
+        if not resolved and params.get("allow_no_indices") is not None and not _is_true(params.get("allow_no_indices")):
+            raise NotFoundError(404, "index_not_found_exception", {"index": index})
+        return list(dict.fromkeys(resolved))
+
+    def _find(self, index: Optional[str], query: Optional[dict], params: dict) -> List[dict]:
+        hits = []
+        for index_name in self._resolve_indexes(index, params):
+            for doc_id, source in self._indexes[index_name].items():
+                hit = {"_index": index_name, "_type": "_doc", "_id": doc_id, "_score": 1.0, "_source": source}
+                if _matches(hit, query or {"match_all": {}}):
+                    hits.append(hit)
+        return hits
+
+    @staticmethod
+    def _sort(hits: List[dict], sort) -> List[dict]:
+        if not sort:
+            return hits
+
+        sort_fields = []
+        for sort_clause in [sort] if isinstance(sort, (str, dict)) else sort:
+            if isinstance(sort_clause, str):
+                field, _, order = sort_clause.partition(":")
+            else:
+                (field, options), = sort_clause.items()
+                order = options if isinstance(options, str) else options.get("order", "asc")
+            sort_fields.append((field, order or "asc"))
+
+        hits = [{**hit, "sort": [_sort_value(_get_field(hit, field)) for field, _ in sort_fields]} for hit in hits]
+        for i, (field, order) in reversed(list(enumerate(sort_fields))):
+            # missing values are sorted last
+            if order == "desc":
+                hits.sort(key=lambda hit: (hit["sort"][i] is not None, _sortable(hit["sort"][i])), reverse=True)
+            else:
+                hits.sort(key=lambda hit: (hit["sort"][i] is None, _sortable(hit["sort"][i])))
+        return hits
+
+
+class _FakeIndicesClient:
+    def __init__(self, client: FakeElasticsearch):
+        self._client = client
+
+    def create(self, index: str, body: Optional[dict] = None, **kwargs):
+        self._client._request("indices.create")
+        if index in self._client._indexes:
+            if 400 in _as_tuple(kwargs.get("ignore")):
+                return {"acknowledged": False}
+            raise RequestError(400, "resource_already_exists_exception", {"index": index})
+        self._client._indexes[index] = {}
+        self._client._index_settings[index] = dict((body or {}).get("settings", {}))
+        return {"acknowledged": True, "index": index}
+
+    def exists(self, index: str, **kwargs) -> bool:
+        self._client._request("indices.exists")
+        return any(fnmatch.fnmatchcase(name, pattern) for pattern in index.split(",") for name in self._client._indexes)
+
+    def delete(self, index: str, **kwargs):
+        self._client._request("indices.delete")
+        for name in self._client._resolve_indexes(index, {"ignore_unavailable": 404 in _as_tuple(kwargs.get("ignore"))}):
+            del self._client._indexes[name]
+            self._client._index_settings.pop(name, None)
+            self._client._index_stats.pop(name, None)
+        return {"acknowledged": True}
+
+    def put_settings(self, body: dict, index: Optional[str] = None, **kwargs):
+        self._client._request("indices.put_settings")
+        for name in self._client._resolve_indexes(index, {}):
+            self._client._index_settings.setdefault(name, {}).update(body.get("index", body))
+        return {"acknowledged": True}
+
+    def get_settings(self, index: Optional[str] = None, **kwargs):
+        self._client._request("indices.get_settings")
+        return {
+            name: {"settings": {"index": self._client._index_settings.get(name, {})}}
+            for name in self._client._resolve_indexes(index, {})
+        }
+
+    def refresh(self, index: Optional[str] = None, **kwargs):
+        self._client._request("indices.refresh")
+        return {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+
+    def stats(self, index: Optional[str] = None, metric: Optional[str] = None, **kwargs):
+        self._client._request("indices.stats")
+        indices = {}
+        for name in self._client._resolve_indexes(index, kwargs):
+            stats = self._client._index_stats.get(name, Counter())
+            indexing = {"index_total": stats["index_total"], "delete_total": stats["delete_total"]}
+            indices[name] = {"primaries": {"indexing": indexing}, "total": {"indexing": indexing}}
+        indexing = {stat: sum(index_stats["primaries"]["indexing"][stat] for index_stats in indices.values())
+                    for stat in ("index_total", "delete_total")}
+        return {
+            "_shards": {"total": len(indices), "successful": len(indices), "failed": 0},
+            "_all": {"primaries": {"indexing": indexing}, "total": {"indexing": indexing}},
+            "indices": indices
+        }
+
+
+class _FakeTransport:
+    """Serializer only, as used by the `elasticsearch.helpers` bulk helpers."""
+    serializer = JSONSerializer()
+
+
+class _FakeClusterClient:
+    def __init__(self, client: FakeElasticsearch):
+        self._client = client
+
+    def health(self, **kwargs):
+        self._client._request("cluster.health")
+        return {"status": "green", "timed_out": False, "number_of_nodes": 1}
+
+
+class FakeElasticsearchUtility:
+    """Stand-in for `hysds_commons.elasticsearch_utils.ElasticsearchUtility`, wrapping a `FakeElasticsearch`."""
+
+    def __init__(self, es: Optional[FakeElasticsearch] = None):
+        self.es = es or FakeElasticsearch()
+
+    def search(self, **kwargs):
+        return self.es.search(**kwargs)
+
+    def get_count(self, **kwargs):
+        return self.es.count(**kwargs)["count"]
+
+    def index_document(self, **kwargs):
+        return self.es.index(**kwargs)
+
+
+# query matching
+
+
+def _matches(hit: dict, query: dict) -> bool:
+    (query_type, clause), = query.items()
+    return _QUERIES[query_type](hit, clause)
+
+
+def _match_bool(hit: dict, clause: dict) -> bool:
+    must = _as_list(clause.get("must")) + _as_list(clause.get("filter"))
+    if not all(_matches(hit, q) for q in must):
+        return False
+    if any(_matches(hit, q) for q in _as_list(clause.get("must_not"))):
+        return False
+
+    should = _as_list(clause.get("should"))
+    minimum_should_match = int(clause.get("minimum_should_match", 0 if must else 1))
+    if should and minimum_should_match:
+        return sum(_matches(hit, q) for q in should) >= minimum_should_match
+    return True
+
+
+def _match_range(hit: dict, clause: dict) -> bool:
+    (field, bounds), = clause.items()
+    values = _as_list(_get_field(hit, field))
+    return any(
+        all(
+            _compare(value, bound) in _RANGE_OPERATORS[operator]
+            for operator, bound in bounds.items()
+            if operator in _RANGE_OPERATORS and bound is not None
+        )
+        for value in values
+        if value is not None
+    )
+
+
+def _match_term(hit: dict, clause: dict) -> bool:
+    (field, value), = clause.items()
+    if isinstance(value, dict):
+        value = value.get("value", value.get("query"))
+    return _field_equals(hit, field, value)
+
+
+def _match_terms(hit: dict, clause: dict) -> bool:
+    (field, values), = clause.items()
+    return any(_field_equals(hit, field, value) for value in values)
+
+
+def _match_match(hit: dict, clause: dict) -> bool:
+    (field, value), = clause.items()
+    if isinstance(value, dict):
+        value = value.get("query")
+    if field.endswith(".keyword") or not isinstance(value, str):
+        return _field_equals(hit, field, value)
+    # analyzed text fields match case-insensitively
+    return any(isinstance(field_value, str) and field_value.lower() == value.lower() for field_value in _as_list(_get_field(hit, field))) \
+        or _field_equals(hit, field, value)
+
+
+def _match_wildcard(hit: dict, clause: dict) -> bool:
+    (field, value), = clause.items()
+    if isinstance(value, dict):
+        value = value.get("value", value.get("wildcard"))
+    return any(isinstance(field_value, str) and fnmatch.fnmatchcase(field_value, value) for field_value in _as_list(_get_field(hit, field)))
+
+
+def _match_exists(hit: dict, clause: dict) -> bool:
+    return any(value is not None for value in _as_list(_get_field(hit, clause["field"])))
+
+
+def _match_ids(hit: dict, clause: dict) -> bool:
+    return hit["_id"] in [str(id_) for id_ in clause["values"]]
+
+
+_QUERIES = {
+    "match_all": lambda hit, clause: True,
+    "match_none": lambda hit, clause: False,
+    "bool": _match_bool,
+    "range": _match_range,
+    "term": _match_term,
+    "terms": _match_terms,
+    "match": _match_match,
+    "match_phrase": _match_match,
+    "wildcard": _match_wildcard,
+    "exists": _match_exists,
+    "ids": _match_ids,
+}
+
+_RANGE_OPERATORS = {"gte": (0, 1), "gt": (1,), "lte": (-1, 0), "lt": (-1,)}
+
+
+def _field_equals(hit: dict, field: str, value) -> bool:
+    if field == "_index":
+        return fnmatch.fnmatchcase(hit["_index"], str(value))
+    return any(_compare(field_value, value) == 0 for field_value in _as_list(_get_field(hit, field)) if field_value is not None)
+
+
+def _get_field(hit: dict, field: str):
+    if field in ("_id", "_index"):
+        return hit[field]
+    field = field[:-len(".keyword")] if field.endswith(".keyword") else field
+
+    values = [hit["_source"]]
+    for key in field.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, list):
+                next_values.extend(item.get(key, _MISSING) for item in value if isinstance(item, dict))
+            elif isinstance(value, dict):
+                next_values.append(value.get(key, _MISSING))
+        values = [value for value in next_values if value is not _MISSING]
+    if not values:
+        return None
+    flattened = list(itertools.chain.from_iterable(value if isinstance(value, list) else [value] for value in values))
+    return flattened[0] if len(flattened) == 1 else flattened
+
+
+def _compare(a, b) -> int:
+    a, b = _comparable(a), _comparable(b)
+    try:
+        return (a > b) - (a < b)
+    except TypeError:
+        a, b = str(a), str(b)
+        return (a > b) - (a < b)
+
+
+def _comparable(value):
+    if isinstance(value, str):
+        parsed = _parse_datetime(value)
+        if parsed is not None:
+            return parsed
+    if isinstance(value, datetime):
+        return value.timestamp() * 1000 if value.tzinfo else value.replace(tzinfo=timezone.utc).timestamp() * 1000
+    return value
+
+
+@lru_cache(maxsize=65536)
+def _parse_datetime(value: str) -> Optional[float]:
+    """Parses ISO-like datetime strings to epoch milliseconds, as Elasticsearch does for date fields."""
+    if len(value) < 10 or not value[:4].isdigit() or value[4] != "-":
+        return None
+    try:
+        dt = dateutil.parser.isoparse(value)
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp() * 1000
+
+
+# sorting
+
+
+def _sort_value(value):
+    if isinstance(value, list):
+        value = min((v for v in value if v is not None), key=_sortable, default=None)
+    if isinstance(value, str) and _parse_datetime(value) is not None:
+        return int(_parse_datetime(value))
+    return value
+
+
+def _sortable(value):
+    if value is None:
+        return 0, ""
+    if isinstance(value, (int, float)):
+        return 0, value
+    return 1, str(value)
+
+
+def _compare_sort_values(sort_values: list, search_after: list) -> int:
+    for a, b in zip(sort_values, search_after):
+        c = _compare(a, b)
+        if c:
+            return c
+    return 0
+
+
+# aggregations
+
+
+def _aggregate(aggs: dict, hits: List[dict]) -> dict:
+    return {name: _AGGREGATIONS[_agg_type(agg)](agg, hits) for name, agg in aggs.items()}
+
+
+def _agg_type(agg: dict) -> str:
+    return next(key for key in agg if key not in ("aggs", "aggregations", "meta"))
+
+
+def _agg_values(field: str, hits: List[dict]) -> list:
+    values = []
+    for hit in hits:
+        values.extend(v for v in _as_list(_get_field(hit, field)) if v is not None)
+    return [_numeric(value) for value in values]
+
+
+def _numeric(value):
+    if isinstance(value, str):
+        parsed = _parse_datetime(value)
+        if parsed is not None:
+            return parsed
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _aggregate_terms(agg: dict, hits: List[dict]) -> dict:
+    options = agg["terms"]
+    buckets: Dict[object, List[dict]] = {}
+    for hit in hits:
+        for key in dict.fromkeys(k for k in _as_list(_get_field(hit, options["field"])) if k is not None):
+            buckets.setdefault(key, []).append(hit)
+
+    ordered = sorted(buckets.items(), key=lambda item: (-len(item[1]), _sortable(item[0])))
+    size = options.get("size", 10)
+    result_buckets = []
+    for key, bucket_hits in ordered[:size]:
+        bucket = {"key": key, "doc_count": len(bucket_hits)}
+        sub_aggs = agg.get("aggs") or agg.get("aggregations")
+        if sub_aggs:
+            bucket.update(_aggregate(sub_aggs, bucket_hits))
+        result_buckets.append(bucket)
+    return {
+        "doc_count_error_upper_bound": 0,
+        "sum_other_doc_count": sum(len(bucket_hits) for _, bucket_hits in ordered[size:]),
+        "buckets": result_buckets
+    }
+
+
+def _aggregate_composite(agg: dict, hits: List[dict]) -> dict:
+    options = agg["composite"]
+    sources = [next(iter(source.items())) for source in options["sources"]]
+    for name, source in sources:
+        if _agg_type(source) != "terms":
+            raise RequestError(400, "illegal_argument_exception", f"Unsupported composite source. {name=}")
+
+    buckets: Dict[tuple, List[dict]] = {}
+    for hit in hits:
+        # docs missing a source value are skipped (no `missing_bucket`)
+        values = [[v for v in _as_list(_get_field(hit, source["terms"]["field"])) if v is not None] for _, source in sources]
+        for key in dict.fromkeys(itertools.product(*values)):
+            buckets.setdefault(key, []).append(hit)
+
+    keys = sorted(buckets, key=lambda key: [_sortable(value) for value in key])
+    if options.get("after"):
+        after = [_sortable(options["after"][name]) for name, _ in sources]
+        keys = [key for key in keys if [_sortable(value) for value in key] > after]
+
+    sub_aggs = agg.get("aggs") or agg.get("aggregations")
+    result_buckets = []
+    for key in keys[:options.get("size", 10)]:
+        bucket = {"key": {name: value for (name, _), value in zip(sources, key)}, "doc_count": len(buckets[key])}
+        if sub_aggs:
+            bucket.update(_aggregate(sub_aggs, buckets[key]))
+        result_buckets.append(bucket)
+    result = {"buckets": result_buckets}
+    if result_buckets:
+        result["after_key"] = result_buckets[-1]["key"]
+    return result
+
+
+_INTERVAL_MS = {"ms": 1, "s": 1_000, "m": 60_000, "h": 3_600_000, "d": 86_400_000}
+_CALENDAR_INTERVALS = {"minute": "1m", "1m": "1m", "hour": "1h", "1h": "1h", "day": "1d", "1d": "1d", "week": "7d", "1w": "7d"}
+
+
+def _interval_ms(interval: str) -> int:
+    interval = _CALENDAR_INTERVALS.get(interval, interval)
+    number = interval.rstrip("".join(_INTERVAL_MS))
+    unit = interval[len(number):]
+    if not number.isdigit() or unit not in _INTERVAL_MS:
+        raise RequestError(400, "illegal_argument_exception", f"Unsupported interval. {interval=}")
+    return int(number) * _INTERVAL_MS[unit]
+
+
+def _aggregate_date_histogram(agg: dict, hits: List[dict]) -> dict:
+    options = agg["date_histogram"]
+    interval_ms = _interval_ms(options.get("fixed_interval") or options.get("calendar_interval") or options["interval"])
+
+    buckets: Dict[int, List[dict]] = {}
+    for hit in hits:
+        for value in _as_list(_get_field(hit, options["field"])):
+            ms = _comparable(value)
+            if isinstance(ms, (int, float)):
+                buckets.setdefault(int(ms // interval_ms * interval_ms), []).append(hit)
+
+    min_doc_count = options.get("min_doc_count", 1)
+    keys = set(buckets)
+    if min_doc_count == 0:
+        bounds = [
+            int(_comparable(bound) // interval_ms * interval_ms)
+            for bound in (options.get("extended_bounds") or {}).values()
+            if bound is not None
+        ]
+        if keys or bounds:
+            keys.update(range(min([*keys, *bounds]), max([*keys, *bounds]) + 1, interval_ms))
+
+    sub_aggs = agg.get("aggs") or agg.get("aggregations") or {}
+    pipeline_aggs = {name: sub_agg for name, sub_agg in sub_aggs.items() if _agg_type(sub_agg) in _PIPELINE_AGGREGATIONS}
+    sub_aggs = {name: sub_agg for name, sub_agg in sub_aggs.items() if name not in pipeline_aggs}
+
+    result_buckets = []
+    for key in sorted(keys):
+        bucket_hits = buckets.get(key, [])
+        if len(bucket_hits) < min_doc_count:
+            continue
+        key_as_string = datetime.fromtimestamp(key / 1000, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        bucket = {"key_as_string": key_as_string, "key": key, "doc_count": len(bucket_hits)}
+        if sub_aggs:
+            bucket.update(_aggregate(sub_aggs, bucket_hits))
+        result_buckets.append(bucket)
+    for name, pipeline_agg in pipeline_aggs.items():
+        _PIPELINE_AGGREGATIONS[_agg_type(pipeline_agg)](name, pipeline_agg, result_buckets)
+    return {"buckets": result_buckets}
+
+
+def _bucket_value(bucket: dict, buckets_path: str):
+    return bucket["doc_count"] if buckets_path == "_count" else bucket[buckets_path]["value"]
+
+
+def _aggregate_cumulative_sum(name: str, agg: dict, buckets: List[dict]):
+    total = 0.0
+    for bucket in buckets:
+        total += _bucket_value(bucket, agg["cumulative_sum"]["buckets_path"]) or 0
+        bucket[name] = {"value": total}
+
+
+def _aggregate_filter(agg: dict, hits: List[dict]) -> dict:
+    bucket_hits = [hit for hit in hits if _matches(hit, agg["filter"])]
+    bucket = {"doc_count": len(bucket_hits)}
+    sub_aggs = agg.get("aggs") or agg.get("aggregations")
+    if sub_aggs:
+        bucket.update(_aggregate(sub_aggs, bucket_hits))
+    return bucket
+
+
+def _aggregate_stats(agg: dict, hits: List[dict]) -> dict:
+    values = [value for value in _agg_values(agg["stats"]["field"], hits) if isinstance(value, (int, float))]
+    if not values:
+        return {"count": 0, "min": None, "max": None, "avg": None, "sum": 0.0}
+    return {"count": len(values), "min": min(values), "max": max(values), "avg": sum(values) / len(values), "sum": float(sum(values))}
+
+
+def _aggregate_metric(func):
+    def aggregate(agg: dict, hits: List[dict]) -> dict:
+        values = [value for value in _agg_values(agg[_agg_type(agg)]["field"], hits) if isinstance(value, (int, float))]
+        return {"value": func(values)}
+    return aggregate
+
+
+def _aggregate_percentiles(agg: dict, hits: List[dict]) -> dict:
+    options = agg["percentiles"]
+    values = sorted(value for value in _agg_values(options["field"], hits) if isinstance(value, (int, float)))
+    percents = options.get("percents", [1, 5, 25, 50, 75, 95, 99])
+    return {"values": {str(float(percent)): _percentile(values, percent) for percent in percents}}
+
+
+def _aggregate_top_hits(agg: dict, hits: List[dict]) -> dict:
+    options = agg["top_hits"]
+    top_hits = FakeElasticsearch._sort(hits, options.get("sort"))
+    start = options.get("from", 0)
+    source_filter = _get_source_filter(options, {})
+    return {
+        "hits": {
+            "total": {"value": len(hits), "relation": "eq"},
+            "max_score": None,
+            "hits": [_filter_source(_without_runtime_fields(hit), source_filter) for hit in top_hits[start:start + options.get("size", 3)]]
+        }
+    }
+
+
+def _percentile(sorted_values: list, percent: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    rank = percent / 100 * (len(sorted_values) - 1)
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (rank - lower)
+
+
+_AGGREGATIONS = {
+    "terms": _aggregate_terms,
+    "composite": _aggregate_composite,
+    "date_histogram": _aggregate_date_histogram,
+    "filter": _aggregate_filter,
+    "stats": _aggregate_stats,
+    "sum": _aggregate_metric(lambda values: float(sum(values))),
+    "min": _aggregate_metric(lambda values: min(values) if values else None),
+    "max": _aggregate_metric(lambda values: max(values) if values else None),
+    "avg": _aggregate_metric(lambda values: sum(values) / len(values) if values else None),
+    "value_count": _aggregate_metric(len),
+    "percentiles": _aggregate_percentiles,
+    "top_hits": _aggregate_top_hits,
+}
+
+_PIPELINE_AGGREGATIONS = {
+    "cumulative_sum": _aggregate_cumulative_sum,
+}
+"""Pipeline aggregations, computed over the buckets of their parent aggregation."""
+
+
+# utils
+
+
+def _without_runtime_fields(hit: dict) -> dict:
+    """Runtime fields aren't part of the returned `_source`."""
+    names = hit.get("_runtime_fields")
+    if not names:
+        return hit
+    hit = {k: v for k, v in hit.items() if k != "_runtime_fields"}
+    hit["_source"] = {k: v for k, v in hit["_source"].items() if k not in names}
+    return hit
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _as_tuple(value) -> tuple:
+    if value is None:
+        return ()
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+
+def _is_true(value) -> bool:
+    return value is True or str(value).lower() == "true"
+
+
+def _parse_ndjson(body: Union[str, bytes, List]) -> List[dict]:
+    if isinstance(body, bytes):
+        body = body.decode("utf-8")
+    if isinstance(body, str):
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    return [json.loads(line) if isinstance(line, (str, bytes)) else line for line in body]
+
+
+def _get_source_filter(body: dict, params: dict):
+    source = body.get("_source", params.get("_source", True))
+    includes = params.get("_source_includes") or params.get("_source_include")
+    if includes:
+        return {"includes": _as_list(includes.split(",") if isinstance(includes, str) else includes)}
+    if source is False or source == "false":
+        return False
+    if isinstance(source, (list, str)) and source is not True:
+        return {"includes": _as_list(source)}
+    if isinstance(source, dict):
+        return source
+    return True
+
+
+def _filter_source(hit: dict, source_filter) -> dict:
+    hit = dict(hit)
+    if source_filter is True:
+        return hit
+    if source_filter is False:
+        hit.pop("_source")
+        return hit
+
+    filtered = {}
+    for field in source_filter.get("includes", []):
+        value = _get_field(hit, field)
+        if value is None:
+            continue
+        target = filtered
+        *parents, leaf = field.split(".")
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = value
+    hit["_source"] = filtered
+    return hit
@@ -0,0 +1,134 @@
+"""
+Optional OpenTelemetry tracing.
+
+Tracing is enabled in the `[TRACING]` section of `app.conf.ini` and requires the `opentelemetry-sdk` package
+(and `opentelemetry-exporter-otlp-proto-http` for the OTLP exporter). Otherwise, spans are no-ops.
+
+Exporters:
+
+* otlp - exports to the OTLP/HTTP collector at `OTLP_ENDPOINT`
+* file - appends one JSON span per line to `FILE_PATH`, for offline analysis
+"""
+import functools
+import json
+import logging
+from contextlib import contextmanager
+
+from flask import Flask, g, request
+
+from accountability_api.configuration_obj import ConfigurationObj
+
+try:
+    from opentelemetry import context, trace
+except ImportError:
+    context = None
+    trace = None
+
+LOGGER = logging.getLogger()
+
+TRACER_NAME = "accountability_api"
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def init_app(app: Flask):
+    """
+    Configures the tracer provider from `app.conf.ini` and registers request hooks
+    that create a root span for each request.
+    """
+    config = ConfigurationObj()
+    if config.get_item("ENABLED", profile="TRACING", default="False").strip().lower() != "true":
+        return
+    if trace is None:
+        LOGGER.warning("Tracing is enabled but opentelemetry is not installed. Spans will not be recorded.")
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    exporter_name = config.get_item("EXPORTER", profile="TRACING", default="file")
+    if exporter_name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter(endpoint=config.get_item("OTLP_ENDPOINT", profile="TRACING"))
+    elif exporter_name == "file":
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        exporter = ConsoleSpanExporter(
+            out=open(config.get_item("FILE_PATH", profile="TRACING", default="traces.jsonl"), "a"),
+            formatter=lambda span: json.dumps(json.loads(span.to_json())) + "\n"
+        )
+    else:
+        raise Exception(f"Unsupported tracing exporter. {exporter_name=}")
+
+    service_name = config.get_item("SERVICE_NAME", profile="TRACING", default="bach-api")
+    tracer_provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    tracer_provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(tracer_provider)
+
+    app.before_request(_start_request_span)
+    app.teardown_request(_end_request_span)
+
+
+def _start_request_span():
+    request_span = trace.get_tracer(TRACER_NAME).start_span(
+        f"{request.method} {request.url_rule.rule if request.url_rule else '<unmatched>'}",
+        kind=trace.SpanKind.SERVER,
+        attributes={"http.method": request.method, "http.target": request.full_path}
+    )
+    g.tracing_request_span = request_span
+    g.tracing_context_token = context.attach(trace.set_span_in_context(request_span))
+
+
+def _end_request_span(exception=None):
+    request_span = g.pop("tracing_request_span", None)
+    if request_span is None:
+        return
+    if exception is not None:
+        request_span.record_exception(exception)
+    context.detach(g.pop("tracing_context_token"))
+    request_span.end()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Creates a span around the context, a child of the current span.
+
+    :param name: the span name
+    :param attributes: span attributes
+    :return: the span. A no-op span when opentelemetry is not installed.
+    """
+    if trace is None:
+        yield NOOP_SPAN
+        return
+    with trace.get_tracer(TRACER_NAME).start_as_current_span(name, attributes=attributes) as current_span:
+        yield current_span
+
+
+def traced(name: str):
+    """Decorator that creates a span around each call of the decorated function. See `span`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_attributes(**attributes):
+    """Sets the attributes on the current span, if any."""
+    if trace is None:
+        return
+    trace.get_current_span().set_attributes(attributes)
@@ -1,15 +1,17 @@
-import logging
 import tempfile
+from datetime import datetime
 from typing import List
 
 import pandas as pd
+import pyarrow as pa
 
-from elasticsearch.exceptions import NotFoundError
 from flask import send_file
 from flask_restx import Namespace, Resource, reqparse
-from accountability_api.api_utils import query
+
+from accountability_api import coalescing, etags, profiling
+from accountability_api.api_utils import columnar, query
 from accountability_api.api_utils import metadata as consts
-from accountability_api.api_utils.utils import set_transfer_status
+from accountability_api.api_utils.utils import set_transfer_status, get_transfer_statuses, from_iso_to_dt, from_dt_to_iso, parse_interval
 
 api = Namespace("All Data", path="/data", description="Get all data details")
 
@@ -112,7 +114,55 @@ parser.add_argument(
     help="Sensor."
 )
 parser.add_argument("mime", type=str, location="args")
+parser.add_argument(
+    "profile",
+    dest="profile",
+    type=str,
+    choices=profiling.PROFILE_MODES,
+    location="args",
+    required=False,
+    help="Profile the request ( cpu | mem ). Requires profiling to be enabled."
+)
+
+timeseries_parser = reqparse.RequestParser()
+timeseries_parser.add_argument("start", dest="start_datetime", type=str, location="args", required=True, help="Please provide a valid ISO UTC datetime")
+timeseries_parser.add_argument("end", dest="end_datetime", type=str, location="args", required=True, help="Please provide a valid ISO UTC datetime")
+timeseries_parser.add_argument(
+    "interval",
+    type=str,
+    default="1h",
+    location="args",
+    required=False,
+    help="Bucket interval, e.g. 15m, 1h, 1d ( s | m | h | d )."
+)
+timeseries_parser.add_argument(
+    "category",
+    type=str,
+    default="all",
+    choices=("incoming", "generated", "outgoing", "all"),
+    location="args",
+    required=False,
+    help="Product category ( incoming | generated | outgoing | all )."
+)
 
+TIMESERIES_CATEGORIES = {
+    # category: (product types to indexes, timestamp field bucketed by)
+    "incoming": (consts.INCOMING_SDP_PRODUCTS, "creation_timestamp"),
+    "generated": (consts.GENERATED_PRODUCTS, "creation_timestamp"),
+    "outgoing": (consts.OUTGOING_PRODUCTS_TO_DAAC, "daac_CNM_S_timestamp"),
+}
+TIMESERIES_MAX_BUCKETS = 10000
+"""Upper bound on the number of buckets per product type, i.e. on the time range / interval."""
+
+DATA_TABLE_SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("dataset_type", pa.string()),
+    ("metadata.FileName", pa.string()),
+    ("metadata.ProductReceivedTime", pa.timestamp("us")),
+    ("daac_delivery_status", pa.string()),
+    ("daac_CNM_S_status", pa.string()),
+])
+"""Fields retrieved for columnar (Parquet, Arrow IPC) `/data` output."""
 
 
 @api.route("/list")
@@ -132,6 +182,8 @@ class ListDataTypes(Resource):
 @api.route("/list/count")
 class ListDataTypeCounts(Resource):
     @api.expect(parser)
+    @etags.etagged
+    @coalescing.coalesced
     def get(self):
         """
         Retrieve all filetypes and their indexes that we currently consider to be Ancillary files.
@@ -164,9 +216,61 @@ class ListDataTypeCounts(Resource):
         return results
 
 
+@api.route("/timeseries")
+class DataTimeSeries(Resource):
+    @api.expect(timeseries_parser)
+    @etags.etagged
+    @coalescing.coalesced
+    def get(self):
+        """
+        Retrieve product counts and file size sums per time interval and product type.
+        Incoming and generated products are bucketed by creation time, outgoing products by the time they were sent to the DAAC.
+        """
+        args = timeseries_parser.parse_args()
+
+        try:
+            interval_seconds = parse_interval(args["interval"]).total_seconds()
+        except ValueError as e:
+            api.abort(400, str(e))
+        try:
+            range_seconds = (from_iso_to_dt(args["end_datetime"]) - from_iso_to_dt(args["start_datetime"])).total_seconds()
+        except ValueError:
+            api.abort(400, "Please provide valid ISO UTC datetimes.")
+        if range_seconds < 0:
+            api.abort(400, "start must not be after end.")
+        if range_seconds / interval_seconds > TIMESERIES_MAX_BUCKETS:
+            api.abort(400, f"Too many buckets. Use a larger interval or a shorter time range. max_buckets={TIMESERIES_MAX_BUCKETS}")
+
+        categories = list(TIMESERIES_CATEGORIES) if args["category"] == "all" else [args["category"]]
+        searches = {
+            (category, product_type): (indexes, TIMESERIES_CATEGORIES[category][1])
+            for category in categories
+            for product_type, indexes in TIMESERIES_CATEGORIES[category][0].items()
+        }
+        histograms = query.get_date_histograms(
+            searches,
+            start=args["start_datetime"],
+            end=args["end_datetime"],
+            interval=args["interval"]
+        )
+
+        return [
+            {
+                "category": category,
+                "product_type": product_type,
+                "buckets": [
+                    {"timestamp": from_dt_to_iso(datetime.utcfromtimestamp(bucket["timestamp"] / 1000)), "count": bucket["count"], "file_size": bucket["sum"]}
+                    for bucket in buckets
+                ]
+            }
+            for (category, product_type), buckets in histograms.items()
+        ]
+
+
 @api.route("/<path:index_name>")
 class DataIndex(Resource):
     @api.expect(parser)
+    @etags.etagged
     def get(self, index_name):
         """
         Get a product based on provided ID.
@@ -215,6 +319,8 @@ class DataIndex(Resource):
 @api.route("/")
 class Data(Resource):
     @api.expect(parser)
+    @profiling.profiled
+    @etags.etagged
     def get(self):
         """
         Get a product based on provided ID.
@@ -234,28 +340,31 @@ class Data(Resource):
 
         product_id = args.get("product_id", None)
         size = args.get("size")
+        mimetype = args.get("mime")
+
+        if product_id is None and mimetype in columnar.COLUMNAR_MIMETYPES:
+            return self.get_columnar(indexes, args)
 
         if product_id is not None:
             docs = query.get_product(product_id)
         else:
-            for name in indexes:
-                index = indexes[name]
-                try:
-                    docs.extend(
-                        query.get_docs(
-                            index,
-                            start=start_datetime,
-                            end=end_datetime,
-                            size=size,
-                            metadata_tile_id=args["metadata_tile_id"],
-                            metadata_sensor=args["metadata_sensor"]
-                            # to be used later
-                            # workflow_start=workflow_start_dt,
-                            # workflow_end=workflow_end_dt,
-                        )
-                    )
-                except NotFoundError:
-                    logging.error(f"Index ({index}) was not found. Is the index name valid? Does it exist?")
+            # search all indexes with a single request
+            index = query.plan_index_expression(indexes)
+            docs.extend(
+                query.get_docs(
+                    index,
+                    start=start_datetime,
+                    end=end_datetime,
+                    size=size,
+                    metadata_tile_id=args["metadata_tile_id"],
+                    metadata_sensor=args["metadata_sensor"],
+                    ignore_unavailable=True,
+                    allow_no_indices=True
+                    # to be used later
+                    # workflow_start=workflow_start_dt,
+                    # workflow_end=workflow_end_dt,
+                )
+            )
 
         if len(docs) > 0:
             if not isinstance(docs, list):
@@ -266,8 +375,12 @@ class Data(Resource):
 
         report_df = pd.DataFrame(docs)
 
-        mimetype = args.get("mime")
-        if mimetype != "text/csv":
+        if mimetype in columnar.COLUMNAR_MIMETYPES:
+            report_df = columnar.to_typed_df(pd.json_normalize(docs), datetime_columns=["metadata.ProductReceivedTime"])
+            tmp_report = columnar.write_columnar(report_df, mimetype)
+
+            return send_file(tmp_report.name, mimetype=mimetype, as_attachment=True, download_name=f"data_summary.{columnar.FILE_EXTENSIONS[mimetype]}")
+        elif mimetype != "text/csv":
             return report_df.to_dict(orient="records")
         else:
             report_csv = report_df.to_csv(index=False)
@@ -278,6 +391,31 @@ class Data(Resource):
 
             return send_file(tmp_report_csv.name, as_attachment=True, download_name="data_summary.csv")
 
+    @staticmethod
+    def get_columnar(indexes: dict, args: dict):
+        """
+        Columnar counterpart of `get`. Docs are converted to Arrow directly from the Elasticsearch hits.
+        """
+        table = query.get_docs_table(
+            query.plan_index_expression(indexes),
+            DATA_TABLE_SCHEMA,
+            start=args.get("start_datetime", None),
+            end=args.get("end_datetime", None),
+            size=args.get("size"),
+            metadata_tile_id=args["metadata_tile_id"],
+            metadata_sensor=args["metadata_sensor"],
+            ignore_unavailable=True,
+            allow_no_indices=True
+        )
+
+        report_df = table.to_pandas()
+        report_df["transfer_status"] = get_transfer_statuses(report_df)
+        report_df = report_df[["id", "dataset_type", "metadata.FileName", "metadata.ProductReceivedTime", "transfer_status"]]
+
+        mimetype = args["mime"]
+        tmp_report = columnar.write_columnar(report_df, mimetype)
+        return send_file(tmp_report.name, mimetype=mimetype, as_attachment=True, download_name=f"data_summary.{columnar.FILE_EXTENSIONS[mimetype]}")
+
 
 def minimize_docs(docs: List) -> List:
     """Filter out redundant data from the request"""
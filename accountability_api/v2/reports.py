@@ -5,7 +5,10 @@ from dataclasses import dataclass
 
 from flask import request, make_response, current_app, send_file
 from flask_restx import Namespace, Resource, reqparse, fields
+from werkzeug.exceptions import HTTPException
 
+from accountability_api import coalescing, etags, prewarming, profiling
+from accountability_api.api_utils import columnar
 from accountability_api.api_utils.reporting.reports_generator import ReportsGenerator
 
 api = Namespace("Reports", path="/reports", description="Report related operations")
@@ -65,7 +68,8 @@ reportModel = api.model(
         "crid": fields.String,
         "processingMode": fields.String,
         "venue": fields.String,
-        "enableHistograms": fields.String
+        "enableHistograms": fields.String,
+        "interval": fields.String
     },
 )
 
@@ -79,6 +83,8 @@ parser.add_argument("crid", type=str, default="", location="args")
 parser.add_argument("processingMode", type=str, default="", location="args")
 parser.add_argument("venue", type=str, default="local", location="args")
 parser.add_argument("enableHistograms", type=str, default="false", choices=["false", "true"], location="args")
+parser.add_argument("interval", type=str, location="args", help="Bucket interval of time series reports, e.g. 1h, 1d ( s | m | h | d ). Picked from the time range when not given.")
+parser.add_argument("profile", type=str, choices=profiling.PROFILE_MODES, location="args", help="Profile the request. Requires profiling to be enabled.")
 
 
 def makeResponse(data, status="OK", code=200, message="Success!", result_json=None):
@@ -105,6 +111,10 @@ class CreateReport(Resource):
         self._crid = None
 
     @api.expect(parser)
+    @profiling.profiled
+    @etags.etagged
+    @prewarming.prewarmed(parser)
+    @coalescing.coalesced
     def get(self, reportName):
         """
         Get detailed Reports
@@ -131,7 +141,8 @@ class CreateReport(Resource):
         self._mimetype = args["mime"]
 
         self._report_options = {
-            "generate_histograms": args["enableHistograms"] == "true"
+            "generate_histograms": args["enableHistograms"] == "true",
+            "interval": args["interval"]
         }
 
         try:
@@ -154,10 +165,15 @@ class CreateReport(Resource):
                 return send_file(report.name, as_attachment=True, download_name=reports_generator.filename)
             if self._mimetype == "text/csv":
                 return send_file(report.name, as_attachment=True, download_name=reports_generator.filename)
+            if self._mimetype in columnar.COLUMNAR_MIMETYPES:
+                return send_file(report.name, mimetype=self._mimetype, as_attachment=True, download_name=reports_generator.filename)
             if self._mimetype == "image/png":
                 if not report:
                     return make_response('', 204)
                 return send_file(report.name, as_attachment=False)
+            if self._mimetype == "application/json" and isinstance(report, bytes):
+                # already-serialized report. avoid re-encoding by Flask
+                return current_app.response_class(report, mimetype="application/json")
 
             return make_response(report)
         except Exception as e:
@@ -245,6 +261,10 @@ def handle_bach_api_exception(error: BachApiException):
 
 @api.errorhandler(Exception)
 def handle_root_exception(error: Exception):
+    if isinstance(error, HTTPException):
+        # e.g. `abort(400)`, or request argument validation. keep the status code (and the message, see `flask_restx.abort`).
+        return {"message": error.description}, error.code
+
     return {
         # Problem Details (RFC 7807)
         "type": "https://opera.jpl.nasa.gov/probs/root",
@@ -8,7 +8,8 @@ setup(
     name="accountability_api",
     version="2.0.0",
     long_description="Data Accountability REST API using ElasticSearch backend",
-    packages=find_packages(),
+    # the in-memory Elasticsearch and synthetic catalogs are test and benchmark fixtures
+    packages=find_packages(exclude=["accountability_api.testing", "accountability_api.testing.*"]),
     include_package_data=True,
     zip_safe=False,
     install_requires=[
@@ -21,12 +22,19 @@ setup(
         "more-itertools>=10.2.0",
         "elasticsearch>=7.13.4,<8.0.0",
         "pandas>=2.1.0,== 2.*",
+        "pyarrow>=14.0.1",
         "matplotlib>=3.7.2",
+        "prometheus-client>=0.17.0",
     ],
     extras_require={
+        'tracing': [
+            "opentelemetry-sdk",
+            "opentelemetry-exporter-otlp-proto-http",
+        ],
         'test': [
             "pytest>=7.4.2",
             "pytest-mock",
+            "pytest-benchmark",
             "coverage",
             "pytest-cov",
 
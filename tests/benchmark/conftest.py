@@ -0,0 +1,121 @@
+"""
+Fixtures for benchmarks against seeded synthetic catalogs.
+
+Catalogs are generated with `CatalogGenerator` and served by `FakeElasticsearch`.
+
+Environment variables:
+
+* BENCHMARK_CATALOG_SIZES - comma-separated catalog sizes (number of documents). Default: 10000
+* BENCHMARK_ROUNDS - rounds per benchmark. Default: 3
+* BENCHMARK_UPDATE_BASELINES - when "true", records the measured ES calls and peak memory to `baselines.json`
+  instead of comparing against it
+* BENCHMARK_MEMORY_TOLERANCE - allowed relative increase of peak memory over the baseline. Default: 0.25
+* BENCHMARK_MEMORY_SLACK_KIB - allowed absolute increase of peak memory over the baseline, for small baselines. Default: 512
+
+Peak memory is the peak of the Python memory allocated by the benchmarked function (see `tracemalloc`), in an extra,
+untimed round. It excludes memory allocated beforehand (e.g. the seeded catalog), so that it doesn't depend on the
+other benchmarks of the run. Memory allocated outside the Python allocator (e.g. Arrow buffers) isn't included.
+"""
+import json
+import logging
+import math
+import os
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from accountability_api import create_app
+from accountability_api.testing.catalog_generator import CatalogGenerator, DEFAULT_RATES
+from accountability_api.testing.fake_elasticsearch import RUNTIME_FIELDS, FakeElasticsearch, FakeElasticsearchUtility
+
+CATALOG_SIZES = [int(size) for size in os.environ.get("BENCHMARK_CATALOG_SIZES", "10000").split(",")]
+CATALOG_START = datetime(2023, 1, 1)
+CATALOG_DAYS = 7
+ROUNDS = int(os.environ.get("BENCHMARK_ROUNDS", "3"))
+
+BASELINES_PATH = Path(__file__).parent / "baselines.json"
+UPDATE_BASELINES = os.environ.get("BENCHMARK_UPDATE_BASELINES", "false").lower() == "true"
+MEMORY_TOLERANCE = float(os.environ.get("BENCHMARK_MEMORY_TOLERANCE", "0.25"))
+MEMORY_SLACK_KIB = int(os.environ.get("BENCHMARK_MEMORY_SLACK_KIB", "512"))
+
+_baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if UPDATE_BASELINES:
+        BASELINES_PATH.write_text(json.dumps(_baselines, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def test_client():
+    flask_app = create_app("accountability_api.settings.DevelopmentConfig")
+    flask_app.logger.setLevel(logging.INFO)  # per-document debug logging would dominate the timings
+    with flask_app.test_client() as testing_client:
+        with flask_app.app_context():
+            yield testing_client
+
+
+@pytest.fixture(scope="session", params=CATALOG_SIZES, ids=lambda size: f"{size}docs")
+def catalog(request):
+    """A `FakeElasticsearch` seeded with a synthetic catalog of (approximately) the parameterized size."""
+    size: int = request.param
+
+    # scale the default rates to the requested size
+    docs_per_day = sum(1 for _ in CatalogGenerator(start=CATALOG_START, days=1).generate())
+    scale = size / (docs_per_day * CATALOG_DAYS)
+    rates = {input_product_type: max(1, math.ceil(rate * scale)) for input_product_type, rate in DEFAULT_RATES.items()}
+
+    es = FakeElasticsearch(runtime_fields=RUNTIME_FIELDS)
+    docs_by_index = {}
+    for index, doc in CatalogGenerator(start=CATALOG_START, days=CATALOG_DAYS, rates=rates).generate():
+        docs_by_index.setdefault(index, []).append(doc)
+    for index, docs in docs_by_index.items():
+        es.add_documents(index, docs)
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr("accountability_api.es_connection.get_grq_es", lambda *args, **kwargs: FakeElasticsearchUtility(es))
+        monkeypatch.setattr("accountability_api.api_utils.index_resolver.INDEX_RESOLVER", None)
+        yield es
+
+
+@pytest.fixture
+def measure(benchmark, catalog: FakeElasticsearch, request):
+    """
+    Benchmarks the given function, and records the ES calls issued per round and the peak memory in the benchmark's
+    `extra_info`. Fails when either exceeds the stored baseline. See the module documentation.
+    """
+    def run(func, *args, **kwargs):
+        catalog.calls.clear()
+
+        result = benchmark.pedantic(func, args=args, kwargs=kwargs, rounds=ROUNDS, iterations=1)
+        es_calls = sum(catalog.calls.values()) // ROUNDS
+
+        measurements = {
+            "es_calls": es_calls,
+            "peak_memory_kib": _peak_memory_bytes(func, *args, **kwargs) // 1024,
+        }
+        benchmark.extra_info.update(measurements)
+
+        if UPDATE_BASELINES:
+            _baselines[request.node.name] = measurements
+            return result
+
+        baseline = _baselines.get(request.node.name)
+        if baseline:
+            assert measurements["es_calls"] <= baseline["es_calls"], f"ES calls regressed. {measurements=}, {baseline=}"
+            assert measurements["peak_memory_kib"] <= baseline["peak_memory_kib"] * (1 + MEMORY_TOLERANCE) + MEMORY_SLACK_KIB, f"Peak memory regressed. {measurements=}, {baseline=}"
+        return result
+    return run
+
+
+def _peak_memory_bytes(func, *args, **kwargs) -> int:
+    """:return: the peak of the Python memory allocated by a call of the given function (untimed, as tracing is slow)"""
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
@@ -0,0 +1,57 @@
+"""
+Benchmarks for report serialization.
+
+Run with `pytest tests/benchmark`. Requires `pytest-benchmark`.
+"""
+import json
+
+import pandas
+import pytest
+
+from accountability_api.api_utils.reporting.report_util import to_json_report
+
+NUM_ROWS = 100_000
+
+
+@pytest.fixture(scope="module")
+def detailed_log_df():
+    return pandas.DataFrame([
+        {
+            "input_product_name": f"HLS.L30.T22VEQ.2021248T{i % 240000:06d}.v2.0",
+            "input_product_type": "L2_HLS_L30",
+            "public_available_datetime": "2021-09-05T14:31:56",
+            "opera_detect_datetime": "2021-09-05T15:31:56",
+            "product_received_datetime": "2021-09-05T16:31:56",
+            "retrieval_time": "02:00:00",
+        }
+        for i in range(NUM_ROWS)
+    ])
+
+
+@pytest.fixture(scope="module")
+def header():
+    return [
+        {"Title": "OPERA Retrieval Time Log"},
+        {"Date of Report": "1970-01-01T00:00:00Z"},
+        {"Period of Coverage (AcquisitionTime)": "1970-01-01T00:00:00Z - 1970-01-01T00:00:00Z"}
+    ]
+
+
+@pytest.mark.benchmark(group="json-report-100k")
+def test_to_json_report(benchmark, header, detailed_log_df):
+    json_report = benchmark(to_json_report, header, detailed_log_df)
+
+    assert len(json.loads(json_report)["payload"]) == NUM_ROWS
+
+
+@pytest.mark.benchmark(group="json-report-100k")
+def test_to_json_report__legacy_round_trip(benchmark, header, detailed_log_df):
+    """Baseline. The previous to_json -> json.loads -> json.dumps implementation."""
+    def legacy_to_json_report():
+        report_json = detailed_log_df.to_json(orient="records", date_format="epoch", lines=False)
+        report_obj: list[dict] = json.loads(report_json)
+        return json.dumps({"header": header, "payload": report_obj})
+
+    json_report = benchmark(legacy_to_json_report)
+
+    assert len(json.loads(json_report)["payload"]) == NUM_ROWS
@@ -0,0 +1,120 @@
+"""
+Benchmarks for report generation and the `/data` endpoints against seeded synthetic catalogs. See `conftest.py`.
+
+Run with `pytest tests/benchmark/test_reports.py`. Requires `pytest-benchmark`.
+"""
+import pytest
+
+from accountability_api.api_utils import columnar
+from accountability_api.api_utils.reporting.reports_generator import ReportsGenerator
+from accountability_api.api_utils.reporting.retrieval_time_detailed_report import RetrievalTimeDetailedReport
+
+START = "2023-01-01T00:00:00"
+END = "2023-01-08T00:00:00"
+
+TIME_REPORTS = [
+    "RetrievalTimeDetailedReport",
+    "RetrievalTimeSummaryReport",
+    "ProductionTimeDetailedReport",
+    "ProductionTimeSummaryReport",
+]
+TIME_REPORT_MIMETYPES = ["application/json", "text/csv", "text/html", "application/zip", *columnar.COLUMNAR_MIMETYPES]
+
+ACCOUNTABILITY_REPORTS = [
+    "IncomingFiles",
+    "GeneratedSdsProducts",
+    "DaacOutgoingProducts",
+    "DataAccountabilityReport",
+    "ObservationAccountabilityReport",
+]
+ACCOUNTABILITY_REPORT_MIMETYPES = ["xml", "csv", "json"]
+
+DATA_MIMETYPES = ["application/json", "text/csv", *columnar.COLUMNAR_MIMETYPES]
+
+
+def generate_report(report_name, mimetype):
+    report = ReportsGenerator(START, END, mime=mimetype).generate_report(
+        report_name,
+        output_format=mimetype,
+        processing_mode=None,
+        venue=None,
+        crid=None,
+        report_options={"generate_histograms": False}
+    )
+    if hasattr(report, "close"):  # temporary report file
+        report.close()
+    return report
+
+
+@pytest.mark.benchmark(group="time-reports")
+@pytest.mark.parametrize("mimetype", TIME_REPORT_MIMETYPES)
+@pytest.mark.parametrize("report_name", TIME_REPORTS)
+def test_time_report(test_client, measure, report_name, mimetype):
+    measure(generate_report, report_name, mimetype)
+
+
+@pytest.mark.benchmark(group="accountability-reports")
+@pytest.mark.parametrize("mimetype", ACCOUNTABILITY_REPORT_MIMETYPES)
+@pytest.mark.parametrize("report_name", ACCOUNTABILITY_REPORTS)
+def test_accountability_report(test_client, measure, report_name, mimetype):
+    measure(generate_report, report_name, mimetype)
+
+
+@pytest.mark.benchmark(group="time-series-reports")
+def test_backlog_report(test_client, measure):
+    # a multi-month time range. the catalog only spans its first week
+    report = measure(ReportsGenerator("2023-01-01T00:00:00", "2023-04-01T00:00:00", mime="application/json").generate_report, "BacklogReport", output_format="application/json", report_options={})
+
+    assert report
+
+
+@pytest.mark.benchmark(group="time-series-reports")
+def test_gap_report(test_client, measure):
+    report = measure(ReportsGenerator(START, END, mime="application/json").generate_report, "GapReport", output_format="application/json")
+
+    assert report
+
+
+@pytest.mark.benchmark(group="production-time-summary")
+@pytest.mark.parametrize("server_side_aggregations", [False, True], ids=["client-side", "server-side"])
+def test_production_time_summary(test_client, measure, monkeypatch, server_side_aggregations):
+    # compares the exact client-side summary with the Elasticsearch aggregations. See `[SERVER_SIDE_AGGREGATIONS] ENABLED`.
+    def get_item(self, key, profile="default", default=None):
+        if profile == "SERVER_SIDE_AGGREGATIONS":
+            return {"ENABLED": str(server_side_aggregations)}.get(key, default)
+        return default
+    monkeypatch.setattr("accountability_api.configuration_obj.ConfigurationObj.get_item", get_item)
+
+    measure(generate_report, "ProductionTimeSummaryReport", "application/json")
+
+
+@pytest.mark.benchmark(group="latest-revisions")
+@pytest.mark.parametrize("collapse_revisions", [False, True], ids=["every-revision", "server-side"])
+def test_latest_revisions(test_client, measure, monkeypatch, collapse_revisions):
+    # compares fetching every revision with the composite aggregation over a runtime field, e.g. with
+    # BENCHMARK_CATALOG_SIZES=10000,100000 to see how each scales. See `[SERVER_SIDE_AGGREGATIONS] COLLAPSE_REVISIONS`.
+    def get_item(self, key, profile="default", default=None):
+        if profile == "SERVER_SIDE_AGGREGATIONS":
+            return {"ENABLED": "True", "COLLAPSE_REVISIONS": str(collapse_revisions)}.get(key, default)
+        return default
+    monkeypatch.setattr("accountability_api.configuration_obj.ConfigurationObj.get_item", get_item)
+    report = RetrievalTimeDetailedReport(title="Benchmark", start_date=START, end_date=END, timestamp=END, report_options={})
+
+    docs = measure(report.get_revisioned_docs, "grq_*_l2_hls_l30-*")
+
+    assert docs
+
+
+@pytest.mark.benchmark(group="data")
+@pytest.mark.parametrize("mimetype", DATA_MIMETYPES)
+def test_data(test_client, measure, mimetype):
+    response = measure(test_client.get, "/data/", query_string={"start": START, "end": END, "mime": mimetype})
+
+    assert response.status_code == 200
+
+
+@pytest.mark.benchmark(group="data")
+def test_data_index(test_client, measure):
+    response = measure(test_client.get, "/data/L3_DSWX_HLS", query_string={"start": START, "end": END})
+
+    assert response.status_code == 200
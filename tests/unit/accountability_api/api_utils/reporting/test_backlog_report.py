@@ -0,0 +1,63 @@
+import json
+from datetime import datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from accountability_api.api_utils import metadata
+from accountability_api.api_utils.reporting.backlog_report import BacklogReport
+from accountability_api.testing.catalog_generator import CatalogGenerator
+from accountability_api.testing.fake_elasticsearch import FakeElasticsearch, FakeElasticsearchUtility
+
+
+@pytest.fixture
+def es(mocker: MockerFixture):
+    es = FakeElasticsearch()
+    for index, doc in CatalogGenerator(start=datetime(2023, 1, 1), days=2, rates={"HLS_L30": 3, "HLS_S30": 2, "L1_S1_SLC": 2}).generate():
+        es.add_documents(index, [doc])
+    mocker.patch("accountability_api.api_utils.query.es_connection.get_grq_es", return_value=FakeElasticsearchUtility(es))
+    return es
+
+
+def backlog_report(start="2023-01-01T00:00:00Z", end="2023-01-03T00:00:00Z", **report_options):
+    return BacklogReport(title="BacklogReport", start_date=start, end_date=end, timestamp="2023-01-03T00:00:00Z", report_options=report_options)
+
+
+def test_generate_report(test_client, es: FakeElasticsearch):
+    # ACT
+    report = json.loads(backlog_report(interval="1d").generate_report("application/json"))
+
+    # ASSERT
+    assert es.calls == {"msearch": 1}  # no docs fetched
+
+    rows = report["payload"]
+    hls_rows = [row for row in rows if row["sds_product_type"] == "L3_DSWX_HLS"]
+    assert {row["input_product_type"] for row in hls_rows} == {"L2_HLS_L30,L2_HLS_S30"}  # a single backlog for both sensors
+    assert [row["timestamp"] for row in hls_rows] == ["2023-01-01T00:00:00.000000Z", "2023-01-02T00:00:00.000000Z", "2023-01-03T00:00:00.000000Z"]
+    assert [row["cumulative_arrivals"] for row in hls_rows] == [sum(row["arrivals"] for row in hls_rows[:i + 1]) for i in range(len(hls_rows))]
+    assert [row["cumulative_completions"] for row in hls_rows] == [sum(row["completions"] for row in hls_rows[:i + 1]) for i in range(len(hls_rows))]
+    assert all(row["backlog"] == row["cumulative_arrivals"] - row["cumulative_completions"] for row in rows)
+    assert hls_rows[-1]["cumulative_arrivals"] == es.count(index=",".join(metadata.INCOMING_SDP_PRODUCTS["HLS_L30"] + metadata.INCOMING_SDP_PRODUCTS["HLS_S30"]))["count"]
+    assert hls_rows[-1]["cumulative_completions"] == es.count(
+        index=",".join(metadata.PRODUCT_TYPE_TO_INDEX["L3_DSWX_HLS"]),
+        body={"query": {"range": {"creation_timestamp": {"lte": "2023-01-03T00:00:00Z"}}}}
+    )["count"]
+    assert hls_rows[-1]["backlog"] >= 0  # each DSWx-HLS product is subtracted once
+
+    pairs = {(row["input_product_type"], row["sds_product_type"]) for row in rows}
+    assert ("L1_S1_SLC", "L2_RTC_S1") in pairs
+    assert ("L1_S1_SLC", "L2_CSLC_S1") in pairs
+
+
+@pytest.mark.parametrize("start, end, expected_interval", [
+    ("2023-01-01T00:00:00Z", "2023-01-08T00:00:00Z", "1h"),
+    ("2023-01-01T00:00:00Z", "2023-04-01T00:00:00Z", "6h"),
+    ("2023-01-01T00:00:00Z", "2024-01-01T00:00:00Z", "1d"),
+])
+def test_get_interval(start, end, expected_interval):
+    assert backlog_report(start=start, end=end).get_interval() == expected_interval
+
+
+def test_get_interval__too_many_buckets():
+    with pytest.raises(Exception):
+        backlog_report(start="2023-01-01T00:00:00Z", end="2024-01-01T00:00:00Z", interval="1m").get_interval()
@@ -0,0 +1,156 @@
+import json
+from datetime import datetime
+
+import pytest
+from pytest_mock import MockerFixture
+
+from accountability_api.api_utils import metadata, utils
+from accountability_api.api_utils.reporting.gap_report import GAP_JOINS, GapReport, find_gaps
+from accountability_api.testing.catalog_generator import CatalogGenerator
+from accountability_api.testing.fake_elasticsearch import RUNTIME_FIELDS, FakeElasticsearch
+
+
+def seed_catalog(es: FakeElasticsearch) -> set:
+    """Seeds the catalog, dropping some SDS products. :return: the expected gaps"""
+    expected_gaps = set()
+    granule_id = None
+    for i, (index, doc) in enumerate(CatalogGenerator(start=datetime(2023, 1, 1), days=2, rates={"HLS_L30": 3, "HLS_S30": 2, "L1_S1_SLC": 2}).generate()):
+        if index.startswith(("grq_v2.0_l2_hls", "grq_v1.0_l1_s1_slc")):
+            granule_id, _ = utils.split_revision(doc["id"])
+            dataset_type = doc["dataset_type"]
+        elif index.startswith(("grq_v1.0_l3_dswx_hls", "grq_v1.0_l2_cslc_s1", "grq_v1.0_l2_rtc_s1")) and i % 3 == 0:
+            sds_product_type = metadata.sds_product_id_to_sds_product_type(doc["id"])
+            expected_gaps.add((dataset_type, sds_product_type, granule_id))
+            continue
+        es.add_documents(index, [doc])
+    return expected_gaps
+
+
+@pytest.fixture
+def es(grq_es):
+    return grq_es(runtime_fields=RUNTIME_FIELDS)
+
+
+def gap_report(start="2023-01-01T00:00:00Z", end="2023-01-03T00:00:00Z"):
+    return GapReport(title="GapReport", start_date=start, end_date=end, timestamp="2023-01-03T00:00:00Z")
+
+
+def test_generate_report(test_client, es: FakeElasticsearch, mocker: MockerFixture):
+    # ARRANGE
+    expected_gaps = seed_catalog(es)
+    mocker.patch("accountability_api.api_utils.reporting.gap_report.PAGE_SIZE", 2)
+
+    # ACT
+    report = json.loads(gap_report().generate_report("application/json"))
+
+    # ASSERT
+    gaps = {(row["input_product_type"], row["sds_product_type"], row["granule_id"]) for row in report["payload"]}
+    assert expected_gaps
+    assert gaps == expected_gaps
+    assert es.calls["scroll"] > 2 * len(GAP_JOINS)  # streamed a page at a time
+
+
+def test_generate_report__time_range(test_client, es: FakeElasticsearch):
+    # ARRANGE
+    seed_catalog(es)
+
+    # ACT
+    report = json.loads(gap_report(start="2023-02-01T00:00:00Z", end="2023-02-02T00:00:00Z").generate_report("application/json"))
+
+    # ASSERT
+    assert report["payload"] == []
+
+
+def test_find_gaps():
+    # ARRANGE
+    join = next(join for join in GAP_JOINS if join.input_product_type == "L1_S1_SLC")
+    inputs = [
+        ("S1A_IW_SLC__1SDV_20230101T000000_20230101T000027_000001_000001_0001-r1", "2023-01-01T01:00:00.000000Z"),
+        ("S1A_IW_SLC__1SDV_20230101T000000_20230101T000027_000001_000001_0001-r2", "2023-01-01T02:00:00.000000Z"),
+        ("S1A_IW_SLC__1SDV_20230101T000020_20230101T000047_000001_000001_0002-r1", "2023-01-01T01:00:00.000000Z"),
+        ("S1A_IW_SLC__1SDV_20230101T010000_20230101T010027_000001_000001_0003-r1", "2023-01-01T01:00:00.000000Z"),
+        ("S1B_IW_SLC__1SDV_20230101T000000_20230101T000027_000001_000001_0004-r1", "2023-01-01T01:00:00.000000Z"),
+    ]
+    products = [
+        ("OPERA_L2_CSLC_S1A_IW_T001-000001-IW1_VV_20230101T000005Z_v0.1_20230101T010000Z", "2023-01-01T03:00:00.000000Z"),
+        ("OPERA_L2_CSLC_S1A_IW_T001-000002-IW1_VV_20230101T000030Z_v0.1_20230101T010000Z", "2023-01-01T03:00:00.000000Z"),
+        # another platform, within the sensing time range of the third SLC
+        ("OPERA_L2_CSLC_S1B_IW_T001-000003-IW1_VV_20230101T010005Z_v0.1_20230101T020000Z", "2023-01-01T03:00:00.000000Z"),
+    ]
+
+    # ACT
+    gaps = list(find_gaps(join, iter(inputs), iter(products)))
+
+    # ASSERT
+    assert gaps == [
+        ("S1A_IW_SLC__1SDV_20230101T010000_20230101T010027_000001_000001_0003", "2023-01-01T01:00:00.000000Z"),
+        ("S1B_IW_SLC__1SDV_20230101T000000_20230101T000027_000001_000001_0004", "2023-01-01T01:00:00.000000Z"),
+    ]
+
+
+def test_find_gaps__when_some_bursts_are_missing():
+    # ARRANGE
+    join = next(join for join in GAP_JOINS if join.input_product_type == "L1_S1_SLC")
+    inputs = [("S1A_IW_SLC__1SDV_20230101T000000_20230101T000027_000001_000001_0001-r1", "2023-01-01T01:00:00.000000Z")]
+    products = [("OPERA_L2_CSLC_S1A_IW_T001-000001-IW1_VV_20230101T000005Z_v0.1_20230101T010000Z", "2023-01-01T03:00:00.000000Z")]
+
+    # ACT
+    gaps = list(find_gaps(join, iter(inputs), iter(products)))
+
+    # ASSERT
+    assert gaps == []  # the bursts of an SLC aren't known, so an SLC is only reported when all of its bursts are missing
+
+
+def test_find_gaps__when_ids_are_unknown():
+    # ARRANGE
+    join = next(join for join in GAP_JOINS if join.input_product_type == "L1_S1_SLC")
+    inputs = [
+        ("S1A_IW_SLC__1SDV_20230101T000000_20230101T000027_000001_000001_0001-r1", "2023-01-01T01:00:00.000000Z"),
+        ("unknown", "2023-01-01T01:00:00.000000Z"),
+    ]
+    products = [("unknown", "2023-01-01T03:00:00.000000Z")]
+
+    # ACT
+    gaps = list(find_gaps(join, iter(inputs), iter(products)))
+
+    # ASSERT
+    assert gaps == [("S1A_IW_SLC__1SDV_20230101T000000_20230101T000027_000001_000001_0001", "2023-01-01T01:00:00.000000Z")]
+
+
+def test_find_gaps__when_revisions_are_interleaved():
+    # ARRANGE
+    join = next(join for join in GAP_JOINS if join.input_product_type == "L2_HLS_L30")
+    inputs = [  # granules of the same join key
+        ("HLS.L30.T22VEQ.2021248T143156.v2.0-r1", "2023-01-01T01:00:00.000000Z"),
+        ("HLS.L30.T22VEQ.2021248T143156.v2.1-r1", "2023-01-01T02:00:00.000000Z"),
+        ("HLS.L30.T22VEQ.2021248T143156.v2.0-r2", "2023-01-01T03:00:00.000000Z"),
+    ]
+
+    # ACT
+    gaps = list(find_gaps(join, iter(inputs), iter([])))
+
+    # ASSERT
+    assert gaps == [
+        ("HLS.L30.T22VEQ.2021248T143156.v2.0", "2023-01-01T01:00:00.000000Z"),
+        ("HLS.L30.T22VEQ.2021248T143156.v2.1", "2023-01-01T02:00:00.000000Z"),
+    ]
+
+
+def test_find_gaps__unsorted():
+    # ARRANGE
+    join = next(join for join in GAP_JOINS if join.input_product_type == "L2_HLS_L30")
+    inputs = [
+        ("HLS.L30.T22VEQ.2021248T143156.v2.0-r1", "2023-01-01T01:00:00.000000Z"),
+        ("HLS.L30.T10ABC.2021248T143156.v2.0-r1", "2023-01-01T01:00:00.000000Z"),
+        ("HLS.L30.T22VER.2021248T143156.v2.0-r1", "2023-01-01T01:00:00.000000Z"),
+    ]
+    products = [
+        ("OPERA_L3_DSWx-HLS_T22VER_20210905T143156Z_20230101T000000Z_L8_30_v1.0", "2023-01-01T03:00:00.000000Z"),
+        ("OPERA_L3_DSWx-HLS_T10ABC_20210905T143156Z_20230101T000000Z_L8_30_v1.0", "2023-01-01T03:00:00.000000Z"),
+    ]
+
+    # ACT
+    gaps = list(find_gaps(join, iter(inputs), iter(products)))
+
+    # ASSERT
+    assert gaps == [("HLS.L30.T22VEQ.2021248T143156.v2.0", "2023-01-01T01:00:00.000000Z")]  # the out of order rows are skipped
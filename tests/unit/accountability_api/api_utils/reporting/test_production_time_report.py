@@ -5,7 +5,11 @@ import pandas
 from pandas.testing import assert_frame_equal
 from pytest_mock import MockerFixture
 
+from accountability_api.api_utils import metadata, query
 from accountability_api.api_utils.reporting.production_time_detailed_report import ProductionTimeDetailedReport
+from accountability_api.api_utils.reporting.production_time_report import ProductionTimeReport
+from accountability_api.api_utils.reporting.production_time_summary_report import ProductionTimeSummaryReport
+from accountability_api.testing.fake_elasticsearch import RUNTIME_FIELDS
 
 
 def test_generate_report__when_json_and_empty(test_client, mocker: MockerFixture):
@@ -165,3 +169,61 @@ def test_to_report_df__when_reportable_products__and_summary_report__and_multipl
     assert second_row["opera_product_short_name"] == "dummy_opera_product_short_name_b"
     assert second_row["production_time_count"] == 1
 
+
+def summary_report():
+    return ProductionTimeSummaryReport(
+        title="Test Report", start_date="2023-01-01T00:00:00Z", end_date="2023-01-03T00:00:00Z", timestamp="2023-01-03T00:00:00Z",
+        report_options={"generate_histograms": False}
+    )
+
+
+def enable_server_side_aggregations(monkeypatch):
+    def get_item(self, key, profile="default", default=None):
+        return {"ENABLED": "True"}.get(key, default) if profile == "SERVER_SIDE_AGGREGATIONS" else default
+    monkeypatch.setattr("accountability_api.configuration_obj.ConfigurationObj.get_item", get_item)
+
+
+def test_generate_report__when_summary__by_default(test_client, catalog_es):
+    # ARRANGE
+    es = catalog_es(runtime_fields=RUNTIME_FIELDS)
+
+    # ACT
+    json_report = summary_report().generate_report("application/json")
+
+    # ASSERT
+    assert es.calls["msearch"] == 0  # exact statistics computed client-side
+    assert es.calls["search"] > 0
+    assert len(json.loads(json_report)["payload"]) > 0
+
+
+def test_generate_report__when_summary__aggregates_server_side(test_client, catalog_es, monkeypatch):
+    # ARRANGE
+    es = catalog_es(runtime_fields=RUNTIME_FIELDS)
+    enable_server_side_aggregations(monkeypatch)
+    product_docs = []
+    for index in [index for indexes in metadata.PRODUCT_TYPE_TO_INDEX.values() for index in indexes]:
+        product_docs += query.get_docs(indexes=[index], start="2023-01-01T00:00:00Z", end="2023-01-03T00:00:00Z")
+    expected_payload = json.loads(ProductionTimeReport.to_report_df(product_docs, "summary", {"generate_histograms": False}).to_json(orient="records"))
+    es.calls.clear()
+
+    # ACT
+    json_report = summary_report().generate_report("application/json")
+
+    # ASSERT
+    assert es.calls["msearch"] == 1
+    assert es.calls["search"] == 0  # no products fetched
+    assert json.loads(json_report)["payload"] == expected_payload
+
+
+def test_generate_report__when_summary__and_no_runtime_fields__falls_back_to_client_side(test_client, catalog_es, monkeypatch):
+    # ARRANGE
+    es = catalog_es()  # runtime fields are not supported
+    enable_server_side_aggregations(monkeypatch)
+
+    # ACT
+    json_report = summary_report().generate_report("application/json")
+
+    # ASSERT
+    assert es.calls["msearch"] == 1
+    assert es.calls["search"] > 0  # products fetched
+    assert len(json.loads(json_report)["payload"]) > 0
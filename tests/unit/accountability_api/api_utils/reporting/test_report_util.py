@@ -0,0 +1,38 @@
+import json
+
+import pandas
+
+from accountability_api.api_utils.reporting.report_util import to_json_report
+
+
+def test_to_json_report__when_empty():
+    # ARRANGE
+    header = [{"Title": "OPERA Retrieval Time Log"}]
+
+    # ACT
+    json_report = to_json_report(header, pandas.DataFrame())
+
+    # ASSERT
+    assert json.loads(json_report) == {"header": header, "payload": []}
+
+
+def test_to_json_report__when_has_records():
+    # ARRANGE
+    header = [{"Title": "OPERA Production Time Log"}, {"Date of Report": "1970-01-01T00:00:00Z"}]
+    report_df = pandas.DataFrame([
+        {"opera_product_name": "dummy_opera_product_name_a", "production_time": "01:00:00"},
+        {"opera_product_name": "dummy_opera_product_name_b", "production_time": "N/A"}
+    ])
+
+    # ACT
+    json_report = to_json_report(header, report_df)
+
+    # ASSERT
+    assert isinstance(json_report, bytes)
+    assert json.loads(json_report) == {
+        "header": header,
+        "payload": [
+            {"opera_product_name": "dummy_opera_product_name_a", "production_time": "01:00:00"},
+            {"opera_product_name": "dummy_opera_product_name_b", "production_time": "N/A"}
+        ]
+    }
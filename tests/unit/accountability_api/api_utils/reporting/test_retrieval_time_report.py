@@ -5,7 +5,10 @@ import pandas
 from pandas.testing import assert_frame_equal
 from pytest_mock import MockerFixture
 
+from accountability_api.api_utils import query
 from accountability_api.api_utils.reporting.retrieval_time_detailed_report import RetrievalTimeDetailedReport
+from accountability_api.api_utils.reporting.retrieval_time_report import RetrievalTimeReport
+from accountability_api.testing.fake_elasticsearch import RUNTIME_FIELDS
 
 
 def test_generate_report__when_json_and_empty(test_client, mocker: MockerFixture):
@@ -114,3 +117,88 @@ def test_to_report_df__when_detailed_report__and_has_output_products__but_no_cnm
     assert first_row['opera_detect_datetime'] == '1970-01-01T00:00:00'
     assert first_row['product_received_datetime'] == '1970-01-01T00:00:00'
     assert first_row['retrieval_time'] == '00:00:00'
+
+
+def test_to_report_df__when_rtc_products_reprocessed(test_client):
+    # ARRANGE
+    report = RetrievalTimeDetailedReport(title="Test Report", start_date="2023-01-01", end_date="2023-01-02", timestamp="2023-01-02", report_options={})
+    rtc_docs = [
+        {
+            "_id": f"OPERA_L2_RTC-S1_T064-135524-IW2_20230101T015035Z_{production_ts}Z_S1A_30_v1.0",
+            "id": f"OPERA_L2_RTC-S1_T064-135524-IW2_20230101T015035Z_{production_ts}Z_S1A_30_v1.0",
+            "creation_timestamp": creation_timestamp,
+            "query_datetime": creation_timestamp,
+            "production_datetime": creation_timestamp,
+            "mgrs_set_id_acquisition_ts_cycle_indexes": ["MS_64_10$293"],
+        }
+        for production_ts, creation_timestamp in [("20230101T120000", "2023-01-01T12:00:00"), ("20230101T180000", "2023-01-01T18:00:00")]
+    ]
+
+    # ACT
+    report_df = report.to_report_df(dataset_docs=rtc_docs, report_type="detailed", start="2023-01-01", end="2023-01-02", report_options={})
+
+    # ASSERT
+    assert report_df["input_product_name"].tolist() == [rtc_docs[1]["_id"]]
+
+
+def seed_revisions(es):
+    es.add_documents("grq_v2.0_l2_hls_l30-2023.01", [
+        {"_id": f"{granule_id}-r{revision}", "id": f"{granule_id}-r{revision}", "creation_timestamp": creation_timestamp}
+        for granule_id, revision, creation_timestamp in [
+            ("HLS.L30.T22VEQ.2023001T143156.v2.0", 1, "2023-01-01T01:00:00.000000Z"),
+            ("HLS.L30.T22VEQ.2023001T143156.v2.0", 2, "2023-01-01T03:00:00.000000Z"),
+            ("HLS.L30.T22VEQ.2023001T143156.v2.0", 3, "2023-01-01T02:00:00.000000Z"),
+            ("HLS.L30.T22VER.2023001T143156.v2.0", 1, "2023-01-01T01:00:00.000000Z"),
+        ]
+    ])
+
+
+def enable_collapse_revisions(monkeypatch):
+    def get_item(self, key, profile="default", default=None):
+        return {"ENABLED": "True", "COLLAPSE_REVISIONS": "True"}.get(key, default) if profile == "SERVER_SIDE_AGGREGATIONS" else default
+    monkeypatch.setattr("accountability_api.configuration_obj.ConfigurationObj.get_item", get_item)
+
+
+def test_get_revisioned_docs__when_collapsing_revisions(test_client, grq_es, monkeypatch):
+    # ARRANGE
+    es = grq_es(runtime_fields=RUNTIME_FIELDS)
+    seed_revisions(es)
+    enable_collapse_revisions(monkeypatch)
+    report = RetrievalTimeDetailedReport(title="Test Report", start_date="2023-01-01T00:00:00", end_date="2023-01-02T00:00:00", timestamp="2023-01-02T00:00:00", report_options={})
+
+    # ACT
+    docs = report.get_revisioned_docs("grq_*_l2_hls_l30-*")
+
+    # ASSERT
+    assert sorted(doc["_id"] for doc in docs) == ["HLS.L30.T22VEQ.2023001T143156.v2.0-r2", "HLS.L30.T22VER.2023001T143156.v2.0-r1"]
+    assert all("base_id" not in doc for doc in docs)
+    assert "scroll" not in es.calls  # earlier revisions aren't transferred
+    assert sorted(docs, key=lambda doc: doc["_id"]) == sorted(RetrievalTimeReport.collapse_revisions(query.get_docs("grq_*_l2_hls_l30-*")), key=lambda doc: doc["_id"])
+
+
+def test_get_revisioned_docs__by_default(test_client, grq_es, mocker: MockerFixture):
+    # ARRANGE
+    seed_revisions(grq_es(runtime_fields=RUNTIME_FIELDS))
+    server_side = mocker.spy(query, "get_latest_revisions")
+    report = RetrievalTimeDetailedReport(title="Test Report", start_date="2023-01-01T00:00:00", end_date="2023-01-02T00:00:00", timestamp="2023-01-02T00:00:00", report_options={})
+
+    # ACT
+    docs = report.get_revisioned_docs("grq_*_l2_hls_l30-*")
+
+    # ASSERT
+    assert len(docs) == 4  # every revision, as when revisions aren't collapsed
+    server_side.assert_not_called()
+
+
+def test_get_revisioned_docs__when_collapsing_revisions__without_runtime_fields(test_client, grq_es, monkeypatch):
+    # ARRANGE
+    es = grq_es()  # e.g. Elasticsearch < 7.11
+    seed_revisions(es)
+    enable_collapse_revisions(monkeypatch)
+    report = RetrievalTimeDetailedReport(title="Test Report", start_date="2023-01-01T00:00:00", end_date="2023-01-02T00:00:00", timestamp="2023-01-02T00:00:00", report_options={})
+
+    # ACT
+    docs = report.get_revisioned_docs("grq_*_l2_hls_l30-*")
+
+    # ASSERT
+    assert [doc["_id"] for doc in docs] == ["HLS.L30.T22VEQ.2023001T143156.v2.0-r2", "HLS.L30.T22VER.2023001T143156.v2.0-r1"]
@@ -0,0 +1,75 @@
+from accountability_api.api_utils import burst_set
+
+
+def rtc_doc(burst_id, acquisition_ts, creation_timestamp, production_ts="20230101T120000", **kwargs):
+    id_ = f"OPERA_L2_RTC-S1_{burst_id}_{acquisition_ts}Z_{production_ts}Z_S1A_30_v1.0"
+    return {"_id": id_, "id": id_, "creation_timestamp": creation_timestamp, **kwargs}
+
+
+def test_burst_set_keys():
+    # ARRANGE
+    doc = rtc_doc("T064-135524-IW2", "20230101T015035", "2023-01-01T12:00:00Z")
+
+    # ACT
+    # ASSERT
+    assert list(burst_set.burst_set_keys({**doc, "mgrs_set_id_acquisition_ts_cycle_indexes": ["MS_64_10$151", "MS_64_11$151"]})) == [("MS_64_10", 151), ("MS_64_11", 151)]
+    assert list(burst_set.burst_set_keys({**doc, "mgrs_set_ids": ["MS_64_10"]})) == [("MS_64_10", "T064-135524-IW2", "20230101T015035")]
+    assert list(burst_set.burst_set_keys(doc)) == [(None, "T064-135524-IW2", "20230101T015035")]
+
+
+def test_group_burst_sets():
+    # ARRANGE
+    rtc_docs = [
+        rtc_doc("T064-135524-IW2", "20230101T015035", "2023-01-01T12:00:00Z", mgrs_set_id_acquisition_ts_cycle_indexes=["MS_64_10$151"]),
+        rtc_doc("T064-135524-IW2", "20230101T015035", "2023-01-02T12:00:00Z", production_ts="20230102T120000", mgrs_set_id_acquisition_ts_cycle_indexes=["MS_64_10$151"]),  # reprocessed
+        rtc_doc("T064-135525-IW1", "20230101T015038", "2023-01-01T12:00:00Z", mgrs_set_id_acquisition_ts_cycle_indexes=["MS_64_10$151", "MS_64_11$151"]),
+        rtc_doc("T064-135524-IW2", "20230113T015035", "2023-01-13T12:00:00Z", mgrs_set_id_acquisition_ts_cycle_indexes=["MS_64_10$152"]),
+    ]
+
+    # ACT
+    burst_sets = burst_set.group_burst_sets(iter(rtc_docs))
+
+    # ASSERT
+    assert {key: sorted(bursts) for key, bursts in burst_sets.items()} == {
+        ("MS_64_10", 151): ["T064-135524-IW2", "T064-135525-IW1"],
+        ("MS_64_11", 151): ["T064-135525-IW1"],
+        ("MS_64_10", 152): ["T064-135524-IW2"],
+    }
+    assert burst_sets["MS_64_10", 151]["T064-135524-IW2"] is rtc_docs[1]
+
+
+def test_group_burst_sets__when_some_docs_have_no_acquisition_cycles():
+    # ARRANGE
+    rtc_docs = [
+        rtc_doc("T064-135524-IW2", "20230101T015035", "2023-01-01T12:00:00Z", mgrs_set_id_acquisition_ts_cycle_indexes=["MS_64_10$151"]),
+        rtc_doc("T064-135524-IW2", "20230101T015035", "2023-01-02T12:00:00Z", production_ts="20230102T120000", mgrs_set_ids=["MS_64_10"]),  # reprocessed
+        rtc_doc("T064-135525-IW1", "20230101T015038", "2023-01-01T12:00:00Z", mgrs_set_id_acquisition_ts_cycle_indexes=["MS_64_10$151"]),
+        rtc_doc("T064-135526-IW1", "20230101T015041", "2023-01-01T12:00:00Z"),
+    ]
+
+    # ACT
+    burst_sets = burst_set.group_burst_sets(iter(rtc_docs))
+
+    # ASSERT
+    assert {key: sorted(bursts) for key, bursts in burst_sets.items()} == {
+        ("MS_64_10", 151): ["T064-135525-IW1"],
+        ("MS_64_10", "T064-135524-IW2", "20230101T015035"): ["T064-135524-IW2"],  # the acquisition cycle isn't guessed
+        (None, "T064-135526-IW1", "20230101T015041"): ["T064-135526-IW1"],
+    }
+    assert burst_sets["MS_64_10", "T064-135524-IW2", "20230101T015035"]["T064-135524-IW2"] is rtc_docs[1]  # the superseded doc is dropped
+
+
+def test_group_burst_sets__when_burst_ids_are_unknown():
+    # ARRANGE
+    rtc_docs = [
+        {"_id": "OPERA_L2_RTC-S1_STATIC_20230101T015035Z_S1A_v1.0", "creation_timestamp": "2023-01-01T12:00:00Z"},
+        {"_id": "OPERA_L2_RTC-S1_STATIC_20230101T015035Z_S1B_v1.0", "creation_timestamp": "2023-01-01T12:00:00Z"},
+        rtc_doc("T064-135524-IW2", "20230101T015035", "2023-01-01T12:00:00Z"),
+    ]
+
+    # ACT
+    burst_sets = burst_set.group_burst_sets(iter(rtc_docs))
+
+    # ASSERT
+    assert sorted(doc["_id"] for bursts in burst_sets.values() for doc in bursts.values()) == sorted(doc["_id"] for doc in rtc_docs)
+    assert burst_sets[None, rtc_docs[0]["_id"], None] == {rtc_docs[0]["_id"]: rtc_docs[0]}
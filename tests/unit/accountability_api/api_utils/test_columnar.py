@@ -0,0 +1,58 @@
+import pandas
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from accountability_api.api_utils import columnar
+
+
+def test_to_typed_df():
+    # ARRANGE
+    report_df = pandas.DataFrame([
+        {"opera_product_name": "dummy_a", "daac_alerted_datetime": "1970-01-01T01:00:00", "production_time": "25:00:01", "production_time_count": 3},
+        {"opera_product_name": "dummy_b", "daac_alerted_datetime": "N/A", "production_time": "N/A", "production_time_count": "N/A"}
+    ])
+
+    # ACT
+    typed_df = columnar.to_typed_df(
+        report_df,
+        datetime_columns=["daac_alerted_datetime", "missing_datetime_column"],
+        duration_columns=["production_time"],
+        count_columns=["production_time_count"]
+    )
+
+    # ASSERT
+    assert str(typed_df["daac_alerted_datetime"].dtype).startswith("datetime64")
+    assert typed_df["daac_alerted_datetime"][0] == pandas.Timestamp("1970-01-01T01:00:00")
+    assert pandas.isna(typed_df["daac_alerted_datetime"][1])
+
+    assert typed_df["production_time"].tolist() == [90001, pandas.NA]
+    assert typed_df["production_time_count"].tolist() == [3, pandas.NA]
+
+    # original data frame is left untouched
+    assert report_df["production_time"][0] == "25:00:01"
+
+
+def test_write_columnar__parquet():
+    # ARRANGE
+    report_df = pandas.DataFrame([{"opera_product_name": "dummy_a", "production_time": 1}])
+
+    # ACT
+    tmp_report = columnar.write_columnar(report_df, columnar.PARQUET_MIMETYPE, metadata=[{"Title": "OPERA Production Time Log"}])
+
+    # ASSERT
+    table = pq.read_table(tmp_report.name)
+    assert table.to_pylist() == [{"opera_product_name": "dummy_a", "production_time": 1}]
+    assert table.schema.metadata[b"Title"] == b"OPERA Production Time Log"
+
+
+def test_write_columnar__arrow():
+    # ARRANGE
+    report_df = pandas.DataFrame([{"opera_product_name": "dummy_a", "production_time": 1}])
+
+    # ACT
+    tmp_report = columnar.write_columnar(report_df, columnar.ARROW_MIMETYPE)
+
+    # ASSERT
+    with pa.memory_map(tmp_report.name) as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.to_pylist() == [{"opera_product_name": "dummy_a", "production_time": 1}]
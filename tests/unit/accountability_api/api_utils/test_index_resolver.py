@@ -0,0 +1,113 @@
+import threading
+from unittest.mock import MagicMock
+
+from accountability_api.api_utils.index_resolver import IndexResolver
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def search_result(index_ranges: dict):
+    return {
+        "hits": {"total": {"value": 0}, "hits": []},
+        "aggregations": {
+            "indexes": {
+                "buckets": [
+                    {"key": index, "min_time": {"value": min_ms}, "max_time": {"value": max_ms}}
+                    for index, (min_ms, max_ms) in index_ranges.items()
+                ]
+            }
+        }
+    }
+
+
+def test_resolve__prunes_indexes_outside_window():
+    # ARRANGE
+    es = MagicMock()
+    es.es.search.return_value = search_result({
+        "grq_1_l2_hls_l30-1970.01": (0, 1 * DAY_MS),
+        "grq_1_l2_hls_l30-1970.02": (31 * DAY_MS, 32 * DAY_MS),
+        "grq_1_l2_hls_l30-1970.03": (59 * DAY_MS, 60 * DAY_MS),
+        "grq_1_l2_hls_l30-no_time": (None, None)
+    })
+    resolver = IndexResolver(es=es, ttl_seconds=60, clock=lambda: 100 * 24 * 60 * 60)
+
+    # ACT
+    index = resolver.resolve("grq_*_l2_hls_l30-*", start="1970-02-01T12:00:00Z", end="1970-02-15T00:00:00Z")
+
+    # ASSERT
+    assert index == "grq_1_l2_hls_l30-1970.02,grq_1_l2_hls_l30-no_time"
+    assert resolver.resolve("grq_*_l2_hls_l30-*", start="1970-04-01T00:00:00", end="1970-04-02T00:00:00") == "grq_1_l2_hls_l30-no_time"
+
+    # cached
+    es.es.search.assert_called_once()
+
+
+def test_resolve__window_after_refresh_is_not_pruned():
+    # ARRANGE
+    es = MagicMock()
+    es.es.search.return_value = search_result({"grq_1_l2_hls_l30-1970.01": (0, 1 * DAY_MS)})
+    resolver = IndexResolver(es=es, ttl_seconds=60, clock=lambda: 10 * 24 * 60 * 60)
+
+    # ACT
+    # ASSERT
+    assert resolver.resolve("grq_*_l2_hls_l30-*", start="1970-01-05T00:00:00Z", end="1970-01-20T00:00:00Z") == "grq_*_l2_hls_l30-*"
+    assert resolver.resolve("grq_*_l2_hls_l30-*", start=None, end=None) == "grq_*_l2_hls_l30-*"
+
+
+def test_resolve__refreshes_expired_entries():
+    # ARRANGE
+    es = MagicMock()
+    es.es.search.return_value = search_result({"grq_1_l2_hls_l30-1970.01": (0, 1 * DAY_MS)})
+    now = [10 * 24 * 60 * 60]
+    resolver = IndexResolver(es=es, ttl_seconds=60, clock=lambda: now[0])
+
+    # ACT
+    resolver.resolve("grq_*_l2_hls_l30-*", start="1970-01-01T00:00:00Z", end="1970-01-02T00:00:00Z")
+    now[0] += 61
+    resolver.resolve("grq_*_l2_hls_l30-*", start="1970-01-01T00:00:00Z", end="1970-01-02T00:00:00Z")
+
+    # ASSERT
+    assert es.es.search.call_count == 2
+
+
+def test_resolve__falls_back_to_patterns_when_too_long():
+    # ARRANGE
+    es = MagicMock()
+    es.es.search.side_effect = lambda index, **kwargs: search_result(
+        {f"{index.replace('*', '1')}-1970.01.{day:02}": (day * DAY_MS, day * DAY_MS) for day in range(1, 31)}
+        if index.startswith("grq_*_l2_hls_l30") else {"grq_1_l3_dswx_hls-1970.01": (0, 31 * DAY_MS)}
+    )
+    resolver = IndexResolver(es=es, ttl_seconds=60, clock=lambda: 100 * 24 * 60 * 60, max_length=100)
+
+    # ACT
+    index = resolver.resolve("grq_*_l2_hls_l30,grq_*_l3_dswx_hls", start="1970-01-01T00:00:00Z", end="1970-02-01T00:00:00Z")
+
+    # ASSERT
+    assert index == "grq_*_l2_hls_l30,grq_1_l3_dswx_hls-1970.01"
+
+
+def test_resolve__refresh_does_not_block_other_patterns():
+    # ARRANGE
+    refreshing = threading.Event()
+    release = threading.Event()
+
+    def search(index, **kwargs):
+        if index == "slow_*":
+            refreshing.set()
+            release.wait(timeout=5)
+        return search_result({index.replace("*", "1"): (0, DAY_MS)})
+
+    es = MagicMock()
+    es.es.search.side_effect = search
+    resolver = IndexResolver(es=es, ttl_seconds=60, clock=lambda: 10 * 24 * 60 * 60)
+    slow = threading.Thread(target=resolver.resolve, args=("slow_*",), kwargs={"start": "1970-01-01T00:00:00Z", "end": "1970-01-02T00:00:00Z"})
+    slow.start()
+    refreshing.wait(timeout=5)
+
+    # ACT
+    index = resolver.resolve("fast_*", start="1970-01-01T00:00:00Z", end="1970-01-02T00:00:00Z")
+    release.set()
+    slow.join()
+
+    # ASSERT
+    assert index == "fast_1"
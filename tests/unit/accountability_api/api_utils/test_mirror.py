@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from accountability_api.api_utils import metadata, query
+from accountability_api.api_utils.mirror import Mirror
+from accountability_api.api_utils.reporting.production_time_report import ProductionTimeReport
+from accountability_api.testing.catalog_generator import CatalogGenerator
+from accountability_api.testing.fake_elasticsearch import FakeElasticsearch
+
+START = "2023-01-01T00:00:00"
+END = "2023-01-03T00:00:00"
+
+
+@pytest.fixture
+def es(grq_es):
+    return grq_es()
+
+
+def add_catalog(es: FakeElasticsearch, start: datetime, days: int, **kwargs):
+    for index, doc in CatalogGenerator(start=start, days=days, rates={"HLS_L30": 3, "HLS_S30": 2, "L1_S1_SLC": 2, "L2_RTC_S1": 3, "L2_CSLC_S1": 2}, **kwargs).generate():
+        es.add_documents(index, [doc])
+
+
+@pytest.mark.parametrize("delivery_ratio", [0.95, 0.5])
+def test_production_time_summary(test_client, es: FakeElasticsearch, tmp_path: Path, delivery_ratio: float):
+    # ARRANGE
+    add_catalog(es, datetime(2023, 1, 1), days=3, delivery_ratio=delivery_ratio)
+    mirror = Mirror(str(tmp_path / "mirror.sqlite3"))
+    mirror.sync()
+
+    product_docs = []
+    for index in [index for indexes in metadata.PRODUCT_TYPE_TO_INDEX.values() for index in indexes]:
+        product_docs += query.get_docs(indexes=[index], start=START, end=END)
+    expected_df = ProductionTimeReport.to_report_df(product_docs, "summary", {"generate_histograms": False})
+
+    # ACT
+    report_df = ProductionTimeReport.to_summary_report_df(mirror.production_time_summary(START, END))
+
+    # ASSERT
+    assert len(report_df) == len(metadata.PRODUCT_TYPE_TO_INDEX)
+    assert report_df.to_dict("records") == expected_df.to_dict("records")
+
+
+def test_sync__incremental(es: FakeElasticsearch, tmp_path: Path):
+    # ARRANGE
+    add_catalog(es, datetime(2023, 1, 1), days=1)
+    mirror = Mirror(str(tmp_path / "mirror.sqlite3"), lookback=timedelta(hours=1))
+    initial_count = mirror.sync()
+    add_catalog(es, datetime(2023, 1, 5), days=1)
+
+    # ACT
+    count = mirror.sync()
+
+    # ASSERT
+    total = mirror.query("SELECT (SELECT COUNT(*) FROM products) + (SELECT COUNT(*) FROM inputs) AS total")["total"][0]
+    assert initial_count < total
+    assert count < total  # only the docs created within the lookback of the first day are synced again
+    assert mirror.last_synced_at() is not None
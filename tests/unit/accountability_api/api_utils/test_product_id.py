@@ -0,0 +1,82 @@
+import pytest
+
+from accountability_api.api_utils import metadata, product_id
+
+
+@pytest.mark.parametrize("id_, expected", [
+    (
+        "HLS.L30.T22VEQ.2021248T143156.v2.0-r1",
+        {"id": "HLS.L30.T22VEQ.2021248T143156.v2.0", "product_type": "L2_HLS_L30", "sensor": "LANDSAT", "tile_id": "T22VEQ",
+         "acquisition_ts": "20210905T143156", "version": "2.0", "revision": 1}
+    ),
+    (
+        "HLS.S30.T22VEQ.2021248T143156.v2.0.Fmask.tif",
+        {"id": "HLS.S30.T22VEQ.2021248T143156.v2.0", "product_type": "L2_HLS_S30", "sensor": "SENTINEL", "tile_id": "T22VEQ",
+         "acquisition_ts": "20210905T143156", "version": "2.0", "revision": None}
+    ),
+    (
+        "S1A_IW_SLC__1SDV_20220501T015035_20220501T015102_043011_0522A4_42CC-SLC",
+        {"id": "S1A_IW_SLC__1SDV_20220501T015035_20220501T015102_043011_0522A4_42CC", "product_type": "L1_S1_SLC", "sensor": "SENTINEL", "platform": "S1A",
+         "acquisition_ts": "20220501T015035", "acquisition_end_ts": "20220501T015102"}
+    ),
+    (
+        "S1C_IW_SLC__1SDV_20250501T015035_20250501T015102_001011_0022A4_42CC.zip",
+        {"id": "S1C_IW_SLC__1SDV_20250501T015035_20250501T015102_001011_0022A4_42CC", "product_type": "L1_S1_SLC", "sensor": "SENTINEL", "platform": "S1C",
+         "acquisition_ts": "20250501T015035", "acquisition_end_ts": "20250501T015102"}
+    ),
+    (
+        "OPERA_L3_DSWx-HLS_T57NVH_20220117T000429Z_20220117T000429Z_S2A_30_v2.0",
+        {"product_type": "L3_DSWX_HLS", "sensor": "SENTINEL", "platform": "S2A", "tile_id": "T57NVH", "burst_id": None, "acquisition_ts": "20220117T000429", "version": "2.0"}
+    ),
+    (
+        "OPERA_L2_CSLC-S1_T064-135524-IW2_20220501T015035Z_20220501T015102Z_S1A_VV_v1.0",
+        {"product_type": "L2_CSLC_S1", "sensor": "SENTINEL", "platform": "S1A", "tile_id": None, "burst_id": "T064-135524-IW2", "acquisition_ts": "20220501T015035", "version": "1.0"}
+    ),
+    (
+        "OPERA_L2_RTC-S1_T064-135524-IW2_20250501T015035Z_20250501T100253Z_S1C_30_v1.0",
+        {"product_type": "L2_RTC_S1", "sensor": "SENTINEL", "platform": "S1C", "burst_id": "T064-135524-IW2", "acquisition_ts": "20250501T015035"}
+    ),
+    (
+        "OPERA_L2_RTC_S1A_IW_T064-135524-IW2_VV_20220501T015035Z_v0.1_20220501T015102Z",
+        {"product_type": "L2_RTC_S1", "sensor": "SENTINEL", "burst_id": "T064-135524-IW2", "acquisition_ts": "20220501T015035", "version": "0.1"}
+    ),
+])
+def test_parse(id_, expected):
+    # ACT
+    parsed = product_id.parse(id_)
+
+    # ASSERT
+    assert {name: getattr(parsed, name) for name in expected} == expected
+
+
+def test_parse__cached():
+    # ACT
+    parsed = product_id.parse("HLS.L30.T22VEQ.2021248T143156.v2.0")
+
+    # ASSERT
+    assert product_id.parse("HLS.L30.T22VEQ.2021248T143156.v2.0") is parsed
+    assert product_id.parse("HLS.L30.T22VEQ.2021249T143156.v2.0").tile_id is parsed.tile_id  # interned
+    with pytest.raises(AttributeError):
+        parsed.other = 1  # __slots__
+
+
+def test_parse__unknown():
+    with pytest.raises(Exception):
+        product_id.parse("unknown")
+
+
+def test_metadata_helpers():
+    assert metadata.granule_id_to_tile_id("HLS.L30.T22VEQ.2021248T143156.v2.0") == "T22VEQ"
+    assert metadata.granule_id_to_acquisition_ts("HLS.L30.T22VEQ.2021248T143156.v2.0") == "2021248T143156"
+    assert metadata.granule_id_to_input_product_type("HLS.S30.T22VEQ.2021248T143156.v2.0") == "L2_HLS_S30"
+    assert metadata.sds_product_id_to_sds_product_type("OPERA_L3_DSWx_HLS_T57NVH_20220117T000429Z_20220117T000429Z_L8_30_v2.0") == "L3_DSWX_HLS"
+    assert metadata.sds_product_id_to_sensor("OPERA_L3_DSWx_HLS_T57NVH_20220117T000429Z_20220117T000429Z_L8_30_v2.0") == "LANDSAT"
+    assert metadata.slc_granule_id_to_sensing_ts_range("S1A_IW_SLC__1SDV_20220501T015035_20220501T015102_043011_0522A4_42CC") == ("20220501T015035", "20220501T015102")
+    assert metadata.sds_product_id_to_acquisition_ts("S1C_IW_SLC__1SDV_20250501T015035_20250501T015102_001011_0022A4_42CC") == "20250501T015035"
+    # IDs of unknown formats fall back to searching for the component
+    assert metadata.sds_product_id_to_acquisition_ts("S1X_IW_SLC__1SDV_20250501T015035_20250501T015102_001011_0022A4_42CC") == "20250501T015035"
+    assert metadata.slc_granule_id_to_sensing_ts_range("S1X_IW_SLC__1SDV_20250501T015035_20250501T015102_001011_0022A4_42CC") == ("20250501T015035", "20250501T015102")
+    with pytest.raises(Exception):
+        metadata.granule_id_to_input_product_type("S1A_IW_SLC__1SDV_20220501T015035_20220501T015102_043011_0522A4_42CC")
+    with pytest.raises(Exception):
+        metadata.sds_product_id_to_tile_id("OPERA_L2_CSLC-S1_T064-135524-IW2_20220501T015035Z_20220501T015102Z_S1A_VV_v1.0")
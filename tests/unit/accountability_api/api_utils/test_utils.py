@@ -1,14 +1,19 @@
 from datetime import datetime, timedelta
 import unittest
 
+import pandas as pd
+
 from accountability_api.api_utils.utils import (
     magnitude,
     get_orbit_range_list,
     from_iso_to_dt,
     from_dt_to_iso,
     set_transfer_status,
+    get_transfer_statuses,
     to_iso_format_truncated,
     from_td_to_str,
+    split_revision,
+    parse_interval,
 )
 
 
@@ -141,6 +146,19 @@ class TestUtils(unittest.TestCase):
         es_doc_source = {"dataset_level": "L2", "dataset_type": "test_dataset_type_unknown"}  # note L2 dataset_level
         assert set_transfer_status(es_doc_source)["transfer_status"] == "not_applicable"
 
+    def test_get_transfer_statuses(self):
+        df = pd.DataFrame([
+            {"dataset_type": "L3_DSWx_HLS", "daac_delivery_status": "SUCCESS", "daac_CNM_S_status": "SUCCESS"},
+            {"dataset_type": "L3_DSWx_HLS", "daac_delivery_status": "NOT_SUCCESS", "daac_CNM_S_status": "SUCCESS"},
+            {"dataset_type": "L3_DSWx_HLS", "daac_delivery_status": None, "daac_CNM_S_status": "SUCCESS"},
+            {"dataset_type": "L3_DSWx_HLS", "daac_delivery_status": None, "daac_CNM_S_status": "NOT_SUCCESS"},
+            {"dataset_type": "L3_DSWx_HLS", "daac_delivery_status": None, "daac_CNM_S_status": None},
+            {"dataset_type": "test_dataset_type_unknown", "daac_delivery_status": "SUCCESS", "daac_CNM_S_status": None},
+        ])
+        assert get_transfer_statuses(df).tolist() == [
+            "cnm_r_success", "cnm_r_failure", "cnm_s_success", "cnm_s_failure", "unknown", "not_applicable"
+        ]
+
     def test_to_iso_format_truncated(self):
         # year, month, day, -12:00 (United States Minor Outlying Islands)
         assert to_iso_format_truncated("1970-01-01T12:34:56.789012-12:00") == "19700101T123456"
@@ -189,3 +207,17 @@ class TestUtils(unittest.TestCase):
 
         # test long day string
         assert from_td_to_str(timedelta(days=1000)) == "1000T00:00:00"
+
+    def test_split_revision(self):
+        assert split_revision("HLS.L30.T56MPU.2023001T000000.v2.0-r1") == ("HLS.L30.T56MPU.2023001T000000.v2.0", 1)
+        assert split_revision("S1A_IW_SLC__1SDV_20230101T000000-SLC-r12") == ("S1A_IW_SLC__1SDV_20230101T000000-SLC", 12)
+        assert split_revision("OPERA_L2_RTC-S1_T001") == ("OPERA_L2_RTC-S1_T001", None)
+
+    def test_parse_interval(self):
+        assert parse_interval("90s") == timedelta(seconds=90)
+        assert parse_interval("15m") == timedelta(minutes=15)
+        assert parse_interval("6h") == timedelta(hours=6)
+        assert parse_interval("7d") == timedelta(days=7)
+        for invalid_interval in ["0h", "1w", "h", "1.5h", ""]:
+            with self.assertRaises(ValueError):
+                parse_interval(invalid_interval)
@@ -0,0 +1,70 @@
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from accountability_api.api_utils.watermark_sync import JsonWatermarkStore, SyncSource, WatermarkSync
+from accountability_api.testing.fake_elasticsearch import FakeElasticsearch, FakeElasticsearchUtility
+
+SOURCE = SyncSource(name="hls", index="grq_*_l2_hls_l30-*")
+
+
+@pytest.fixture
+def es(mocker: MockerFixture):
+    es = FakeElasticsearch()
+    mocker.patch("accountability_api.api_utils.query.es_connection.get_grq_es", return_value=FakeElasticsearchUtility(es))
+    return es
+
+
+def test_sync(es: FakeElasticsearch, tmp_path: Path):
+    # ARRANGE
+    es.add_documents("grq_v2.0_l2_hls_l30-2023.01", [
+        {"_id": "HLS.L30.A-r2", "creation_timestamp": "2023-01-01T02:00:00.000000Z"},
+        {"_id": "HLS.L30.A-r1", "creation_timestamp": "2023-01-01T01:00:00.000000Z"},
+        {"_id": "HLS.L30.B-r1", "creation_timestamp": "2023-01-01T03:00:00.000000Z"},
+    ])
+    sync = WatermarkSync(JsonWatermarkStore(str(tmp_path / "watermarks.json")))
+    applied = []
+
+    # ACT
+    count = sync.sync(SOURCE, applied.extend)
+
+    # ASSERT
+    assert count == 3
+    assert [doc["_id"] for doc in applied] == ["HLS.L30.A-r1", "HLS.L30.A-r2", "HLS.L30.B-r1"]  # later revisions last
+    assert {doc["_base_id"] for doc in applied} == {"HLS.L30.A", "HLS.L30.B"}
+    assert sync.store.get_watermark("hls") == "2023-01-01T03:00:00.000000Z"
+
+
+def test_sync__incremental(es: FakeElasticsearch, tmp_path: Path):
+    # ARRANGE
+    es.add_documents("grq_v2.0_l2_hls_l30-2023.01", [{"_id": "HLS.L30.A-r1", "creation_timestamp": "2023-01-01T01:00:00.000000Z"}])
+    sync = WatermarkSync(JsonWatermarkStore(str(tmp_path / "watermarks.json")))
+    sync.sync(SOURCE, lambda docs: None)
+    es.add_documents("grq_v2.0_l2_hls_l30-2023.01", [{"_id": "HLS.L30.A-r2", "creation_timestamp": "2023-01-01T04:00:00.000000Z"}])
+    applied = []
+
+    # ACT
+    count = sync.sync(SOURCE, applied.extend)
+
+    # ASSERT
+    # the watermark is inclusive, so that documents with the same timestamp are not missed
+    assert [doc["_id"] for doc in applied] == ["HLS.L30.A-r1", "HLS.L30.A-r2"]
+    assert count == 2
+    assert sync.store.get_watermark("hls") == "2023-01-01T04:00:00.000000Z"
+
+
+def test_sync__when_apply_fails(es: FakeElasticsearch, tmp_path: Path):
+    # ARRANGE
+    es.add_documents("grq_v2.0_l2_hls_l30-2023.01", [{"_id": "HLS.L30.A-r1", "creation_timestamp": "2023-01-01T01:00:00.000000Z"}])
+    sync = WatermarkSync(JsonWatermarkStore(str(tmp_path / "watermarks.json")))
+
+    def apply(docs):
+        raise ValueError
+
+    # ACT
+    with pytest.raises(ValueError):
+        sync.sync(SOURCE, apply)
+
+    # ASSERT
+    assert sync.store.get_watermark("hls") is None
@@ -0,0 +1,118 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import Flask, Response
+
+from accountability_api import coalescing
+
+
+def create_app(coalescer: coalescing.Coalescer, calls: list):
+    app = Flask(__name__)
+
+    @app.route("/report")
+    @coalescing.coalesced
+    def report_view():
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return {"calls": len(calls)}
+
+    return app
+
+
+def test_coalesced(monkeypatch):
+    # ARRANGE
+    calls = []
+    monkeypatch.setattr(coalescing, "get_coalescer", lambda: coalescer)
+    coalescer = coalescing.Coalescer()
+    app = create_app(coalescer, calls)
+
+    def get(query_string):
+        return app.test_client().get(f"/report?{query_string}")
+
+    # ACT
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        responses = list(executor.map(get, ["a=1&b=2", "b=2&a=1", "a=1&b=2&c=", "a=1&b=3"]))
+
+    # ASSERT
+    assert len(calls) == 2  # the last request differs
+    assert [response.status_code for response in responses] == [200, 200, 200, 200]
+    assert responses[0].json == responses[1].json == responses[2].json
+
+
+def test_coalesced__across_processes(monkeypatch, tmp_path):
+    # ARRANGE
+    calls = []
+    # one coalescer per simulated worker process, sharing a result store
+    coalescers = [coalescing.Coalescer(coalescing.ResultStore(str(tmp_path))) for _ in range(3)]
+    apps = [create_app(coalescer, calls) for coalescer in coalescers]
+    current_coalescer = threading.local()
+    monkeypatch.setattr(coalescing, "get_coalescer", lambda: current_coalescer.value)
+
+    def get(i):
+        current_coalescer.value = coalescers[i]
+        return apps[i].test_client().get("/report?a=1")
+
+    # ACT
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        responses = list(executor.map(get, range(3)))
+
+    # ASSERT
+    assert len(calls) == 1
+    assert [response.json for response in responses] == [{"calls": 1}] * 3
+    assert len(list(tmp_path.glob("*.response"))) == 1
+
+
+def test_coalesced__errors_shared():
+    # ARRANGE
+    coalescer = coalescing.Coalescer()
+    started = threading.Event()
+
+    def compute():
+        started.set()
+        time.sleep(0.2)
+        raise ValueError("failed")
+
+    def follow():
+        started.wait()
+        return coalescer.do("key", lambda: Response(b"not computed"))
+
+    # ACT
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(coalescer.do, "key", compute)
+        follower = executor.submit(follow)
+
+    # ASSERT
+    assert isinstance(leader.exception(), ValueError)
+    assert isinstance(follower.exception(), ValueError)
+
+
+def test_coalesced__not_buffered_without_waiters():
+    # ARRANGE
+    coalescer = coalescing.Coalescer()
+    response = Response(iter([b"streamed"]), direct_passthrough=True)
+
+    # ACT
+    result, source = coalescer.do("key", lambda: response)
+
+    # ASSERT
+    assert result is response
+    assert source is None
+
+
+def test_result_store__sweep(tmp_path):
+    # ARRANGE
+    store = coalescing.ResultStore(str(tmp_path), ttl_seconds=0)
+    with store.lock("key"):
+        store.put("key", coalescing.StoredResponse(200, [], b"body"))
+        time.sleep(0.01)
+
+        # ACT
+        store.sweep()
+
+        # ASSERT
+        assert store.get("key") is None
+        assert len(list(tmp_path.glob("*.lock"))) == 1  # in flight
+
+    store.sweep()
+    assert list(tmp_path.iterdir()) == []
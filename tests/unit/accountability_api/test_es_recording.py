@@ -0,0 +1,99 @@
+import functools
+import gzip
+from pathlib import Path
+
+import pytest
+from elasticsearch import Elasticsearch, Transport
+from elasticsearch.exceptions import NotFoundError
+from pytest_mock import MockerFixture
+
+from accountability_api import es_recording
+from accountability_api.es_recording import RecordingTransport, ReplayMissError, ReplayTransport
+
+
+def record(mocker: MockerFixture, recording_path: Path, responses: list, redact_fields=()):
+    mocker.patch.object(Transport, "perform_request", side_effect=responses)
+    es = Elasticsearch("http://localhost:9200", transport_class=functools.partial(RecordingTransport, recording_path=str(recording_path), redact_fields=redact_fields))
+    return es
+
+
+def replay(recording_path: Path, redact_fields=()):
+    return Elasticsearch("http://localhost:9200", transport_class=functools.partial(ReplayTransport, recording_path=str(recording_path), redact_fields=redact_fields, latency_scale=0))
+
+
+def test_record_and_replay(mocker: MockerFixture, tmp_path: Path):
+    # ARRANGE
+    recording_path = tmp_path / "recording.jsonl.gz"
+    es = record(mocker, recording_path, [
+        {"_scroll_id": "1", "hits": {"total": {"value": 2}, "hits": [{"_id": "a", "_source": {"username": "jdoe"}}]}},
+        {"_scroll_id": "1", "hits": {"total": {"value": 2}, "hits": [{"_id": "b", "_source": {}}]}},
+        NotFoundError(404, "index_not_found_exception", {"error": "no such index"}),
+    ], redact_fields=["username"])
+    es.search(index="grq_*_l2_hls_l30", body={"query": {"match_all": {}}}, scroll="30s", request_timeout=30)
+    es.scroll(scroll_id="1", scroll="30s")
+    with pytest.raises(NotFoundError):
+        es.search(index="missing")
+    es.transport.close()
+
+    # ACT
+    es = replay(recording_path, redact_fields=["username"])
+    search_result = es.search(index="grq_*_l2_hls_l30", body={"query": {"match_all": {}}}, scroll="30s")
+    scroll_result = es.scroll(scroll_id="1", scroll="30s")
+
+    # ASSERT
+    assert search_result["hits"]["hits"] == [{"_id": "a", "_source": {"username": "REDACTED"}}]
+    assert scroll_result["hits"]["hits"] == [{"_id": "b", "_source": {}}]
+    with pytest.raises(NotFoundError):
+        es.search(index="missing")
+    assert es.search(index="missing", ignore=404) == {"error": "no such index"}
+    with pytest.raises(ReplayMissError):
+        es.search(index="grq_*_l2_hls_s30", body={"query": {"match_all": {}}})
+
+    with gzip.open(es_recording.get_process_recording_path(str(recording_path)), "rt") as fp:
+        assert "jdoe" not in fp.read()
+
+
+def test_get_recording_paths(tmp_path: Path):
+    # ARRANGE
+    for name in ["recording.jsonl.gz", "recording.123.jsonl.gz", "recording.456.jsonl.gz", "recording.other.jsonl.gz"]:
+        (tmp_path / name).touch()
+
+    # ACT
+    paths = es_recording.get_recording_paths(str(tmp_path / "recording.jsonl.gz"))
+
+    # ASSERT
+    assert es_recording.get_process_recording_path(str(tmp_path / "recording.jsonl.gz"), pid=123) == str(tmp_path / "recording.123.jsonl.gz")
+    assert paths == [str(tmp_path / name) for name in ["recording.jsonl.gz", "recording.123.jsonl.gz", "recording.456.jsonl.gz"]]
+
+
+def test_record__per_process(mocker: MockerFixture, tmp_path: Path):
+    # ARRANGE
+    recording_path = tmp_path / "recording.jsonl.gz"
+    es = record(mocker, recording_path, [{"hits": {"hits": [{"_id": "a"}]}}])
+    es.search(index="grq_*_l2_hls_l30")
+    es.transport.close()
+    mocker.patch("accountability_api.es_recording.os.getpid", return_value=1)  # another worker
+    es = record(mocker, recording_path, [{"hits": {"hits": [{"_id": "b"}]}}])
+    es.search(index="grq_*_l2_hls_s30")
+    es.transport.close()
+
+    # ACT
+    es = replay(recording_path)
+
+    # ASSERT
+    assert len(es_recording.get_recording_paths(str(recording_path))) == 2
+    assert es.search(index="grq_*_l2_hls_l30")["hits"]["hits"] == [{"_id": "a"}]
+    assert es.search(index="grq_*_l2_hls_s30")["hits"]["hits"] == [{"_id": "b"}]
+
+
+def test_get_transport_class(mocker: MockerFixture):
+    # ARRANGE
+    config = {"MODE": "replay", "PATH": "recording.jsonl.gz", "REDACT_FIELDS": "username, email", "LATENCY_SCALE": "0.5"}
+    mocker.patch("accountability_api.es_recording.ConfigurationObj.get_item", side_effect=lambda key, profile=None, default=None: config.get(key, default))
+
+    # ACT
+    transport_class = es_recording.get_transport_class()
+
+    # ASSERT
+    assert transport_class.func is ReplayTransport
+    assert transport_class.keywords == {"recording_path": "recording.jsonl.gz", "redact_fields": ["username", "email"], "latency_scale": 0.5}
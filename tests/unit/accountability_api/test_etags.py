@@ -0,0 +1,118 @@
+import pytest
+from flask import Flask
+from pytest_mock import MockerFixture
+
+from accountability_api import etags
+from accountability_api.testing.fake_elasticsearch import FakeElasticsearch
+
+
+@pytest.fixture
+def es(grq_es, mocker: MockerFixture):
+    es = grq_es()
+    es.add_documents("grq_v1.0_l3_dswx_hls-2023.01", [{"_id": "OPERA_L3_DSWx-HLS_1", "creation_timestamp": "2023-01-01T00:00:00.000000Z"}])
+    mocker.patch("accountability_api.etags.get_index_probe", return_value=etags.IndexProbe(ttl_seconds=0))
+    return es
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.calls = 0
+
+    @app.route("/data")
+    @etags.etagged
+    def data_view():
+        app.calls += 1
+        return {"calls": app.calls}
+
+    return app
+
+
+def test_etagged(es: FakeElasticsearch, app: Flask):
+    # ARRANGE
+    client = app.test_client()
+    etag = client.get("/data?start=2023-01-01").get_etag()[0]
+
+    # ACT
+    not_modified_response = client.get("/data?start=2023-01-01", headers={"If-None-Match": f'"{etag}"'})
+    other_request_response = client.get("/data?start=2023-01-02", headers={"If-None-Match": f'"{etag}"'})
+
+    # ASSERT
+    assert not_modified_response.status_code == 304
+    assert not_modified_response.get_etag()[0] == etag
+    assert other_request_response.status_code == 200
+    assert app.calls == 2
+    assert es.calls["msearch"] == 3  # a single request per probe
+    assert es.calls["indices.stats"] == 3
+
+
+def test_etagged__when_indexes_change(es: FakeElasticsearch, app: Flask):
+    # ARRANGE
+    client = app.test_client()
+    etag = client.get("/data").get_etag()[0]
+    es.add_documents("grq_v1.0_l3_dswx_hls-2023.01", [{"_id": "OPERA_L3_DSWx-HLS_2", "creation_timestamp": "2023-01-02T00:00:00.000000Z"}])
+
+    # ACT
+    response = client.get("/data", headers={"If-None-Match": f'"{etag}"'})
+
+    # ASSERT
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_etagged__when_docs_are_updated(es: FakeElasticsearch, app: Flask):
+    # ARRANGE
+    client = app.test_client()
+    etag = client.get("/data").get_etag()[0]
+    es.add_documents("grq_v1.0_l3_dswx_hls-2023.01", [{
+        "_id": "OPERA_L3_DSWx-HLS_1",
+        "creation_timestamp": "2023-01-01T00:00:00.000000Z",
+        "daac_CNM_S_timestamp": "2023-01-01T01:00:00.000000Z",
+        "daac_CNM_S_status": "SUCCESS"
+    }])
+    cnm_s_etag = client.get("/data").get_etag()[0]
+    es.add_documents("grq_v1.0_l3_dswx_hls-2023.01", [{
+        "_id": "OPERA_L3_DSWx-HLS_1",
+        "creation_timestamp": "2023-01-01T00:00:00.000000Z",
+        "daac_CNM_S_timestamp": "2023-01-01T01:00:00.000000Z",
+        "daac_CNM_S_status": "SUCCESS",
+        "daac_delivery_status": "SUCCESS"
+    }])
+
+    # ACT
+    response = client.get("/data", headers={"If-None-Match": f'"{cnm_s_etag}"'})
+
+    # ASSERT
+    assert cnm_s_etag != etag
+    assert response.status_code == 200
+    assert response.get_etag()[0] not in (etag, cnm_s_etag)
+
+
+def test_etagged__when_unprobed_fields_are_updated(es: FakeElasticsearch, app: Flask):
+    # ARRANGE
+    client = app.test_client()
+    etag = client.get("/data").get_etag()[0]
+    es.add_documents("grq_v1.0_l3_dswx_hls-2023.01", [{
+        "_id": "OPERA_L3_DSWx-HLS_1",
+        "creation_timestamp": "2023-01-01T00:00:00.000000Z",
+        "latest_download_job_ts": "2023-01-01T01:00:00.000000Z"
+    }])
+
+    # ACT
+    response = client.get("/data", headers={"If-None-Match": f'"{etag}"'})
+
+    # ASSERT
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
+
+
+def test_etagged__when_probe_fails(es: FakeElasticsearch, app: Flask, mocker: MockerFixture):
+    # ARRANGE
+    mocker.patch("accountability_api.api_utils.query.probe_indexes", side_effect=Exception)
+
+    # ACT
+    response = app.test_client().get("/data")
+
+    # ASSERT
+    assert response.status_code == 200
+    assert response.get_etag() == (None, None)
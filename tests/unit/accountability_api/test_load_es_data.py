@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+
+from accountability_api import load_es_data
+from accountability_api.testing.fake_elasticsearch import FakeElasticsearch
+
+
+def write_doc(backup_dir: Path, index: str, doc_id: str, doc: dict):
+    docs_dir = backup_dir / index / "docs"
+    docs_dir.mkdir(parents=True, exist_ok=True)
+    (docs_dir / f"{doc_id}.json").write_text(json.dumps(doc))
+
+
+def test_restore(tmp_path: Path):
+    # ARRANGE
+    for i in range(25):
+        write_doc(tmp_path, "grq_v2.0_l2_hls_l30-2023.01", f"HLS.L30.T22VEQ.2023001T1431{i:02d}.v2.0", {"creation_timestamp": "2023-01-01T00:00:00Z"})
+    write_doc(tmp_path, "rtc_catalog-2023.01", "OPERA_L2_RTC-S1_T064-135524-IW2", {"creation_timestamp": "2023-01-01T00:00:00Z"})
+    (tmp_path / "rtc_catalog-2023.01" / "mapping.json").write_text(json.dumps({"settings": {"number_of_shards": 1}}))
+    es = FakeElasticsearch()
+    es.add_documents("rtc_catalog-2023.01", [{"_id": "stale"}])
+
+    # ACT
+    results = load_es_data.restore(tmp_path, es=es, thread_count=2, chunk_size=10)
+
+    # ASSERT
+    assert [(result.index, result.docs, result.failures) for result in results] == [
+        ("grq_v2.0_l2_hls_l30-2023.01", 25, []),
+        ("rtc_catalog-2023.01", 1, []),
+    ]
+    assert es.count(index="grq_v2.0_l2_hls_l30-2023.01")["count"] == 25
+    assert es.mget(body={"ids": ["HLS.L30.T22VEQ.2023001T143100.v2.0"]}, index="grq_v2.0_l2_hls_l30-2023.01")["docs"][0]["found"]
+    assert es.search(index="rtc_catalog-2023.01")["hits"]["hits"][0]["_id"] == "OPERA_L2_RTC-S1_T064-135524-IW2"
+    assert es.indices.get_settings(index="rtc_catalog-2023.01")["rtc_catalog-2023.01"]["settings"]["index"]["refresh_interval"] is None
+    assert es.calls["bulk"] == 4
+
+
+def test_restore__when_duplicate_ids(tmp_path: Path):
+    # ARRANGE
+    write_doc(tmp_path, "hls_catalog-2023.01", "HLS.L30.T22VEQ.2023001T143156.v2.0.B01.tif", {})
+    es = FakeElasticsearch()
+    original_create = es.indices.create
+
+    def create_and_seed(index, **kwargs):
+        result = original_create(index, **kwargs)
+        es.add_documents(index, [{"_id": "HLS.L30.T22VEQ.2023001T143156.v2.0.B01.tif"}])
+        return result
+    es.indices.create = create_and_seed
+
+    # ACT
+    results = load_es_data.restore(tmp_path, es=es)
+
+    # ASSERT
+    assert results[0].docs == 0
+    assert results[0].failures[0]["create"]["status"] == 409
@@ -0,0 +1,65 @@
+from flask.testing import FlaskClient
+from prometheus_client import REGISTRY
+
+from accountability_api import metrics
+
+
+def test_index_label():
+    # ACT
+    # ASSERT
+    assert metrics.index_label("grq_*_l2_hls_l30-*") == "grq_*_l2_hls_l30-*"
+    assert metrics.index_label("grq_v2.0_l2_hls_l30-2023.01,grq_v2.0_l2_hls_l30-2023.02") == "grq_v2.*_l2_hls_l30-*.*"
+    assert metrics.index_label(None) == "*"
+
+
+def test_observe_es():
+    # ARRANGE
+    labels = {"operation": "search", "index": "test_metrics_index"}
+    hits_before = REGISTRY.get_sample_value("bach_api_es_hits_total", labels) or 0
+    count_before = REGISTRY.get_sample_value("bach_api_es_request_duration_seconds_count", labels) or 0
+
+    # ACT
+    with metrics.observe_es("search", "test_metrics_index") as record_hits:
+        record_hits({"hits": {"hits": [{}, {}, {}]}})
+
+    # ASSERT
+    assert REGISTRY.get_sample_value("bach_api_es_hits_total", labels) == hits_before + 3
+    assert REGISTRY.get_sample_value("bach_api_es_request_duration_seconds_count", labels) == count_before + 1
+
+
+def test_metrics_endpoint(test_client: FlaskClient):
+    # ACT
+    test_client.get("/metrics")
+    response = test_client.get("/metrics")
+
+    # ASSERT
+    assert response.status_code == 200
+    assert 'bach_api_request_duration_seconds_count{endpoint="/metrics",method="GET",status="200"}' in response.text
+
+
+def test_observe_es__when_index_list():
+    # ARRANGE
+    labels = {"operation": "search", "index": "grq_*_l2_hls_l30,grq_*_l2_hls_l30-*"}
+    count_before = REGISTRY.get_sample_value("bach_api_es_request_duration_seconds_count", labels) or 0
+
+    # ACT
+    with metrics.observe_es("search", ["grq_*_l2_hls_l30", "grq_*_l2_hls_l30-*"]):
+        pass
+
+    # ASSERT
+    assert REGISTRY.get_sample_value("bach_api_es_request_duration_seconds_count", labels) == count_before + 1
+
+
+def test_on_starting(tmp_path, monkeypatch):
+    # ARRANGE
+    multiproc_dir = tmp_path / "metrics"
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(multiproc_dir))
+    metrics.on_starting(server=None)
+    (multiproc_dir / "counter_1234.db").write_bytes(b"")  # left by a previous run
+
+    # ACT
+    metrics.on_starting(server=None)
+
+    # ASSERT
+    assert multiproc_dir.is_dir()
+    assert list(multiproc_dir.iterdir()) == []
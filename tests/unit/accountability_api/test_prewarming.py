@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask_restx import reqparse
+
+from accountability_api import coalescing, prewarming
+
+
+@pytest.fixture
+def config(tmp_path):
+    return prewarming.PrewarmingConfig(
+        reports=[prewarming.PrewarmedReport(name="SummaryReport", window=timedelta(days=1), mime="application/json")],
+        interval=timedelta(minutes=5),
+        store=coalescing.ResultStore(str(tmp_path))
+    )
+
+
+@pytest.fixture
+def app(monkeypatch, config):
+    monkeypatch.setattr(prewarming, "get_config", lambda: config)
+
+    parser = reqparse.RequestParser()
+    parser.add_argument("venue", type=str, default="local", location="args")
+
+    app = Flask(__name__)
+    app.calls = []
+
+    @app.route("/reports/<name>")
+    @prewarming.prewarmed(parser)
+    def report_view(name):
+        app.calls.append(name)
+        return {"calls": len(app.calls)}
+
+    return app
+
+
+def query_string(window: timedelta, end: datetime, **kwargs):
+    return {
+        "startDateTime": (end - window).strftime(prewarming.DATETIME_FORMAT),
+        "endDateTime": end.strftime(prewarming.DATETIME_FORMAT),
+        **kwargs
+    }
+
+
+def test_prewarmed(app, config):
+    # ARRANGE
+    prewarming.Prewarmer(app, config).warm()
+    client = app.test_client()
+    now = datetime.utcnow()
+
+    # ACT
+    cached_response = client.get("/reports/SummaryReport", query_string=query_string(timedelta(days=1), now - timedelta(minutes=1), mime="application/json", venue="local"))
+
+    # ASSERT
+    assert app.calls == ["SummaryReport"]  # pre-warmed
+    assert cached_response.json == {"calls": 1}
+    assert "X-Prewarmed-At" in cached_response.headers
+
+
+def test_prewarmed__not_matching(app, config):
+    # ARRANGE
+    prewarming.Prewarmer(app, config).warm()
+    client = app.test_client()
+    now = datetime.utcnow()
+
+    # ACT
+    client.get("/reports/SummaryReport", query_string=query_string(timedelta(days=7), now, mime="application/json"))
+    client.get("/reports/SummaryReport", query_string=query_string(timedelta(days=1), now - timedelta(hours=1), mime="application/json"))
+    client.get("/reports/SummaryReport", query_string=query_string(timedelta(days=1), now, mime="text/csv"))
+    client.get("/reports/OtherReport", query_string=query_string(timedelta(days=1), now, mime="application/json"))
+
+    # ASSERT
+    assert app.calls == ["SummaryReport", "SummaryReport", "SummaryReport", "SummaryReport", "OtherReport"]
+
+
+def test_prewarm__skips_fresh_reports(app, config):
+    # ACT
+    prewarming.Prewarmer(app, config).warm()
+    prewarming.Prewarmer(app, config).warm()  # e.g. by another worker
+
+    # ASSERT
+    assert app.calls == ["SummaryReport"]
+
+
+def test_parse_window():
+    assert prewarming.parse_window("24h") == timedelta(days=1)
+    assert prewarming.parse_window("7d") == timedelta(days=7)
+    with pytest.raises(Exception):
+        prewarming.parse_window("7w")
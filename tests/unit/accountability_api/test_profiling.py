@@ -0,0 +1,66 @@
+import pstats
+from pathlib import Path
+
+import pytest
+from flask import Flask
+
+from accountability_api import profiling
+
+
+@pytest.fixture
+def profiled_client(monkeypatch, tmp_path):
+    def get_item(self, key, profile="default", default=None):
+        return {"ENABLED": "True", "OUTPUT_DIR": str(tmp_path)}.get(key, default)
+    monkeypatch.setattr("accountability_api.configuration_obj.ConfigurationObj.get_item", get_item)
+
+    app = Flask(__name__)
+
+    @app.route("/profiled")
+    @profiling.profiled
+    def profiled_view():
+        return {"result": sum(range(1000))}
+
+    return app.test_client()
+
+
+def test_profiled__cpu(profiled_client):
+    # ACT
+    response = profiled_client.get("/profiled?profile=cpu")
+
+    # ASSERT
+    assert response.status_code == 200
+    assert response.json == {"result": 499500}
+
+    artifact_path = Path(response.headers["X-Profile-Artifact"])
+    assert artifact_path.suffix == ".prof"
+    assert pstats.Stats(str(artifact_path)).total_calls > 0
+
+
+def test_profiled__mem(profiled_client):
+    # ACT
+    response = profiled_client.get("/profiled?profile=mem")
+
+    # ASSERT
+    assert response.status_code == 200
+    assert Path(response.headers["X-Profile-Artifact"]).read_text().startswith("Peak traced memory")
+
+
+def test_profiled__not_requested(profiled_client):
+    # ACT
+    response = profiled_client.get("/profiled")
+
+    # ASSERT
+    assert response.status_code == 200
+    assert "X-Profile-Artifact" not in response.headers
+
+
+def test_profiled__disabled(profiled_client, monkeypatch):
+    # ARRANGE
+    monkeypatch.setattr("accountability_api.configuration_obj.ConfigurationObj.get_item", lambda self, key, profile="default", default=None: default)
+
+    # ACT
+    response = profiled_client.get("/profiled?profile=cpu")
+
+    # ASSERT
+    assert response.status_code == 200
+    assert "X-Profile-Artifact" not in response.headers
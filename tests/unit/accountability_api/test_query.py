@@ -1,5 +1,7 @@
+from datetime import datetime
 from unittest.mock import MagicMock
 
+import pyarrow as pa
 import pytest
 from pytest_mock import MockerFixture
 
@@ -212,3 +214,101 @@ def test_get_num_docs(mocker: MockerFixture, elasticsearch_utility_stub):
 
     # ASSERT
     assert index_alias_to_count["test_index_label"] == 3
+
+
+def test_iter_hit_pages(elasticsearch_utility_stub):
+    # ARRANGE
+    elasticsearch_utility_stub.es.search.return_value = {
+        "_scroll_id": "dummy_scroll_id",
+        "hits": {"total": {"value": 3}, "hits": [{"_id": "dummy_id_1"}, {"_id": "dummy_id_2"}]}
+    }
+    elasticsearch_utility_stub.es.scroll.side_effect = [
+        {"_scroll_id": "dummy_scroll_id", "hits": {"hits": [{"_id": "dummy_id_3"}]}},
+        {"_scroll_id": "dummy_scroll_id", "hits": {"hits": []}}
+    ]
+
+    # ACT
+    pages = list(query.iter_hit_pages(es=elasticsearch_utility_stub, index="test_index", body={}, page_size=2))
+
+    # ASSERT
+    assert pages == [[{"_id": "dummy_id_1"}, {"_id": "dummy_id_2"}], [{"_id": "dummy_id_3"}]]
+    elasticsearch_utility_stub.es.clear_scroll.assert_called_with(scroll_id="dummy_scroll_id", ignore=(404,))
+
+
+def test_hits_to_record_batches():
+    # ARRANGE
+    schema = pa.schema([
+        ("_id", pa.string()),
+        ("dataset_type", pa.string()),
+        ("metadata.FileSize", pa.int64()),
+        ("metadata.ProductReceivedTime", pa.timestamp("us"))
+    ])
+    hit_pages = [
+        [
+            {"_id": "dummy_id_1", "_index": "dummy_index", "_source": {"dataset_type": "L2_HLS_L30", "metadata": {"FileSize": 1, "ProductReceivedTime": "1970-01-01T00:00:00.000001Z", "FileName": "dummy_file_name"}}},
+            {"_id": "dummy_id_2", "_index": "dummy_index", "_source": {"dataset_type": "L2_HLS_L30"}}
+        ],
+        [
+            {"_id": "dummy_id_3", "_index": "dummy_index", "_source": {"metadata": {"ProductReceivedTime": "1970-01-01T00:00:00"}}}
+        ]
+    ]
+
+    # ACT
+    batches = list(query.hits_to_record_batches(hit_pages, schema))
+
+    # ASSERT
+    assert len(batches) == 2
+    assert pa.Table.from_batches(batches).to_pylist() == [
+        {"_id": "dummy_id_1", "dataset_type": "L2_HLS_L30", "metadata.FileSize": 1, "metadata.ProductReceivedTime": datetime(1970, 1, 1, 0, 0, 0, 1)},
+        {"_id": "dummy_id_2", "dataset_type": "L2_HLS_L30", "metadata.FileSize": None, "metadata.ProductReceivedTime": None},
+        {"_id": "dummy_id_3", "dataset_type": None, "metadata.FileSize": None, "metadata.ProductReceivedTime": datetime(1970, 1, 1)}
+    ]
+
+    # hits are left untouched
+    assert "_id" not in hit_pages[0][0]["_source"]
+
+
+def test_get_docs_table__size(grq_es):
+    # ARRANGE
+    es = grq_es()
+    es.add_documents("grq_1_l2_hls_l30-2023.01", [
+        {"_id": f"dummy_id_{i}", "creation_timestamp": f"2023-01-0{i}T00:00:00Z"} for i in range(1, 6)
+    ])
+    schema = pa.schema([("_id", pa.string())])
+
+    # ACT
+    table = query.get_docs_table("grq_*_l2_hls_l30-*", schema, size=2)
+
+    # ASSERT
+    assert table.num_rows == 2
+    assert query.get_docs_table("grq_*_l2_hls_l30-*", schema).num_rows == 5
+    assert es.calls["clear_scroll"] == 2
+
+
+def test_get_docs__without_index_resolver(grq_es):
+    # ARRANGE
+    es = grq_es()
+    es.add_documents("grq_1_l2_hls_l30-2023.01", [{"_id": "dummy_id", "creation_timestamp": "2023-01-01T00:00:00Z"}])
+
+    # ACT
+    docs = query.get_docs("grq_*_l2_hls_l30-*", start="2023-01-01T00:00:00Z", end="2023-01-02T00:00:00Z")
+
+    # ASSERT
+    assert len(docs) == 1
+    assert es.calls["search"] == 1  # no index ranges fetched by default
+
+
+def test_plan_index_expression():
+    # ARRANGE
+    index_dict = {
+        "L2_HLS_L30": "grq_*_l2_hls_l30",
+        "L2_RTC_S1": ["grq_*_l2_rtc_s1", "grq_*_l2_rtc_s1-*"],
+        "L3_DSWx_S1": "grq_*_l2_rtc_s1",
+        "EMPTY": ""
+    }
+
+    # ACT
+    index = query.plan_index_expression(index_dict)
+
+    # ASSERT
+    assert index == "grq_*_l2_hls_l30,grq_*_l2_rtc_s1,grq_*_l2_rtc_s1-*"
@@ -0,0 +1,56 @@
+import pytest
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from accountability_api import tracing
+
+
+@pytest.fixture
+def span_exporter(monkeypatch):
+    exporter = InMemorySpanExporter()
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(exporter))
+    monkeypatch.setattr("accountability_api.tracing.trace.get_tracer", tracer_provider.get_tracer)
+    return exporter
+
+
+def test_span(span_exporter):
+    # ACT
+    with tracing.span("parent", index="test_index") as parent_span:
+        parent_span.set_attribute("hits", 3)
+        with tracing.span("child"):
+            tracing.set_attributes(bytes=10)
+
+    # ASSERT
+    child, parent = span_exporter.get_finished_spans()
+    assert parent.name == "parent"
+    assert dict(parent.attributes) == {"index": "test_index", "hits": 3}
+    assert child.parent.span_id == parent.context.span_id
+    assert dict(child.attributes) == {"bytes": 10}
+
+
+def test_traced(span_exporter):
+    # ARRANGE
+    @tracing.traced("test_function")
+    def test_function(x):
+        return x + 1
+
+    # ACT
+    result = test_function(1)
+
+    # ASSERT
+    assert result == 2
+    assert [span.name for span in span_exporter.get_finished_spans()] == ["test_function"]
+
+
+def test_span__opentelemetry_not_installed(monkeypatch):
+    # ARRANGE
+    monkeypatch.setattr("accountability_api.tracing.trace", None)
+
+    # ACT
+    # ASSERT
+    with tracing.span("test_span") as span:
+        span.set_attribute("hits", 3)
+        tracing.set_attributes(bytes=10)
+    assert span is tracing.NOOP_SPAN
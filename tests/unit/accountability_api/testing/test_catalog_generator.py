@@ -0,0 +1,69 @@
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import pandas
+
+from accountability_api.api_utils import metadata, query
+from accountability_api.api_utils.reporting.retrieval_time_report import RetrievalTimeReport
+from accountability_api.testing.catalog_generator import CatalogGenerator, write_json_files
+
+RATES = {"HLS_L30": 2, "HLS_S30": 1, "L1_S1_SLC": 1, "L2_RTC_S1": 3, "L2_CSLC_S1": 1}
+
+
+def test_generate():
+    # ACT
+    docs = list(CatalogGenerator(start=datetime(2023, 1, 31), days=2, rates=RATES).generate())
+
+    # ASSERT
+    input_docs = [doc for index, doc in docs if index.startswith(("grq_v2.0_l2_hls", "grq_v1.0_l1_s1_slc", "rtc_catalog", "cslc_catalog"))]
+    assert len(input_docs) == 2 * sum(RATES.values())
+    assert {index for index, _ in docs} >= {"hls_catalog-2023.01", "hls_catalog-2023.02", "slc_spatial_catalog-2023.02"}
+
+    sds_product_types = Counter(
+        metadata.sds_product_id_to_sds_product_type(doc["_id"])
+        for index, doc in docs if index.startswith(("grq_v1.0_l2", "grq_v1.0_l3"))
+    )
+    assert sds_product_types == {"L3_DSWX_HLS": 6, "L2_CSLC_S1": 2, "L2_RTC_S1": 2, "L3_DSWX_S1": 6, "L3_DISP_S1": 2}
+
+    hls_granule_ids = [doc["metadata"]["FileName"] for index, doc in docs if index.startswith("grq_v2.0_l2_hls")]
+    assert all(metadata.granule_id_to_tile_id(granule_id) for granule_id in hls_granule_ids)
+
+
+def test_generate__when_same_seed():
+    # ACT
+    docs_1 = list(CatalogGenerator(start=datetime(2023, 1, 1), days=1, rates=RATES, seed=1).generate())
+    docs_2 = list(CatalogGenerator(start=datetime(2023, 1, 1), days=1, rates=RATES, seed=1).generate())
+
+    # ASSERT
+    assert docs_1 == docs_2
+
+
+def test_write_json_files(tmp_path: Path):
+    # ACT
+    count = write_json_files(CatalogGenerator(start=datetime(2023, 1, 1), days=1, rates={"L2_RTC_S1": 1}).generate(), tmp_path)
+
+    # ASSERT
+    assert count == len(list(tmp_path.glob("*/docs/*.json")))
+    assert len(list(tmp_path.glob("rtc_catalog-2023.01/docs/OPERA_L2_RTC-S1_*.json"))) == 1
+
+
+def test_retrieval_time_report(test_client, grq_es):
+    # ARRANGE
+    es = grq_es()
+    for index, doc in CatalogGenerator(start=datetime(2023, 1, 1), days=1, rates={"HLS_L30": 0, "HLS_S30": 0, "L1_S1_SLC": 2, "L2_RTC_S1": 2, "L2_CSLC_S1": 2}).generate():
+        es.add_documents(index, [doc])
+    input_docs = query.get_docs("grq_*_l1_s1_slc-*,rtc_catalog-*,cslc_catalog-*", start="2023-01-01T00:00:00", end="2023-01-02T00:00:00")
+
+    # ACT
+    report_df = RetrievalTimeReport.to_report_df(
+        input_docs, "detailed", start="2023-01-01T00:00:00", end="2023-01-02T00:00:00", report_options={"generate_histograms": False}
+    )
+
+    # ASSERT
+    assert len(report_df) == 6
+    public_available_dts = pandas.to_datetime(report_df["public_available_datetime"])
+    opera_detect_dts = pandas.to_datetime(report_df["opera_detect_datetime"])
+    product_received_dts = pandas.to_datetime(report_df["product_received_datetime"])
+    assert (public_available_dts <= opera_detect_dts).all()
+    assert (opera_detect_dts <= product_received_dts).all()
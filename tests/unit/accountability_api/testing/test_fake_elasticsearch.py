@@ -0,0 +1,231 @@
+import time
+
+import pytest
+from elasticsearch.exceptions import NotFoundError, RequestError
+
+from accountability_api.api_utils import query
+from accountability_api.testing.fake_elasticsearch import FakeElasticsearch
+
+
+def seed(es: FakeElasticsearch) -> FakeElasticsearch:
+    es.add_documents("grq_1_l2_hls_l30-2023.01", [
+        {"_id": "HLS.L30.T22VEQ.2023001T143156.v2.0", "creation_timestamp": "2023-01-01T00:00:00Z", "metadata": {"tile_id": "T22VEQ", "FileSize": 1}},
+        {"_id": "HLS.L30.T22VER.2023002T143156.v2.0", "creation_timestamp": "2023-01-02T00:00:00Z", "metadata": {"tile_id": "T22VER", "FileSize": 2}},
+    ])
+    es.add_documents("grq_1_l2_hls_s30-2023.01", [
+        {"_id": "HLS.S30.T22VEQ.2023003T143156.v2.0", "creation_timestamp": "2023-01-03T00:00:00Z", "metadata": {"tile_id": "T22VEQ", "FileSize": 3}},
+    ])
+    return es
+
+
+@pytest.fixture
+def fake_es():
+    return seed(FakeElasticsearch())
+
+
+def test_search(fake_es):
+    # ACT
+    result = fake_es.search(index="grq_*_l2_hls_*", body={
+        "query": {
+            "bool": {
+                "must": [{"match": {"metadata.tile_id.keyword": "T22VEQ"}}],
+                "filter": [{"range": {"creation_timestamp": {"gte": "2023-01-01T00:00:00", "lte": "2023-01-31T00:00:00"}}}]
+            }
+        },
+        "sort": [{"creation_timestamp": {"order": "desc"}}]
+    }, size=10)
+
+    # ASSERT
+    assert result["hits"]["total"]["value"] == 2
+    assert [hit["_id"] for hit in result["hits"]["hits"]] == ["HLS.S30.T22VEQ.2023003T143156.v2.0", "HLS.L30.T22VEQ.2023001T143156.v2.0"]
+
+
+def test_search__missing_index(fake_es):
+    # ACT
+    # ASSERT
+    with pytest.raises(NotFoundError):
+        fake_es.search(index="missing_index")
+    assert fake_es.search(index="missing_index", ignore_unavailable=True, allow_no_indices=True)["hits"]["hits"] == []
+
+
+def test_scroll(fake_es):
+    # ACT
+    result = fake_es.search(index="grq_*", body={"sort": ["creation_timestamp:asc"]}, size=2, scroll="30s")
+    scrolled_result = fake_es.scroll(scroll_id=result["_scroll_id"], scroll="30s")
+
+    # ASSERT
+    assert len(result["hits"]["hits"]) == 2
+    assert [hit["_id"] for hit in scrolled_result["hits"]["hits"]] == ["HLS.S30.T22VEQ.2023003T143156.v2.0"]
+    assert fake_es.calls == {"search": 1, "scroll": 1}
+
+
+def test_count_msearch_mget(fake_es):
+    # ACT
+    count = fake_es.count(index="grq_*", body={"query": {"term": {"metadata.tile_id": "T22VEQ"}}})
+    msearch_result = fake_es.msearch(body=[
+        {"index": "grq_*_l2_hls_l30-*"}, {"size": 0},
+        {"index": "missing_index"}, {"size": 0}
+    ])
+    mget_result = fake_es.mget(index="grq_1_l2_hls_l30-2023.01", body={"ids": ["HLS.L30.T22VEQ.2023001T143156.v2.0", "missing_id"]})
+
+    # ASSERT
+    assert count == {"count": 2}
+    assert msearch_result["responses"][0]["hits"]["total"]["value"] == 2
+    assert msearch_result["responses"][1]["status"] == 404
+    assert [doc["found"] for doc in mget_result["docs"]] == [True, False]
+
+
+def test_indices_stats(fake_es):
+    # ARRANGE
+    fake_es.index(index="grq_1_l2_hls_l30-2023.01", id="HLS.L30.T22VEQ.2023001T143156.v2.0", body={"creation_timestamp": "2023-01-01T00:00:00Z"})
+    fake_es.bulk(body=[{"delete": {"_index": "grq_1_l2_hls_s30-2023.01", "_id": "HLS.S30.T22VEQ.2023003T143156.v2.0"}}])
+
+    # ACT
+    result = fake_es.indices.stats(index="grq_*,missing_index", metric="indexing", ignore_unavailable=True)
+
+    # ASSERT
+    assert result["indices"]["grq_1_l2_hls_l30-2023.01"]["primaries"]["indexing"] == {"index_total": 3, "delete_total": 0}
+    assert result["indices"]["grq_1_l2_hls_s30-2023.01"]["primaries"]["indexing"] == {"index_total": 1, "delete_total": 1}
+
+
+def test_aggregations(fake_es):
+    # ACT
+    result = fake_es.search(index="grq_*", body={
+        "size": 0,
+        "aggs": {
+            "indexes": {
+                "terms": {"field": "_index"},
+                "aggs": {"min_time": {"min": {"field": "creation_timestamp"}}}
+            },
+            "total_size": {"sum": {"field": "metadata.FileSize"}},
+            "size_percentiles": {"percentiles": {"field": "metadata.FileSize", "percents": [50, 90]}}
+        }
+    })
+
+    # ASSERT
+    aggregations = result["aggregations"]
+    assert [(bucket["key"], bucket["doc_count"]) for bucket in aggregations["indexes"]["buckets"]] == [
+        ("grq_1_l2_hls_l30-2023.01", 2),
+        ("grq_1_l2_hls_s30-2023.01", 1)
+    ]
+    assert aggregations["indexes"]["buckets"][0]["min_time"]["value"] == 1672531200000
+    assert aggregations["total_size"]["value"] == 6
+    assert aggregations["size_percentiles"]["values"] == {"50.0": 2, "90.0": pytest.approx(2.8)}
+    assert result["hits"]["hits"] == []
+
+
+def test_aggregations__date_histogram(fake_es):
+    # ACT
+    result = fake_es.search(index="grq_*", body={
+        "size": 0,
+        "aggs": {
+            "histogram": {
+                "date_histogram": {
+                    "field": "creation_timestamp",
+                    "fixed_interval": "1d",
+                    "min_doc_count": 0,
+                    "extended_bounds": {"min": "2022-12-31T00:00:00", "max": "2023-01-04T00:00:00"}
+                },
+                "aggs": {
+                    "file_size": {"sum": {"field": "metadata.FileSize"}},
+                    "cumulative_file_size": {"cumulative_sum": {"buckets_path": "file_size"}}
+                }
+            }
+        }
+    })
+
+    # ASSERT
+    buckets = result["aggregations"]["histogram"]["buckets"]
+    assert [bucket["key_as_string"] for bucket in buckets] == [
+        "2022-12-31T00:00:00.000Z", "2023-01-01T00:00:00.000Z", "2023-01-02T00:00:00.000Z", "2023-01-03T00:00:00.000Z", "2023-01-04T00:00:00.000Z"
+    ]
+    assert [(bucket["doc_count"], bucket["file_size"]["value"]) for bucket in buckets] == [(0, 0), (1, 1), (1, 2), (1, 3), (0, 0)]
+    assert [bucket["cumulative_file_size"]["value"] for bucket in buckets] == [0, 1, 3, 6, 6]
+
+
+def test_aggregations__runtime_fields(fake_es):
+    # ARRANGE
+    fake_es.runtime_fields["double_size"] = lambda source: source["metadata"]["FileSize"] * 2
+    body = {
+        "size": 0,
+        "runtime_mappings": {"double_size": {"type": "long", "script": {"source": "emit(doc['metadata.FileSize'].value * 2)"}}},
+        "aggs": {
+            "stats": {"stats": {"field": "double_size"}},
+            "t22veq": {"filter": {"term": {"metadata.tile_id": "T22VEQ"}}, "aggs": {"max": {"max": {"field": "double_size"}}}}
+        }
+    }
+
+    # ACT
+    result = fake_es.search(index="grq_*", body=body)
+
+    # ASSERT
+    assert result["aggregations"]["stats"] == {"count": 3, "min": 2, "max": 6, "avg": 4.0, "sum": 12.0}
+    assert result["aggregations"]["t22veq"] == {"doc_count": 2, "max": {"value": 6}}
+    with pytest.raises(RequestError):
+        fake_es.search(index="grq_*", body={**body, "runtime_mappings": {"other": {"type": "long"}}})
+
+
+def test_sort__runtime_fields(fake_es):
+    # ARRANGE
+    fake_es.runtime_fields["negative_size"] = lambda source: -source["metadata"]["FileSize"]
+    body = {
+        "runtime_mappings": {"negative_size": {"type": "long", "script": {"source": "emit(-doc['metadata.FileSize'].value)"}}},
+        "sort": [{"negative_size": "asc"}]
+    }
+
+    # ACT
+    result = fake_es.search(index="grq_*", body=body)
+
+    # ASSERT
+    assert [hit["_source"]["metadata"]["FileSize"] for hit in result["hits"]["hits"]] == [3, 2, 1]
+    assert [hit["sort"] for hit in result["hits"]["hits"]] == [[-3], [-2], [-1]]
+    assert all("negative_size" not in hit["_source"] for hit in result["hits"]["hits"])
+
+
+def test_aggregations__composite_top_hits(fake_es):
+    # ARRANGE
+    body = {
+        "size": 0,
+        "aggs": {
+            "tiles": {
+                "composite": {"size": 1, "sources": [{"tile_id": {"terms": {"field": "metadata.tile_id"}}}]},
+                "aggs": {"largest": {"top_hits": {"size": 1, "sort": [{"metadata.FileSize": "desc"}]}}}
+            }
+        }
+    }
+
+    # ACT
+    first_page = fake_es.search(index="grq_*", body=body)["aggregations"]["tiles"]
+    body["aggs"]["tiles"]["composite"]["after"] = first_page["after_key"]
+    second_page = fake_es.search(index="grq_*", body=body)["aggregations"]["tiles"]
+    body["aggs"]["tiles"]["composite"]["after"] = second_page["after_key"]
+    last_page = fake_es.search(index="grq_*", body=body)["aggregations"]["tiles"]
+
+    # ASSERT
+    assert [(bucket["key"], bucket["doc_count"]) for bucket in first_page["buckets"] + second_page["buckets"]] == [({"tile_id": "T22VEQ"}, 2), ({"tile_id": "T22VER"}, 1)]
+    assert first_page["buckets"][0]["largest"]["hits"]["hits"][0]["_source"]["metadata"]["FileSize"] == 3
+    assert last_page["buckets"] == []
+
+
+def test_latency():
+    # ARRANGE
+    fake_es = FakeElasticsearch(latency=lambda operation: 0.05 if operation == "search" else 0)
+
+    # ACT
+    start = time.perf_counter()
+    fake_es.search(index="*")
+    elapsed = time.perf_counter() - start
+
+    # ASSERT
+    assert elapsed >= 0.05
+
+
+def test_query_get_docs(grq_es):
+    # ARRANGE
+    seed(grq_es())
+
+    # ACT
+    docs = query.get_docs("grq_*_l2_hls_l30-*,grq_*_l2_hls_s30-*", start="2023-01-02T00:00:00", end="2023-01-31T00:00:00", allow_no_indices=True)
+
+    # ASSERT
+    assert sorted(doc["_id"] for doc in docs) == ["HLS.L30.T22VER.2023002T143156.v2.0", "HLS.S30.T22VEQ.2023003T143156.v2.0"]
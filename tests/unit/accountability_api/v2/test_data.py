@@ -6,6 +6,9 @@ from werkzeug.test import TestResponse
 from flask.testing import FlaskClient
 from pytest_mock import MockerFixture
 
+from accountability_api.api_utils import metadata as consts
+from accountability_api.testing.fake_elasticsearch import FakeElasticsearch, FakeElasticsearchUtility
+
 
 class ElasticsearchUtilityStub:
     def search(self, **kwargs):
@@ -44,7 +47,9 @@ def test_Data_get(test_client: FlaskClient, mocker: MockerFixture, elasticsearch
         "end": None,
         "size": -1,
         "metadata_tile_id": None,
-        "metadata_sensor": None
+        "metadata_sensor": None,
+        "ignore_unavailable": True,
+        "allow_no_indices": True
     }
     get_docs_mock.assert_called_once_with("test_index_name", **get_docs_args)
 
@@ -223,3 +228,56 @@ def test_DataIndex_get(test_client: FlaskClient, mocker: MockerFixture, monkeypa
 
     # check minimization
     assert "test_extra_attribute" not in data[0]
+
+
+def test_DataTimeSeries_get(test_client: FlaskClient, mocker: MockerFixture):
+    # ARRANGE
+    es = FakeElasticsearch()
+    es.add_documents("grq_v2.0_l2_hls_l30", [
+        {"_id": "HLS.L30.1", "creation_timestamp": "2023-01-01T00:10:00.000000Z", "metadata": {"FileSize": 1}},
+        {"_id": "HLS.L30.2", "creation_timestamp": "2023-01-01T00:20:00.000000Z", "metadata": {"FileSize": 2}},
+        {"_id": "HLS.L30.3", "creation_timestamp": "2023-01-01T02:00:00.000000Z", "metadata": {"FileSize": 3}},
+    ])
+    es.add_documents("grq_v1.0_l3_dswx_hls", [
+        {"_id": "OPERA_L3_DSWx-HLS_1", "creation_timestamp": "2023-01-01T00:30:00.000000Z", "daac_CNM_S_timestamp": "2023-01-01T01:30:00.000000Z", "metadata": {"FileSize": 4}},
+    ])
+    mocker.patch("accountability_api.api_utils.query.es_connection.get_grq_es", return_value=FakeElasticsearchUtility(es))
+    es.calls.clear()
+
+    # ACT
+    response: TestResponse = test_client.get("/data/timeseries?start=2023-01-01T00:00:00Z&end=2023-01-01T02:59:59Z&interval=1h")
+    data = response.json
+
+    # ASSERT
+    assert response.status_code == 200
+    assert es.calls["msearch"] <= 2  # the histograms, and possibly an ETag index probe
+    assert es.calls["search"] == 0
+
+    series = {(s["category"], s["product_type"]): s["buckets"] for s in data}
+    assert set(series) == {
+        *(("incoming", product_type) for product_type in consts.INCOMING_SDP_PRODUCTS),
+        *(("generated", product_type) for product_type in consts.GENERATED_PRODUCTS),
+        *(("outgoing", product_type) for product_type in consts.OUTGOING_PRODUCTS_TO_DAAC),
+    }
+    assert series[("incoming", "HLS_L30")] == [
+        {"timestamp": "2023-01-01T00:00:00.000000Z", "count": 2, "file_size": 3},
+        {"timestamp": "2023-01-01T01:00:00.000000Z", "count": 0, "file_size": 0},
+        {"timestamp": "2023-01-01T02:00:00.000000Z", "count": 1, "file_size": 3},
+    ]
+    assert [b["count"] for b in series[("generated", "DSWX_HLS")]] == [1, 0, 0]
+    assert [b["count"] for b in series[("outgoing", "DSWX_HLS")]] == [0, 1, 0]
+
+
+@pytest.mark.parametrize("query_string", [
+    "start=2023-01-01T00:00:00Z&end=2023-01-02T00:00:00Z&interval=1w",
+    "start=2023-01-01T00:00:00Z&end=2023-01-02T00:00:00Z&interval=0h",
+    "start=2023-01-02T00:00:00Z&end=2023-01-01T00:00:00Z",
+    "start=2023-01-01T00:00:00Z&end=2024-01-01T00:00:00Z&interval=1s",
+    "start=2023-01-01T00:00:00Z&end=2023-01-02T00:00:00Z&category=other",
+])
+def test_DataTimeSeries_get__bad_request(test_client: FlaskClient, query_string: str):
+    # ACT
+    response: TestResponse = test_client.get(f"/data/timeseries?{query_string}")
+
+    # ASSERT
+    assert response.status_code == 400
@@ -1,8 +1,12 @@
 import os
+from datetime import datetime
 
 import pytest
+from pytest_mock import MockerFixture
 
 from accountability_api import create_app
+from accountability_api.testing.catalog_generator import CatalogGenerator
+from accountability_api.testing.fake_elasticsearch import FakeElasticsearch, FakeElasticsearchUtility
 
 
 @pytest.fixture(autouse=True)
@@ -22,3 +26,26 @@ def test_client():
     with flask_app.test_client() as testing_client:
         with flask_app.app_context():
             yield testing_client
+
+
+@pytest.fixture
+def grq_es(mocker: MockerFixture):
+    """Factory of fake GRQ Elasticsearch clients, queried by `query`. Keyword arguments are passed to `FakeElasticsearch`."""
+    def create(**kwargs) -> FakeElasticsearch:
+        es = FakeElasticsearch(**kwargs)
+        mocker.patch("accountability_api.api_utils.query.es_connection.get_grq_es", return_value=FakeElasticsearchUtility(es))
+        mocker.patch("accountability_api.api_utils.index_resolver.INDEX_RESOLVER", None)  # don't share cached index ranges
+        return es
+    return create
+
+
+@pytest.fixture
+def catalog_es(grq_es, mocker: MockerFixture):
+    """Factory of fake GRQ Elasticsearch clients seeded with 2 days of a small synthetic catalog. See `grq_es`."""
+    def create(**kwargs) -> FakeElasticsearch:
+        es = grq_es(**kwargs)
+        for index, doc in CatalogGenerator(start=datetime(2023, 1, 1), days=2, rates={"HLS_L30": 3, "L1_S1_SLC": 2, "L2_RTC_S1": 3}).generate():
+            es.add_documents(index, [doc])
+        mocker.patch("accountability_api.api_utils.mirror.get_mirror", return_value=None)
+        return es
+    return create